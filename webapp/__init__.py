@@ -1,7 +1,31 @@
-# Support both package and standalone imports
-try:
-    from .app import app, create_app
-except ImportError:
-    from app import app, create_app
+"""Shovo movie lists.
+
+Importing the package has no side effects: ``app`` (created when ``webapp.wsgi`` is
+imported) and ``create_app`` are loaded on first access. Submodules
+such as ``webapp.tools`` and ``webapp.database`` can be used without migrating the
+database or starting background threads.
+"""
+from __future__ import annotations
+
+import importlib
+import types
+from typing import Any
 
 __all__ = ["app", "create_app"]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Support both package and standalone imports
+    try:
+        module = importlib.import_module(".app" if name == "create_app" else ".wsgi", __name__)
+    except ImportError:
+        module = importlib.import_module("app" if name == "create_app" else "wsgi")
+    value = module.create_app if name == "create_app" else module.app
+    # Importing ``webapp.app`` binds the submodule as ``app`` here; drop it so a later
+    # ``from webapp import app`` still reaches the application.
+    if isinstance(globals().get("app"), types.ModuleType):
+        del globals()["app"]
+    globals()[name] = value
+    return value
@@ -6,11 +6,23 @@ from flask import Flask
 
 # Support both package and standalone imports
 try:
-    from .database import close_db, init_db
-    from .routes import bp as main_bp
+    from .assets import register_assets
+    from .compression import register_compression
+    from .database import MIGRATE_ON_START, close_db, init_db
+    from .profiling import register_profiling
+    from .routes import APP_VERSION, bp as main_bp
+    from .utils import lazy_import
 except ImportError:
-    from database import close_db, init_db
-    from routes import bp as main_bp
+    from assets import register_assets
+    from compression import register_compression
+    from database import MIGRATE_ON_START, close_db, init_db
+    from profiling import register_profiling
+    from routes import APP_VERSION, bp as main_bp
+    from utils import lazy_import
+
+WARMER_ENABLED = os.environ.get("SHOVO_WARMER", "").lower() in {"1", "true", "yes", "on"}
+# Only imported when enabled, since it pulls in the upstream stack.
+warmer = lazy_import(".warmer")
 
 
 def create_app() -> Flask:
@@ -23,15 +35,28 @@ def create_app() -> Flask:
     # Register blueprints
     application.register_blueprint(main_bp)
 
-    # Initialize database on first request
-    with application.app_context():
-        init_db()
+    # Opt-in per-request stack sampling
+    register_profiling(application)
 
-    return application
+    # Compress JSON/HTML responses and serve precompressed static files
+    register_compression(application)
+
+    # Fingerprinted static URLs from the build manifest, served as immutable
+    register_assets(application, APP_VERSION)
 
+    # Bring the schema up to date, unless deploys do it with ``python database.py``
+    if MIGRATE_ON_START:
+        with application.app_context():
+            init_db()
+
+    # Off-peak cache pre-warming for active rooms
+    if WARMER_ENABLED:
+        warmer.start_warmer()
+
+    return application
 
-app = create_app()
 
 if __name__ == "__main__":
+    app = create_app()
     debug_mode = os.environ.get("FLASK_DEBUG", "").lower() in {"1", "true", "yes", "on"}
     app.run(host="0.0.0.0", port=5000, debug=debug_mode)
@@ -0,0 +1,80 @@
+"""Fingerprinted static asset URLs for templates.
+
+``python -m webapp.tools.build_static`` copies static files into ``static/dist/`` under
+content-hashed names and writes ``static/dist/manifest.json``. The ``asset_url`` template
+helper maps an original path to its fingerprinted URL and falls back to the plain
+``/static/`` URL for files that were not built (as in development), so templates work
+either way. Fingerprinted files never change and are served as immutable.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+
+from flask import Flask, Response, request
+
+# Support both package and standalone imports
+try:
+    from .tools.build_static import DIST_DIRNAME, MANIFEST_NAME
+except ImportError:
+    from tools.build_static import DIST_DIRNAME, MANIFEST_NAME
+
+IMMUTABLE_MAX_AGE_SECONDS = 365 * 24 * 60 * 60
+SERVICE_WORKER = "sw.js"
+
+
+@dataclass
+class AssetManifest:
+    """Original static paths mapped to their fingerprinted names."""
+
+    version: str
+    assets: dict[str, str] = field(default_factory=dict)
+    imports: dict[str, list[str]] = field(default_factory=dict)
+
+    def url(self, path: str) -> str:
+        """URL of a static file, fingerprinted when it has been built."""
+        name = self.assets.get(path)
+        return f"/static/{DIST_DIRNAME}/{name}" if name else f"/static/{path}"
+
+    def preloads(self, path: str) -> list[str]:
+        """URLs of every module a script imports, directly or not."""
+        return [self.url(module) for module in self.imports.get(path, [])]
+
+
+def load_manifest(static_folder: str, fallback_version: str) -> AssetManifest:
+    """Read the build manifest; without one, nothing is fingerprinted."""
+    try:
+        with open(os.path.join(static_folder, DIST_DIRNAME, MANIFEST_NAME), encoding="utf-8") as handle:
+            data = json.load(handle)
+    except FileNotFoundError:
+        return AssetManifest(version=fallback_version)
+    return AssetManifest(version=data["version"], assets=data["assets"], imports=data.get("imports", {}))
+
+
+def _static_cache_headers(response: Response) -> Response:
+    if request.endpoint != "static" or not request.view_args or response.status_code != 200:
+        return response
+    filename = request.view_args.get("filename", "")
+    if filename.startswith(f"{DIST_DIRNAME}/") and filename != f"{DIST_DIRNAME}/{MANIFEST_NAME}":
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE_SECONDS
+        response.cache_control.immutable = True
+    elif filename == SERVICE_WORKER:
+        # Served from /static/ but controls the whole site.
+        response.headers["Service-Worker-Allowed"] = "/"
+        response.cache_control.no_cache = True
+    return response
+
+
+def register_assets(application: Flask, fallback_version: str) -> None:
+    """Load the asset manifest once and expose ``asset_url`` to templates."""
+    manifest = load_manifest(application.static_folder or "", fallback_version)
+    application.extensions["asset_manifest"] = manifest
+    application.jinja_env.globals.update(
+        asset_url=manifest.url,
+        asset_preloads=manifest.preloads,
+        asset_version=manifest.version,
+    )
+    application.after_request(_static_cache_headers)
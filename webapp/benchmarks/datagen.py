@@ -0,0 +1,260 @@
+"""Generate large synthetic databases for scale testing.
+
+Usage::
+
+    python -m webapp.benchmarks.datagen OUTPUT.sqlite3 [--rooms 100000] [--room-size pareto:1.2]
+        [--max-room-size 2000] [--big-room 20000] [--catalog 50000] [--watched-share 0.3]
+        [--cached-share 0.8] [--expired-share 0.2] [--unpositioned-share 0] [--active-share 0.1]
+        [--seed 1]
+
+Room sizes follow ``--room-size``: ``fixed:N``, ``uniform:LOW,HIGH`` or ``pareto:ALPHA``
+(most rooms small, a long tail of big ones), capped at ``--max-room-size``. Each
+``--big-room N`` adds one more room of exactly N titles; big rooms are named ``big-0``,
+``big-1``, ... and the others ``room-0``, ``room-1``, ...
+
+Titles come from a shared catalog in which a few titles are much more popular than the
+rest, so caches are shared between rooms the way they are in production. Positions are
+numbered per room and watched state as the app assigns them; ``--unpositioned-share``
+leaves some of them NULL, as in databases from before positions existed.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+# Support both package and standalone imports
+try:
+    from ..database import migrate_db
+except ImportError:
+    from database import migrate_db
+
+BATCH_SIZE = 10000
+DAY_SECONDS = 24 * 60 * 60
+TYPE_LABELS = (("movie", 0.65), ("tvSeries", 0.25), ("tvMiniSeries", 0.05), ("short", 0.05))
+LANGUAGES = ("English", "English", "English", "Spanish", "French", "Japanese", "Korean", "Hindi")
+
+
+def parse_room_size(spec: str) -> Callable[[random.Random], int]:
+    """Parse a room size distribution spec into a sampling function."""
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(value) for value in args.split(",")] if args else []
+    except ValueError:
+        raise ValueError(f"invalid room size spec: {spec}") from None
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: int(values[0])
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.randint(int(values[0]), int(values[1]))
+    if kind == "pareto" and len(values) == 1:
+        return lambda rng: int(rng.paretovariate(values[0]))
+    raise ValueError(f"invalid room size spec: {spec}")
+
+
+@dataclass
+class DatasetSpec:
+    """Shape of a generated database."""
+
+    rooms: int = 1000
+    room_size: str = "pareto:1.2"
+    max_room_size: int = 2000
+    big_rooms: list[int] = field(default_factory=list)
+    catalog: int = 50000
+    watched_share: float = 0.3
+    cached_share: float = 0.8
+    expired_share: float = 0.2
+    unpositioned_share: float = 0.0
+    active_share: float = 0.1
+    seed: int = 1
+
+
+@dataclass
+class DatasetStats:
+    """What was generated."""
+
+    rooms: int = 0
+    titles: int = 0
+    cached_titles: int = 0
+    largest_room: int = 0
+    seconds: float = 0.0
+
+
+def catalog_title_id(index: int) -> str:
+    return f"tt{1000000 + index:07d}"
+
+
+def _catalog_entry(index: int) -> tuple:
+    # Deterministic per title, so the same title looks the same in every room.
+    rng = random.Random(index)
+    type_label = rng.choices([label for label, _ in TYPE_LABELS], [weight for _, weight in TYPE_LABELS])[0]
+    series = type_label.startswith("tv")
+    seasons = rng.randint(1, 8) if series else None
+    return (
+        catalog_title_id(index),
+        f"Synthetic Title {index}",
+        str(rng.randint(1950, 2025)),
+        rng.choice(LANGUAGES),
+        type_label,
+        f"https://m.media-amazon.com/images/M/MV5B{index:x}._V1_UX120_CR0,0,120,180_AL_.jpg",
+        f"{rng.uniform(3, 9.5):.1f}",
+        f"{rng.randint(10, 100)}%" if rng.random() < 0.7 else None,
+        None if series else rng.randint(70, 180),
+        seasons,
+        seasons * rng.randint(6, 22) if seasons else None,
+        rng.randint(20, 60) if series else None,
+    )
+
+
+def _pick_titles(rng: random.Random, size: int, catalog: int) -> list[int]:
+    """Pick ``size`` distinct catalog entries, favouring popular (low-numbered) ones."""
+    size = min(size, catalog)
+    if size * 4 > catalog:
+        return rng.sample(range(catalog), size)
+    picked: dict[int, None] = {}
+    while len(picked) < size:
+        picked.setdefault(int(catalog * rng.random() ** 3), None)
+    return list(picked)
+
+
+def generate(conn: sqlite3.Connection, spec: DatasetSpec) -> DatasetStats:
+    """Fill ``conn`` with rooms, list rows, caches and room activity following ``spec``."""
+    started = time.perf_counter()
+    rng = random.Random(spec.seed)
+    sample_size = parse_room_size(spec.room_size)
+    now = int(time.time())
+    stats = DatasetStats()
+    migrate_db(conn)
+    catalog = [_catalog_entry(index) for index in range(spec.catalog)]
+    used: set[int] = set()
+
+    rooms = [(f"room-{index}", min(max(sample_size(rng), 1), spec.max_room_size)) for index in range(spec.rooms)]
+    rooms += [(f"big-{index}", size) for index, size in enumerate(spec.big_rooms)]
+    rows: list[tuple] = []
+    activity: list[tuple[str, int]] = []
+
+    def _flush() -> None:
+        conn.executemany(
+            """
+            INSERT INTO lists (
+                room, title_id, title, year, original_language, type_label, image, rating,
+                rotten_tomatoes, runtime_minutes, total_seasons, total_episodes, avg_episode_length,
+                added_at, watched, position
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        rows.clear()
+
+    for room, size in rooms:
+        titles = _pick_titles(rng, size, spec.catalog)
+        used.update(titles)
+        stats.rooms += 1
+        stats.titles += len(titles)
+        stats.largest_room = max(stats.largest_room, len(titles))
+        created = now - rng.randint(0, 365 * DAY_SECONDS)
+        positions = [0, 0]
+        for index in titles:
+            watched = 1 if rng.random() < spec.watched_share else 0
+            positions[watched] += 1
+            position = None if rng.random() < spec.unpositioned_share else positions[watched]
+            added_at = created + rng.randint(0, max(now - created, 1))
+            rows.append((room, *catalog[index], added_at, watched, position))
+        if rng.random() < spec.active_share:
+            activity.append((room, now - rng.randint(0, 14 * DAY_SECONDS)))
+        if len(rows) >= BATCH_SIZE:
+            _flush()
+    _flush()
+
+    ratings, metadata = [], []
+    for index in sorted(used):
+        if rng.random() >= spec.cached_share:
+            continue
+        entry = catalog[index]
+        cached_at = now - rng.randint(0, 30 * DAY_SECONDS)
+        expires_at = now - rng.randint(1, DAY_SECONDS) if rng.random() < spec.expired_share else now + DAY_SECONDS
+        ratings.append((entry[0], entry[6], entry[7], cached_at, expires_at))
+        metadata.append((entry[0], *entry[8:12], entry[3], cached_at, expires_at))
+    conn.executemany(
+        "INSERT INTO rating_cache (title_id, rating, rotten_tomatoes, cached_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+        ratings,
+    )
+    conn.executemany(
+        """
+        INSERT INTO metadata_cache (
+            title_id, runtime_minutes, total_seasons, total_episodes, avg_episode_length,
+            original_language, cached_at, expires_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        metadata,
+    )
+    conn.executemany("INSERT INTO room_activity (room, last_seen) VALUES (?, ?)", activity)
+    if spec.unpositioned_share:
+        # Like a database from before positions, so the next migration backfills them.
+        conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    stats.cached_titles = len(ratings)
+    stats.seconds = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def generate_database(path: str, spec: DatasetSpec) -> DatasetStats:
+    """Create a new database file at ``path`` (which must not exist) following ``spec``."""
+    if os.path.exists(path) and os.path.getsize(path):
+        raise FileExistsError(path)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        # A throwaway file does not need to survive a crash while it is being built.
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        return generate(conn, spec)
+    finally:
+        conn.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="database file to create")
+    parser.add_argument("--rooms", type=int, default=DatasetSpec.rooms)
+    parser.add_argument("--room-size", default=DatasetSpec.room_size, help="room size distribution")
+    parser.add_argument("--max-room-size", type=int, default=DatasetSpec.max_room_size)
+    parser.add_argument("--big-room", type=int, action="append", default=[], help="add a room of this size")
+    parser.add_argument("--catalog", type=int, default=DatasetSpec.catalog, help="distinct titles to draw from")
+    parser.add_argument("--watched-share", type=float, default=DatasetSpec.watched_share)
+    parser.add_argument("--cached-share", type=float, default=DatasetSpec.cached_share)
+    parser.add_argument("--expired-share", type=float, default=DatasetSpec.expired_share)
+    parser.add_argument("--unpositioned-share", type=float, default=DatasetSpec.unpositioned_share)
+    parser.add_argument("--active-share", type=float, default=DatasetSpec.active_share)
+    parser.add_argument("--seed", type=int, default=DatasetSpec.seed)
+    args = parser.parse_args(argv)
+    try:
+        parse_room_size(args.room_size)
+    except ValueError as exc:
+        parser.error(str(exc))
+    spec = DatasetSpec(
+        rooms=args.rooms,
+        room_size=args.room_size,
+        max_room_size=args.max_room_size,
+        big_rooms=args.big_room,
+        catalog=args.catalog,
+        watched_share=args.watched_share,
+        cached_share=args.cached_share,
+        expired_share=args.expired_share,
+        unpositioned_share=args.unpositioned_share,
+        active_share=args.active_share,
+        seed=args.seed,
+    )
+    stats = generate_database(args.output, spec)
+    print(
+        f"{stats.rooms} rooms, {stats.titles} list rows (largest room {stats.largest_room}), "
+        f"{stats.cached_titles} cached titles in {stats.seconds}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
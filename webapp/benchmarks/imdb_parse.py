@@ -0,0 +1,117 @@
+"""Compare full-page and streaming parsing of IMDB title pages.
+
+Usage::
+
+    python -m webapp.benchmarks.imdb_parse [--pad-kb 1024] [--repeat 50] [page.html ...]
+
+Without arguments the saved pages in ``webapp/tests/fixtures`` are used. ``--pad-kb`` grows
+each page's body to roughly that size, since live pages are usually over a megabyte.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Iterator
+
+# Support both package and standalone imports
+try:
+    from ..external_api import IMDB_CHUNK_SIZE, _extract_ld_json, _structured_data_fields
+except ImportError:
+    from external_api import IMDB_CHUNK_SIZE, _extract_ld_json, _structured_data_fields
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures")
+
+
+def load_page(path: str, pad_kb: int = 0) -> bytes:
+    """Read a saved page, optionally padding its body to ``pad_kb`` kilobytes."""
+    with open(path, "rb") as handle:
+        page = handle.read()
+    if pad_kb and len(page) < pad_kb * 1024:
+        body_start = page.find(b"<body")
+        filler = page[body_start:] if body_start >= 0 else page
+        repeats = (pad_kb * 1024 - len(page)) // max(len(filler), 1) + 1
+        page = page + filler * repeats
+    return page
+
+
+def _chunks(page: bytes, consumed: list[int]) -> Iterator[bytes]:
+    for index in range(0, len(page), IMDB_CHUNK_SIZE):
+        chunk = page[index : index + IMDB_CHUNK_SIZE]
+        consumed[0] += len(chunk)
+        yield chunk
+
+
+def parse_full(page: bytes) -> tuple[dict, int]:
+    """The previous approach: decode the whole body, then regex over all of it."""
+    text = page.decode("utf-8")
+    match = re.search(r'<script type="application/ld\+json">(.*?)</script>', text, re.S)
+    return _structured_data_fields(match.group(1) if match else None), len(page)
+
+
+def parse_stream(page: bytes) -> tuple[dict, int]:
+    """Incremental scan that stops after the ld+json block."""
+    consumed = [0]
+    fields = _structured_data_fields(_extract_ld_json(_chunks(page, consumed)))
+    return fields, consumed[0]
+
+
+def measure(parser: Callable[[bytes], tuple[dict, int]], page: bytes, repeat: int) -> dict[str, float]:
+    """Time a parser and record bytes consumed and peak traced memory."""
+    parser(page)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fields, consumed = parser(page)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    parser(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "bytes_read": consumed,
+        "peak_kb": peak / 1024,
+        "fields": fields,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="saved IMDB title pages")
+    parser.add_argument("--pad-kb", type=int, default=1024, help="pad page bodies to this size (0 to disable)")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    paths = args.pages or sorted(glob.glob(os.path.join(FIXTURE_DIR, "imdb_title_*.html")))
+    results = []
+    for path in paths:
+        page = load_page(path, args.pad_kb)
+        full = measure(parse_full, page, args.repeat)
+        stream = measure(parse_stream, page, args.repeat)
+        if full["fields"] != stream["fields"]:
+            raise SystemExit(f"{path}: streaming parse disagrees with full parse")
+        results.append({"page": os.path.basename(path), "size_kb": len(page) / 1024, "full": full, "stream": stream})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'page':<28}{'mode':<8}{'read KB':>10}{'median ms':>12}{'peak KB':>10}")
+    for result in results:
+        for mode in ("full", "stream"):
+            row = result[mode]
+            print(
+                f"{result['page']:<28}{mode:<8}{row['bytes_read'] / 1024:>10.1f}"
+                f"{row['median_ms']:>12.3f}{row['peak_kb']:>10.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,531 @@
+"""HTTP load test with a realistic mix of page views, reads, searches and mutations.
+
+Usage::
+
+    python -m webapp.benchmarks.loadtest [--concurrency 8] [--duration 30] [--requests N]
+        [--rooms 20] [--titles 200] [--mix list=40,search=10,...] [--latency lognormal:80,0.6]
+        [--output results.json] [--compare previous.json]
+
+By default a temporary database is seeded, and the app and the upstream simulator
+(``upstream_sim.py``) are started in this process, with the app's upstream limiters raised
+so they do not become the bottleneck. To load a real deployment (uwsgi with the settings
+being tuned), start it with ``SHOVO_UPSTREAM_SIM`` pointing at a simulator and pass
+``--url``; ``--db`` seeds that deployment's database first.
+
+Each worker thread keeps its own session and picks endpoints at random by weight. The
+report has throughput and p50/p95/p99 latency per endpoint. ``--output`` saves it as JSON
+together with the commit and settings, and ``--compare`` prints the change against an
+earlier result file.
+
+``--mix writes`` starts from a mostly-mutations preset instead of the default mix. Run it
+with and without ``SHOVO_GROUP_COMMIT=1`` (and the other write settings, which in-process
+results record) to compare write paths.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+import requests
+from werkzeug.serving import WSGIRequestHandler
+
+# Support both package and standalone imports
+try:
+    from .upstream_sim import SimulatorConfig, start_simulator
+except ImportError:
+    from upstream_sim import SimulatorConfig, start_simulator
+
+ROOM_PREFIX = "load"
+FIRST_TITLE_NUMBER = 3000000
+SEARCH_TERMS = ("star", "night", "river", "house", "love", "dark", "city", "game", "last", "blue")
+# Rough shape of production traffic: mostly list reads, some searches and detail lookups
+# while adding titles, a trickle of edits and rare full refreshes.
+DEFAULT_MIX = {
+    "room_page": 5,
+    "list": 40,
+    "search": 15,
+    "details": 15,
+    "add": 8,
+    "watched": 8,
+    "order": 3,
+    "delete": 5,
+    "refresh": 1,
+}
+# Bursty collaborative editing: mostly mutations, with the list reads that follow them.
+WRITE_MIX = {name: 0 for name in DEFAULT_MIX} | {"list": 20, "add": 30, "watched": 30, "order": 5, "delete": 15}
+MIX_PRESETS = {"default": DEFAULT_MIX, "writes": WRITE_MIX}
+# Write path settings worth recording with each in-process result.
+SETTINGS_ENV = ("SHOVO_GROUP_COMMIT", "SHOVO_GROUP_COMMIT_WINDOW_MS", "SHOVO_SYNCHRONOUS", "SHOVO_JOURNAL_MODE")
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(spec: str) -> dict[str, int]:
+    """Parse ``[preset,]name=weight,...``: overrides on top of a preset (default ``DEFAULT_MIX``)."""
+    preset, _, rest = spec.partition(",")
+    if preset in MIX_PRESETS:
+        mix = dict(MIX_PRESETS[preset])
+        spec = rest
+    else:
+        mix = dict(DEFAULT_MIX)
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown endpoint in mix: {name}")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise ValueError("mix has no endpoints with a weight")
+    return mix
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def title_id(number: int) -> str:
+    return f"tt{FIRST_TITLE_NUMBER + number:07d}"
+
+
+def room_name(index: int) -> str:
+    return f"{ROOM_PREFIX}-{index}"
+
+
+def seed_database(db_path: str, rooms: int, titles_per_room: int) -> None:
+    """Fill ``db_path`` with load-test rooms and fresh cache entries for their titles.
+
+    Existing load-test rooms are replaced; other rooms are left alone.
+    """
+    # Create the schema the same way the app does
+    try:
+        from .. import database
+    except ImportError:
+        import database
+
+    now = int(time.time())
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        database.migrate_db(conn)
+        conn.execute("DELETE FROM lists WHERE room LIKE ?", (f"{ROOM_PREFIX}-%",))
+        rows, ratings, metadata = [], [], []
+        for room_index in range(rooms):
+            for number in range(titles_per_room):
+                tid = title_id(room_index * titles_per_room + number)
+                watched = 1 if number % 4 == 0 else 0
+                room = room_name(room_index)
+                rows.append((room, tid, f"Title {tid}", "2001", "movie", "7.1", 104, now - number, watched, number))
+                ratings.append((tid, "7.1", now, now + 30 * 86400))
+                metadata.append((tid, 104, now, now + 30 * 86400))
+        conn.executemany(
+            """
+            INSERT INTO lists (
+                room, title_id, title, year, type_label, rating, runtime_minutes, added_at, watched, position
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        conn.executemany(
+            "REPLACE INTO rating_cache (title_id, rating, cached_at, expires_at) VALUES (?, ?, ?, ?)", ratings
+        )
+        conn.executemany(
+            "REPLACE INTO metadata_cache (title_id, runtime_minutes, cached_at, expires_at) VALUES (?, ?, ?, ?)",
+            metadata,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@dataclass
+class LoadTestConfig:
+    """Settings for one load-test run."""
+
+    concurrency: int = 8
+    duration: float = 30.0
+    requests: int | None = None
+    rooms: int = 20
+    titles: int = 200
+    mix: dict[str, int] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    seed: int = 1
+    timeout: float = 30.0
+
+
+class Worker:
+    """One simulated client. Mutations stay within the worker's own titles."""
+
+    def __init__(self, base_url: str, config: LoadTestConfig, index: int) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.config = config
+        self.rng = random.Random(config.seed * 1000 + index)
+        self.session = requests.Session()
+        self.index = index
+        self.added: list[tuple[str, str]] = []
+        self.next_title = 0
+        names = [name for name, weight in config.mix.items() if weight > 0]
+        self.names = names
+        self.weights = [config.mix[name] for name in names]
+
+    def _room(self) -> str:
+        return room_name(self.rng.randrange(self.config.rooms))
+
+    def _seeded_title(self) -> str:
+        return title_id(self.rng.randrange(self.config.rooms * self.config.titles))
+
+    def _url(self, path: str) -> str:
+        return self.base_url + path
+
+    def room_page(self) -> requests.Response:
+        return self.session.get(self._url(f"/r/{self._room()}"), timeout=self.config.timeout)
+
+    def list(self) -> requests.Response:
+        params = {"room": self._room(), "status": self.rng.choice(("unwatched", "watched")), "per_page": 50}
+        return self.session.get(self._url("/api/list"), params=params, timeout=self.config.timeout)
+
+    def search(self) -> requests.Response:
+        query = f"{self.rng.choice(SEARCH_TERMS)} {self.rng.randrange(50)}"
+        return self.session.get(self._url("/api/search"), params={"q": query}, timeout=self.config.timeout)
+
+    def details(self) -> requests.Response:
+        # Half the lookups are for listed titles with cached details, half go upstream.
+        if self.rng.random() < 0.5:
+            tid = self._seeded_title()
+        else:
+            tid = f"tt{self.rng.randrange(1000000, 2000000):07d}"
+        params = {"title_id": tid, "type_label": "movie"}
+        return self.session.get(self._url("/api/details"), params=params, timeout=self.config.timeout)
+
+    def add(self) -> requests.Response:
+        room = self._room()
+        tid = f"tt{9000000 + self.index * 100000 + self.next_title:07d}"
+        self.next_title += 1
+        self.added.append((room, tid))
+        payload = {
+            "room": room,
+            "title_id": tid,
+            "title": f"Added {tid}",
+            "year": "2020",
+            "type_label": "movie",
+            "rating": "6.8",
+            "runtime_minutes": 97,
+        }
+        return self.session.post(self._url("/api/list"), json=payload, timeout=self.config.timeout)
+
+    def watched(self) -> requests.Response:
+        payload = {"room": self._room(), "title_id": self._seeded_title(), "watched": self.rng.randrange(2)}
+        return self.session.patch(self._url("/api/list"), json=payload, timeout=self.config.timeout)
+
+    def order(self) -> requests.Response:
+        room_index = self.rng.randrange(self.config.rooms)
+        start = room_index * self.config.titles
+        order = [title_id(start + number) for number in range(min(self.config.titles, 50))]
+        self.rng.shuffle(order)
+        payload = {"room": room_name(room_index), "order": order}
+        return self.session.patch(self._url("/api/list/order"), json=payload, timeout=self.config.timeout)
+
+    def delete(self) -> requests.Response:
+        if not self.added:
+            return self.add()
+        room, tid = self.added.pop(self.rng.randrange(len(self.added)))
+        payload = {"room": room, "title_id": tid}
+        return self.session.delete(self._url("/api/list"), json=payload, timeout=self.config.timeout)
+
+    def refresh(self) -> requests.Response:
+        return self.session.post(self._url("/api/refresh"), json={"room": self._room()}, timeout=self.config.timeout)
+
+    def pick(self) -> str:
+        return self.rng.choices(self.names, self.weights)[0]
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    seconds: float
+    status: int
+
+
+def _is_error(endpoint: str, status: int) -> bool:
+    # A refresh that is already running answers 409, which is expected under load.
+    if endpoint == "refresh" and status == 409:
+        return False
+    return status == 0 or status >= 400
+
+
+def run_load(base_url: str, config: LoadTestConfig) -> tuple[list[Sample], float]:
+    """Drive ``base_url`` with ``config.concurrency`` workers; return samples and wall time."""
+    samples: list[Sample] = []
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + config.duration
+
+    def _take_ticket() -> bool:
+        if config.requests is None:
+            return time.perf_counter() < deadline
+        with lock:
+            if issued[0] >= config.requests:
+                return False
+            issued[0] += 1
+            return True
+
+    def _run(worker: Worker) -> None:
+        local: list[Sample] = []
+        while _take_ticket():
+            endpoint = worker.pick()
+            started = time.perf_counter()
+            try:
+                response = getattr(worker, endpoint)()
+                response.content  # read the whole body, as a browser would
+                status = response.status_code
+            except requests.RequestException:
+                status = 0
+            local.append(Sample(endpoint, time.perf_counter() - started, status))
+        worker.session.close()
+        with lock:
+            samples.extend(local)
+
+    workers = [Worker(base_url, config, index) for index in range(config.concurrency)]
+    threads = [threading.Thread(target=_run, args=(worker,), name=f"shovo-load-{worker.index}") for worker in workers]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def _summarize(samples: list[Sample], elapsed: float) -> dict[str, Any]:
+    latencies = sorted(sample.seconds * 1000 for sample in samples)
+    statuses: dict[str, int] = defaultdict(int)
+    for sample in samples:
+        statuses[str(sample.status)] += 1
+    summary = {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if _is_error(sample.endpoint, sample.status)),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(latencies, pct), 2)
+    return summary
+
+
+def summarize(samples: list[Sample], elapsed: float) -> dict[str, Any]:
+    """Per-endpoint and overall throughput and latency percentiles."""
+    by_endpoint: dict[str, list[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample)
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "total": _summarize(samples, elapsed),
+        "endpoints": {name: _summarize(items, elapsed) for name, items in sorted(by_endpoint.items())},
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip() or None
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+
+def _ignore_disconnects(request: Any, client_address: Any) -> None:
+    # Clients closing keep-alive connections at the end of a run are not errors.
+    if not isinstance(sys.exc_info()[1], ConnectionError):
+        traceback.print_exc()
+
+
+@contextmanager
+def local_target(db_path: str, simulator_config: SimulatorConfig) -> Iterator[str]:
+    """Run the upstream simulator and the app in this process; yield the app's base URL."""
+    from werkzeug.serving import make_server
+
+    try:
+        from .. import database, external_api, upstream
+        from ..app import create_app
+    except ImportError:
+        import database
+        import external_api
+        import upstream
+        from app import create_app
+
+    simulator = start_simulator(simulator_config)
+    base = simulator.base_url
+    patched = {
+        (external_api, "IMDB_SUGGESTION_URL"): base + "/suggestion/{first}/{query}.json",
+        (external_api, "IMDB_TITLE_URL"): base + "/title/{title_id}/",
+        (external_api, "IMDB_TRENDING_URL"): base + "/chart/moviemeter/",
+        (external_api, "OMDB_URL"): base + "/omdb/",
+        (database, "DB_PATH"): db_path,
+        (upstream, "UPSTREAMS"): {
+            name: upstream.Upstream(name, upstream.TokenBucket(10000, 10000)) for name in ("imdb", "omdb")
+        },
+    }
+    originals = {key: getattr(*key) for key in patched}
+    for (module, name), value in patched.items():
+        setattr(module, name, value)
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True, request_handler=_QuietRequestHandler)
+    server.handle_error = _ignore_disconnects
+    thread = threading.Thread(target=server.serve_forever, name="shovo-load-app", daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        simulator.shutdown()
+        simulator.server_close()
+        for (module, name), value in originals.items():
+            setattr(module, name, value)
+
+
+def compare(current: dict[str, Any], previous: dict[str, Any]) -> list[str]:
+    """Lines describing how throughput and percentiles changed against ``previous``."""
+    lines = []
+    for name, row in [("total", current["total"]), *current["endpoints"].items()]:
+        before = previous["total"] if name == "total" else previous.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        changes = []
+        for key in ("throughput_rps", *(f"p{pct}_ms" for pct in PERCENTILES)):
+            if before.get(key):
+                changes.append(f"{key} {(row[key] - before[key]) / before[key] * 100:+.1f}%")
+        lines.append(f"{name:<12}" + ", ".join(changes))
+    return lines
+
+
+def format_report(report: dict[str, Any]) -> list[str]:
+    header = f"{'endpoint':<12}{'reqs':>8}{'errors':>8}{'rps':>10}" + "".join(
+        f"{f'p{pct} ms':>10}" for pct in PERCENTILES
+    )
+    lines = [header]
+    rows = [*report["results"]["endpoints"].items(), ("total", report["results"]["total"])]
+    for name, row in rows:
+        lines.append(
+            f"{name:<12}{row['requests']:>8}{row['errors']:>8}{row['throughput_rps']:>10.1f}"
+            + "".join(f"{row[f'p{pct}_ms']:>10.1f}" for pct in PERCENTILES)
+        )
+    return lines
+
+
+def run(
+    config: LoadTestConfig,
+    url: str | None = None,
+    db_path: str | None = None,
+    simulator_config: SimulatorConfig | None = None,
+) -> dict[str, Any]:
+    """Seed, run the load and return the report."""
+    simulator_config = simulator_config or SimulatorConfig(seed=config.seed)
+    temp_path = None
+    if db_path is None and url is None:
+        handle, temp_path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        db_path = temp_path
+    try:
+        if db_path:
+            seed_database(db_path, config.rooms, config.titles)
+        if url:
+            samples, elapsed = run_load(url, config)
+        else:
+            with local_target(db_path, simulator_config) as base_url:
+                samples, elapsed = run_load(base_url, config)
+    finally:
+        if temp_path:
+            os.unlink(temp_path)
+    return {
+        "commit": _git_commit(),
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "target": url or "in-process",
+        "config": {
+            "concurrency": config.concurrency,
+            "duration": config.duration,
+            "requests": config.requests,
+            "rooms": config.rooms,
+            "titles": config.titles,
+            "mix": config.mix,
+            "seed": config.seed,
+            "upstream_latency": simulator_config.imdb_latency,
+            "settings": {} if url else {name: os.environ[name] for name in SETTINGS_ENV if name in os.environ},
+        },
+        "results": summarize(samples, elapsed),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="load an already running app instead of an in-process one")
+    parser.add_argument("--db", help="seed this database (default: a temporary one for in-process runs)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, help="stop after this many requests instead")
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--titles", type=int, default=200, help="titles per room")
+    parser.add_argument("--mix", default="", help="preset and endpoint weights, e.g. writes or list=60,refresh=0")
+    parser.add_argument("--latency", default="lognormal:80,0.6", help="simulated upstream latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="simulated upstream 503 share")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+    config = LoadTestConfig(
+        concurrency=args.concurrency,
+        duration=args.duration,
+        requests=args.requests,
+        rooms=args.rooms,
+        titles=args.titles,
+        mix=mix,
+        seed=args.seed,
+    )
+    simulator_config = SimulatorConfig(imdb_latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    report = run(config, url=args.url, db_path=args.db, simulator_config=simulator_config)
+    for line in format_report(report):
+        print(line)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            previous = json.load(handle)
+        print(f"\nCompared with {previous.get('commit') or args.compare}:")
+        for line in compare(report["results"], previous["results"]):
+            print(line)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,375 @@
+"""Microbenchmarks for hot helpers, with stored baselines and a regression check.
+
+Usage::
+
+    python -m webapp.benchmarks.micro [--filter NAME] [--repeat 20] [--json]
+    python -m webapp.benchmarks.micro --save-baselines
+    python -m webapp.benchmarks.micro --check [--threshold 0.5]
+
+Each benchmark is calibrated to run for at least ``MIN_SAMPLE_SECONDS`` per sample, warmed
+up, then sampled ``--repeat`` times. Samples outside 1.5 IQR of the quartiles are dropped
+before taking the median.
+
+Baselines live in ``baselines.json`` next to this file. A fixed pure-Python ``reference``
+loop is sampled in turn with every benchmark, and the fastest sample of each is compared
+relative to the fastest reference sample, so baselines recorded on one machine remain
+usable on a faster or slower one and a burst of load hits both sides. The minimum is used
+because noise only ever adds time. ``--check`` exits with status 1 when a benchmark stays
+more than ``--threshold`` slower than its baseline over ``CHECK_ATTEMPTS`` runs; the test
+suite runs the same check when ``SHOVO_BENCH_GATE=1``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, ContextManager, Iterator
+
+from flask import Flask
+
+# Support both package and standalone imports
+try:
+    from .. import database
+    from ..external_api import normalize_type_label, parse_suggestion_item, shrink_image_url
+    from ..models import SearchResult
+    from ..utils import room_from_request, sanitize_room, serialize_result
+    from .loadtest import room_name, seed_database
+except ImportError:
+    import database
+    from external_api import normalize_type_label, parse_suggestion_item, shrink_image_url
+    from loadtest import room_name, seed_database
+    from models import SearchResult
+    from utils import room_from_request, sanitize_room, serialize_result
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+REGRESSION_THRESHOLD = float(os.environ.get("SHOVO_BENCH_THRESHOLD", "0.5"))
+MIN_SAMPLE_SECONDS = 0.02
+WARMUP_SAMPLES = 3
+REPEATS = 20
+# A benchmark over the threshold is run again, and only reported if every attempt is.
+CHECK_ATTEMPTS = 3
+LIST_ROOM_SIZES = (10, 200, 2000)
+
+SUGGESTION_ITEM = {
+    "id": "tt0111161",
+    "l": "The Shawshank Redemption",
+    "q": "feature",
+    "qid": "movie",
+    "y": 1994,
+    "i": {
+        "imageUrl": (
+            "https://m.media-amazon.com/images/M/"
+            "MV5BNDE3ODcxYzMtY2YzZC00NmNlLWJiNDMtZDViZWM2MzIxZDYwXkEyXkFqcGdeQXVyNjAwNDUxODI@._V1_.jpg"
+        ),
+        "height": 1500,
+        "width": 1000,
+    },
+}
+SEARCH_RESULT = SearchResult(
+    title_id="tt0903747",
+    title="Breaking Bad",
+    year="2008",
+    original_language="English",
+    type_label="tvSeries",
+    image="https://m.media-amazon.com/images/M/MV5B._V1_UX120_CR0,0,120,180_AL_.jpg",
+    rating="9.5",
+    rotten_tomatoes="96%",
+    runtime_minutes=None,
+    total_seasons=5,
+    total_episodes=62,
+    avg_episode_length=47,
+)
+
+Benchmark = Callable[[], ContextManager[Callable[[], Any]]]
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str) -> Callable[[Callable[[], Iterator[Callable[[], Any]]]], Benchmark]:
+    """Register a generator that sets up fixtures and yields the function to time."""
+
+    def register(setup: Callable[[], Iterator[Callable[[], Any]]]) -> Benchmark:
+        BENCHMARKS[name] = contextmanager(setup)
+        return BENCHMARKS[name]
+
+    return register
+
+
+@benchmark("reference")
+def _reference() -> Iterator[Callable[[], Any]]:
+    # Fixed interpreter work that the other benchmarks are normalized against.
+    yield lambda: sum(index * index for index in range(200))
+
+
+@benchmark("parse_suggestion_item")
+def _parse_suggestion_item() -> Iterator[Callable[[], Any]]:
+    yield lambda: parse_suggestion_item(SUGGESTION_ITEM, "bench", include_details=False)
+
+
+@benchmark("shrink_image_url")
+def _shrink_image_url() -> Iterator[Callable[[], Any]]:
+    url = SUGGESTION_ITEM["i"]["imageUrl"]
+    yield lambda: shrink_image_url(url)
+
+
+@benchmark("normalize_type_label")
+def _normalize_type_label() -> Iterator[Callable[[], Any]]:
+    yield lambda: normalize_type_label("TV Mini Series")
+
+
+@benchmark("serialize_result")
+def _serialize_result() -> Iterator[Callable[[], Any]]:
+    yield lambda: serialize_result(SEARCH_RESULT)
+
+
+@benchmark("room_from_request")
+def _room_from_request() -> Iterator[Callable[[], Any]]:
+    application = Flask(__name__)
+    with application.test_request_context("/api/list?room=%20Movie-Night%2042%20&status=unwatched"):
+        yield room_from_request
+
+
+@benchmark("sanitize_room")
+def _sanitize_room() -> Iterator[Callable[[], Any]]:
+    yield lambda: sanitize_room("  Movie-Night 42!  ")
+
+
+@contextmanager
+def _temporary_database() -> Iterator[str]:
+    handle, path = tempfile.mkstemp(suffix=".sqlite3")
+    os.close(handle)
+    try:
+        yield path
+    finally:
+        os.unlink(path)
+
+
+@benchmark("migrate_db_warm")
+def _migrate_db_warm() -> Iterator[Callable[[], Any]]:
+    with _temporary_database() as path:
+        seed_database(path, rooms=20, titles_per_room=50)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield lambda: database.migrate_db(conn)
+        finally:
+            conn.close()
+
+
+def _api_list_benchmark(size: int) -> Callable[[], Iterator[Callable[[], Any]]]:
+    def setup() -> Iterator[Callable[[], Any]]:
+        # Importing ``app`` creates nothing; the app is built below, against the seeded copy.
+        try:
+            from ..app import create_app
+        except ImportError:
+            from app import create_app
+
+        with _temporary_database() as path:
+            seed_database(path, rooms=1, titles_per_room=size)
+            original_path = database.DB_PATH
+            database.DB_PATH = path
+            try:
+                client = create_app().test_client()
+                url = f"/api/list?room={room_name(0)}&status=unwatched&per_page=50"
+                yield lambda: client.get(url)
+            finally:
+                database.DB_PATH = original_path
+
+    return setup
+
+
+for _size in LIST_ROOM_SIZES:
+    benchmark(f"api_list_{_size}")(_api_list_benchmark(_size))
+
+
+@dataclass
+class BenchmarkResult:
+    """Timing of one benchmark, in microseconds per call."""
+
+    name: str
+    median_us: float
+    iqr_us: float
+    min_us: float
+    loops: int
+    samples: int
+    rejected: int
+    reference_us: float = 0.0
+
+    @property
+    def relative(self) -> float:
+        """Fastest sample over the fastest ``reference`` sample taken alongside it."""
+        return self.min_us / self.reference_us if self.reference_us else 0.0
+
+
+def reject_outliers(samples: list[float]) -> list[float]:
+    """Drop samples more than 1.5 IQR outside the quartiles."""
+    if len(samples) < 4:
+        return list(samples)
+    q1, _, q3 = statistics.quantiles(samples, n=4)
+    spread = 1.5 * (q3 - q1)
+    return [sample for sample in samples if q1 - spread <= sample <= q3 + spread]
+
+
+def _time_loops(func: Callable[[], Any], loops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - started
+
+
+def _calibrate(func: Callable[[], Any]) -> int:
+    """Loops per sample so that one sample takes at least ``MIN_SAMPLE_SECONDS``."""
+    loops = 1
+    while _time_loops(func, loops) < MIN_SAMPLE_SECONDS:
+        loops *= 2
+    return loops
+
+
+def measure(
+    name: str, func: Callable[[], Any], repeat: int = REPEATS, reference: Callable[[], Any] | None = None
+) -> BenchmarkResult:
+    """Calibrate, warm up and sample ``func``, alternating with samples of ``reference``."""
+    loops = _calibrate(func)
+    reference_loops = _calibrate(reference) if reference is not None else 0
+    for _ in range(WARMUP_SAMPLES):
+        _time_loops(func, loops)
+    samples = []
+    reference_samples = []
+    for _ in range(repeat):
+        if reference is not None:
+            reference_samples.append(_time_loops(reference, reference_loops) / reference_loops * 1e6)
+        samples.append(_time_loops(func, loops) / loops * 1e6)
+    kept = reject_outliers(samples)
+    quartiles = statistics.quantiles(kept, n=4) if len(kept) >= 2 else [kept[0]] * 3
+    return BenchmarkResult(
+        name=name,
+        median_us=round(statistics.median(kept), 4),
+        iqr_us=round(quartiles[2] - quartiles[0], 4),
+        min_us=round(min(kept), 4),
+        loops=loops,
+        samples=len(kept),
+        rejected=len(samples) - len(kept),
+        reference_us=round(min(reference_samples or samples), 4),
+    )
+
+
+def run_benchmarks(names: list[str] | None = None, repeat: int = REPEATS) -> dict[str, BenchmarkResult]:
+    """Run the named benchmarks (default: all), always including ``reference``."""
+    selected = ["reference", *[name for name in (names or BENCHMARKS) if name != "reference"]]
+    results = {}
+    with BENCHMARKS["reference"]() as reference:
+        for name in selected:
+            with BENCHMARKS[name]() as func:
+                results[name] = measure(name, func, repeat, None if name == "reference" else reference)
+    return results
+
+
+def load_baselines(path: str = BASELINES_PATH) -> dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {"benchmarks": {}}
+
+
+def save_baselines(results: dict[str, BenchmarkResult], path: str = BASELINES_PATH) -> None:
+    """Store timings in ``path``, keeping baselines of benchmarks that were not run."""
+    baselines = load_baselines(path)
+    stored = baselines.setdefault("benchmarks", {})
+    stored.update(
+        {
+            name: {"median_us": result.median_us, "min_us": result.min_us, "reference_us": result.reference_us}
+            for name, result in results.items()
+        }
+    )
+    baselines["benchmarks"] = dict(sorted(stored.items()))
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(baselines, handle, indent=2)
+        handle.write("\n")
+
+
+def find_regressions(
+    results: dict[str, BenchmarkResult], baselines: dict[str, Any], threshold: float = REGRESSION_THRESHOLD
+) -> list[str]:
+    """Describe each benchmark slower than its baseline by more than ``threshold``.
+
+    Fastest samples are divided by the fastest ``reference`` sample taken alongside them
+    before comparing.
+    """
+    stored = baselines.get("benchmarks", {})
+    regressions = []
+    for name, result in results.items():
+        baseline = stored.get(name, {})
+        if name == "reference" or not result.relative or not baseline.get("reference_us"):
+            continue
+        ratio = result.relative / (baseline["min_us"] / baseline["reference_us"])
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {ratio:.2f}x its baseline ({result.min_us:.2f} us vs {baseline['min_us']:.2f} us)"
+            )
+    return regressions
+
+
+def check_regressions(
+    results: dict[str, BenchmarkResult],
+    baselines: dict[str, Any],
+    threshold: float = REGRESSION_THRESHOLD,
+    repeat: int = REPEATS,
+    attempts: int = CHECK_ATTEMPTS,
+) -> list[str]:
+    """Like ``find_regressions``, but rerun flagged benchmarks and keep their best run.
+
+    A single slow run is usually the machine, not the code.
+    """
+    results = dict(results)
+    regressions = find_regressions(results, baselines, threshold)
+    for _ in range(attempts - 1):
+        if not regressions:
+            break
+        flagged = [line.split(":", 1)[0] for line in regressions]
+        for name, result in run_benchmarks(flagged, repeat).items():
+            if name in flagged and result.relative < results[name].relative:
+                results[name] = result
+        regressions = find_regressions(results, baselines, threshold)
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", action="append", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=REPEATS)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--save-baselines", action="store_true", help=f"write results to {BASELINES_PATH}")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a benchmark regressed")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.filter, args.repeat)
+    if args.json:
+        print(json.dumps({name: asdict(result) for name, result in results.items()}, indent=2))
+    else:
+        print(
+            f"{'benchmark':<24}{'median us':>12}{'iqr us':>10}{'min us':>10}{'vs ref':>9}{'loops':>8}{'dropped':>9}"
+        )
+        for result in results.values():
+            print(
+                f"{result.name:<24}{result.median_us:>12.2f}{result.iqr_us:>10.2f}"
+                f"{result.min_us:>10.2f}{result.relative:>9.3f}{result.loops:>8}{result.rejected:>9}"
+            )
+    if args.save_baselines:
+        save_baselines(results)
+    if args.check:
+        regressions = check_regressions(results, load_baselines(), args.threshold, args.repeat)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+"""Measure worker cold start: importing the app, and the first request after it.
+
+Usage::
+
+    python -m webapp.benchmarks.startup [--runs 7] [--budget-ms 250] [--check] [--json]
+
+Each run starts a fresh interpreter, as uWSGI does when it respawns a worker after
+``max-requests``, against a temporary database that has already been migrated (as after a
+deploy). It reports the median time to import the app and to serve ``/api/list``, and
+which upstream modules were loaded along the way; list requests should not need any.
+``--check`` exits with status 1 when the median import time is over the budget.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+
+STARTUP_BUDGET_MS = float(os.environ.get("SHOVO_STARTUP_BUDGET_MS", "250"))
+UPSTREAM_MODULES = ("requests", "webapp.external_api", "webapp.upstream", "webapp.jobs", "webapp.warmer")
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runs in the child interpreter.
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from webapp import app
+imported = time.perf_counter()
+response = app.test_client().get("/api/list?room=startup")
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (served - imported) * 1000,
+    "status": response.status_code,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def probe(db_path: str, migrate_on_start: bool = False) -> dict:
+    """Start one fresh interpreter and time its import and first request."""
+    env = dict(os.environ, SHOVO_DB_PATH=db_path, SHOVO_MIGRATE_ON_START="1" if migrate_on_start else "0")
+    env.pop("SHOVO_WARMER", None)
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE % (UPSTREAM_MODULES,)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=PACKAGE_PARENT,
+        env=env,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def measure(runs: int = 7, migrate_on_start: bool = False) -> dict:
+    """Median cold-start timings over ``runs`` fresh interpreters."""
+    try:
+        from ..database import migrate_db
+    except ImportError:
+        from database import migrate_db
+
+    handle, db_path = tempfile.mkstemp(suffix=".sqlite3")
+    os.close(handle)
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        migrate_db(conn)
+        conn.close()
+        samples = [probe(db_path, migrate_on_start) for _ in range(runs)]
+    finally:
+        os.unlink(db_path)
+    return {
+        "runs": runs,
+        "import_ms": round(statistics.median(sample["import_ms"] for sample in samples), 1),
+        "first_request_ms": round(statistics.median(sample["first_request_ms"] for sample in samples), 1),
+        "upstream_modules_loaded": sorted({name for sample in samples for name in sample["loaded"]}),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--migrate-on-start", action="store_true", help="also run migrations in each worker")
+    parser.add_argument("--check", action="store_true", help="exit 1 if the import time is over budget")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs, args.migrate_on_start)
+    result["budget_ms"] = args.budget_ms
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import + create_app  {result['import_ms']:>8.1f} ms (budget {args.budget_ms:.0f} ms)")
+        print(f"first /api/list      {result['first_request_ms']:>8.1f} ms")
+        print(f"upstream modules     {', '.join(result['upstream_modules_loaded']) or 'none'}")
+    if args.check and result["import_ms"] > args.budget_ms:
+        print(f"OVER BUDGET: {result['import_ms']:.1f} ms > {args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
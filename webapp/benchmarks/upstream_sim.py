@@ -0,0 +1,351 @@
+"""Offline stand-in for the IMDb and OMDB endpoints the app calls.
+
+Usage::
+
+    python -m webapp.benchmarks.upstream_sim [--port 8765] [--latency lognormal:80,0.6]
+        [--omdb-latency fixed:40] [--error-rate 0.02] [--rate-limit-rate 0.01]
+        [--hang-rate 0] [--fixtures DIR] [--seed 1]
+
+Then start the app with ``SHOVO_UPSTREAM_SIM=http://127.0.0.1:8765`` so that
+``IMDB_SUGGESTION_URL``, ``IMDB_TITLE_URL``, ``IMDB_TRENDING_URL`` and ``OMDB_URL`` point at it.
+Raise ``IMDB_RATE_PER_SECOND``, ``OMDB_RATE_PER_SECOND`` and ``OMDB_DAILY_QUOTA`` as well
+when load testing, or the app's own rate limiters become the bottleneck.
+
+Responses are deterministic for a given title id or query. The saved title pages in
+``webapp/tests/fixtures`` are used as page templates, with a generated ld+json block. A
+``--fixtures`` directory can provide recorded responses instead:
+
+- ``suggestion/<query>.json``
+- ``title/<tt id>.html``
+- ``chart.html``
+- ``omdb/<tt id>.json`` and ``omdb/<tt id>_season<n>.json``
+
+Latency specs are ``fixed:MS``, ``uniform:LOW_MS,HIGH_MS``, ``exponential:MEAN_MS`` or
+``lognormal:MEDIAN_MS,SIGMA``. ``GET /__stats`` returns request and fault counters.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qs, unquote, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures")
+LD_JSON_PATTERN = re.compile(rb'<script type="application/ld\+json">.*?</script>', re.DOTALL)
+CHART_SIZE = 100
+SUGGESTIONS_PER_QUERY = 8
+HANG_SECONDS = 60.0
+WORDS = ("Night", "River", "Echo", "Signal", "Harbor", "Winter", "Glass", "Orbit", "Saint", "Atlas")
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn a latency spec into a function returning a delay in seconds."""
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000 if values else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1000 / values[0]) if values[0] > 0 else 0.0
+    if kind == "lognormal":
+        median_ms, sigma = values
+        return lambda rng: rng.lognormvariate(math.log(median_ms / 1000), sigma) if median_ms > 0 else 0.0
+    raise ValueError(f"unknown latency spec: {spec}")
+
+
+@dataclass
+class SimulatorConfig:
+    """Latency and fault settings for the simulator."""
+
+    imdb_latency: str = "fixed:0"
+    omdb_latency: str = ""
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    hang_rate: float = 0.0
+    retry_after_seconds: int = 5
+    fixtures: str | None = None
+    page_kb: int = 0
+    seed: int | None = None
+
+
+@dataclass
+class Simulator:
+    """Generates responses and decides latency and faults for each request."""
+
+    config: SimulatorConfig
+    stats: Counter[str] = field(default_factory=Counter)
+
+    def __post_init__(self) -> None:
+        self.rng = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.imdb_delay = parse_latency(self.config.imdb_latency)
+        self.omdb_delay = parse_latency(self.config.omdb_latency or self.config.imdb_latency)
+        self.templates = {
+            name: self._read(os.path.join(FIXTURE_DIR, f"imdb_title_{name}.html")) or b""
+            for name in ("movie", "series")
+        }
+
+    def _read(self, path: str) -> bytes | None:
+        try:
+            with open(path, "rb") as handle:
+                return handle.read()
+        except OSError:
+            return None
+
+    def _recorded(self, *parts: str) -> bytes | None:
+        if not self.config.fixtures or any(os.sep in part or part.startswith(".") for part in parts[-1:]):
+            return None
+        return self._read(os.path.join(self.config.fixtures, *parts))
+
+    def plan(self, upstream: str) -> tuple[float, str | None]:
+        """Pick the delay and fault (``error``, ``rate_limit``, ``hang`` or None) for one call."""
+        with self.lock:
+            delay = (self.omdb_delay if upstream == "omdb" else self.imdb_delay)(self.rng)
+            roll = self.rng.random()
+        fault = None
+        if roll < self.config.error_rate:
+            fault = "error"
+        elif roll < self.config.error_rate + self.config.rate_limit_rate:
+            fault = "rate_limit"
+        elif roll < self.config.error_rate + self.config.rate_limit_rate + self.config.hang_rate:
+            fault = "hang"
+        with self.lock:
+            self.stats[f"{upstream}_requests"] += 1
+            if fault:
+                self.stats[f"{upstream}_{fault}"] += 1
+        return delay, fault
+
+    @staticmethod
+    def _seed(value: str) -> int:
+        return int(hashlib.sha256(value.encode()).hexdigest()[:12], 16)
+
+    def title_info(self, title_id: str) -> dict[str, object]:
+        """Stable made-up facts about a title id."""
+        seed = self._seed(title_id)
+        series = seed % 4 == 0
+        return {
+            "title_id": title_id,
+            "name": f"{WORDS[seed % len(WORDS)]} {WORDS[(seed // 10) % len(WORDS)]} {seed % 97}",
+            "series": series,
+            "year": 1960 + seed % 66,
+            "rating": round(4 + (seed % 55) / 10, 1),
+            "runtime": 40 + seed % 20 if series else 80 + seed % 70,
+            "seasons": 1 + seed % 6 if series else None,
+            "rotten_tomatoes": f"{seed % 101}%",
+        }
+
+    def suggestion(self, query: str) -> bytes:
+        recorded = self._recorded("suggestion", f"{query}.json")
+        if recorded is not None:
+            return recorded
+        if re.fullmatch(r"tt\d+", query):
+            ids = [query]
+        else:
+            seed = self._seed(query)
+            ids = [f"tt{(seed + index * 7919) % 9_000_000 + 1_000_000:07d}" for index in range(SUGGESTIONS_PER_QUERY)]
+        items = []
+        for title_id in ids:
+            info = self.title_info(title_id)
+            items.append(
+                {
+                    "id": title_id,
+                    "l": info["name"],
+                    "y": info["year"],
+                    "qid": "tvSeries" if info["series"] else "movie",
+                    "i": {"imageUrl": f"https://m.media-amazon.com/images/M/{title_id}._V1_.jpg"},
+                }
+            )
+        return json.dumps({"d": items, "q": query}).encode()
+
+    def title_page(self, title_id: str) -> bytes:
+        recorded = self._recorded("title", f"{title_id}.html")
+        if recorded is not None:
+            return recorded
+        info = self.title_info(title_id)
+        ld_json = {
+            "@context": "https://schema.org",
+            "@type": "TVSeries" if info["series"] else "Movie",
+            "url": f"https://www.imdb.com/title/{title_id}/",
+            "name": info["name"],
+            "aggregateRating": {"@type": "AggregateRating", "ratingValue": info["rating"]},
+            "datePublished": f"{info['year']}-01-01",
+            "duration": f"PT{info['runtime'] // 60}H{info['runtime'] % 60}M",
+        }
+        block = b'<script type="application/ld+json">' + json.dumps(ld_json).encode() + b"</script>"
+        template = self.templates["series" if info["series"] else "movie"]
+        page = LD_JSON_PATTERN.sub(lambda _: block, template, count=1) if template else block
+        if self.config.page_kb and len(page) < self.config.page_kb * 1024:
+            page += b"<!-- padding -->" * ((self.config.page_kb * 1024 - len(page)) // 16 + 1)
+        return page
+
+    def chart(self) -> bytes:
+        recorded = self._recorded("chart.html")
+        if recorded is not None:
+            return recorded
+        links = "".join(
+            f'<li><a href="/title/tt{1_000_000 + index * 104_729:07d}/">{index + 1}</a></li>'
+            for index in range(CHART_SIZE)
+        )
+        return f"<html><body><ul>{links}</ul></body></html>".encode()
+
+    def omdb(self, title_id: str, season: int | None) -> bytes:
+        name = f"{title_id}_season{season}.json" if season is not None else f"{title_id}.json"
+        recorded = self._recorded("omdb", name)
+        if recorded is not None:
+            return recorded
+        if not re.fullmatch(r"tt\d+", title_id):
+            return json.dumps({"Response": "False", "Error": "Incorrect IMDb ID."}).encode()
+        info = self.title_info(title_id)
+        if season is not None:
+            episodes = []
+            for episode in range(1, 6 + self._seed(f"{title_id}:{season}") % 8):
+                released = datetime.date(int(info["year"]) + season - 1, 1, 1) + datetime.timedelta(weeks=episode)
+                episodes.append({"Episode": str(episode), "Released": released.isoformat()})
+            return json.dumps({"Response": "True", "Season": str(season), "Episodes": episodes}).encode()
+        payload = {
+            "Response": "True",
+            "Title": info["name"],
+            "Year": str(info["year"]),
+            "Runtime": f"{info['runtime']} min",
+            "Language": "English, French",
+            "Type": "series" if info["series"] else "movie",
+            "Ratings": [{"Source": "Rotten Tomatoes", "Value": info["rotten_tomatoes"]}],
+        }
+        if info["series"]:
+            payload["totalSeasons"] = str(info["seasons"])
+        return json.dumps(payload).encode()
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    """Route simulator requests; the ``Simulator`` instance lives on the server."""
+
+    server: SimulatorServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        simulator = self.server.simulator
+        url = urlparse(self.path)
+        path = unquote(url.path)
+        if path == "/__stats":
+            with simulator.lock:
+                self._send(200, json.dumps(dict(simulator.stats)).encode(), "application/json")
+            return
+        upstream = "omdb" if path.startswith("/omdb") else "imdb"
+        delay, fault = simulator.plan(upstream)
+        if fault == "hang":
+            delay = HANG_SECONDS
+        if delay:
+            time.sleep(delay)
+        if fault == "error":
+            self._send(503, b"simulated outage", "text/plain")
+            return
+        if fault == "rate_limit":
+            headers = {"Retry-After": str(simulator.config.retry_after_seconds)}
+            self._send(429, b"simulated rate limit", "text/plain", headers)
+            return
+
+        if match := re.fullmatch(r"/suggestion/[^/]*/(.+)\.json", path):
+            self._send(200, simulator.suggestion(match.group(1)), "application/json")
+        elif match := re.fullmatch(r"/title/(tt\d+)/?", path):
+            self._send(200, simulator.title_page(match.group(1)), "text/html; charset=utf-8")
+        elif path.rstrip("/") == "/chart/moviemeter":
+            self._send(200, simulator.chart(), "text/html; charset=utf-8")
+        elif path.rstrip("/") == "/omdb":
+            params = parse_qs(url.query)
+            season = params.get("Season", [None])[0]
+            body = simulator.omdb(params.get("i", [""])[0], int(season) if season else None)
+            self._send(200, body, "application/json")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], simulator: Simulator) -> None:
+        super().__init__(address, SimulatorHandler)
+        self.simulator = simulator
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients dropping keep-alive connections are routine under load.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_simulator(
+    config: SimulatorConfig | None = None, host: str = "127.0.0.1", port: int = 0
+) -> SimulatorServer:
+    """Start a simulator in a background thread; call ``shutdown()`` on the result to stop it."""
+    server = SimulatorServer((host, port), Simulator(config or SimulatorConfig()))
+    threading.Thread(target=server.serve_forever, name="shovo-upstream-sim", daemon=True).start()
+    return server
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0", help="IMDb latency spec")
+    parser.add_argument("--omdb-latency", default="", help="OMDB latency spec (default: same as --latency)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share of requests that stall for a minute")
+    parser.add_argument("--retry-after", type=int, default=5, help="Retry-After seconds on 429 responses")
+    parser.add_argument("--fixtures", help="directory of recorded responses")
+    parser.add_argument("--page-kb", type=int, default=0, help="pad title pages to this size")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    config = SimulatorConfig(
+        imdb_latency=args.latency,
+        omdb_latency=args.omdb_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        hang_rate=args.hang_rate,
+        retry_after_seconds=args.retry_after,
+        fixtures=args.fixtures,
+        page_kb=args.page_kb,
+        seed=args.seed,
+    )
+    server = SimulatorServer((args.host, args.port), Simulator(config))
+    print(f"Upstream simulator on {server.base_url}; run the app with SHOVO_UPSTREAM_SIM={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+"""TTL policies for the rating and metadata caches.
+
+A policy picks the lifetime of each cache entry when it is written. The chosen policy name
+and expiry are stored on the row (``ttl_policy``, ``expires_at``) so the decision can be
+inspected in the database.
+
+Every entry also carries a ``status``:
+
+- ``ok``: real values.
+- ``empty``: the upstream answered but has no data. Cached for a long time so the title
+  is not refetched again and again, unless it was released within the last
+  ``RECENT_RELEASE_YEARS``: a new title often has no rating yet, so it keeps the policy's
+  normal lifetime.
+- ``error``: the upstream failed. Retried after a short, jittered backoff that grows with
+  consecutive failures, so a brief outage does not hide a title for an hour.
+"""
+from __future__ import annotations
+
+import datetime
+import os
+import random
+from dataclasses import dataclass
+from typing import Protocol
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+DEFAULT_TTL_SECONDS = HOUR
+FAILURE_TTL_SECONDS = 5 * 60
+FAILURE_JITTER = 0.2
+MAX_FAILURE_DOUBLINGS = 4
+EMPTY_TTL_SECONDS = 7 * DAY
+RECENT_RELEASE_YEARS = 2
+MIN_TTL_SECONDS = 5 * 60
+MAX_TTL_SECONDS = 90 * DAY
+
+
+@dataclass
+class CacheEntryContext:
+    """What a policy knows about an entry being written."""
+
+    kind: str
+    year: int | None = None
+    normalized_type: str | None = None
+    changed: bool = True
+    stable_count: int = 0
+    status: str = "ok"
+
+
+class TtlPolicy(Protocol):
+    name: str
+
+    def ttl_seconds(self, context: CacheEntryContext) -> int:
+        """Return the lifetime in seconds for an entry."""
+        ...
+
+
+def negative_ttl_seconds(context: CacheEntryContext) -> int | None:
+    """Lifetime for ``error`` and ``empty`` entries, or None for the policy's own lifetime.
+
+    Empty entries of recent releases get the policy's lifetime too.
+    """
+    if context.status == "error":
+        backoff = FAILURE_TTL_SECONDS * 2 ** min(context.stable_count, MAX_FAILURE_DOUBLINGS)
+        return int(backoff * random.uniform(1 - FAILURE_JITTER, 1 + FAILURE_JITTER))
+    if context.status == "empty" and not is_recent_release(context.year):
+        return EMPTY_TTL_SECONDS
+    return None
+
+
+def is_recent_release(year: int | None) -> bool:
+    """Whether ``year`` falls within the last ``RECENT_RELEASE_YEARS`` (or the future)."""
+    return year is not None and datetime.date.today().year - year < RECENT_RELEASE_YEARS
+
+
+class FlatTtlPolicy:
+    """The same lifetime for every entry with real values."""
+
+    name = "flat"
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS) -> None:
+        self.ttl = ttl_seconds
+
+    def ttl_seconds(self, context: CacheEntryContext) -> int:
+        negative = negative_ttl_seconds(context)
+        return self.ttl if negative is None else negative
+
+
+class AgeAwareTtlPolicy:
+    """Longer lifetimes for older titles and for values that stopped changing.
+
+    A new release's rating moves daily while a 1972 film's runtime never changes. The base
+    lifetime grows with the title's age, doubles for each refresh in a row that found the
+    same value (up to 8x). Ongoing series keep metadata short because seasons and episodes
+    get added. Failed fetches, and empty ones for older titles, use ``negative_ttl_seconds``.
+    """
+
+    name = "age"
+
+    RATING_BASE = ((1, 6 * HOUR), (3, DAY), (10, 3 * DAY))
+    RATING_OLD = 14 * DAY
+    METADATA_BASE = ((1, DAY), (3, 7 * DAY))
+    METADATA_OLD = 60 * DAY
+    SERIES_METADATA_MAX = DAY
+    MAX_STABILITY_DOUBLINGS = 3
+
+    def ttl_seconds(self, context: CacheEntryContext) -> int:
+        negative = negative_ttl_seconds(context)
+        if negative is not None:
+            return negative
+        if context.year is None:
+            base = DEFAULT_TTL_SECONDS
+        else:
+            age = max(datetime.date.today().year - context.year, 0)
+            steps, old = (
+                (self.RATING_BASE, self.RATING_OLD)
+                if context.kind == "rating"
+                else (self.METADATA_BASE, self.METADATA_OLD)
+            )
+            base = next((ttl for max_age, ttl in steps if age < max_age), old)
+        if not context.changed:
+            base *= 2 ** min(context.stable_count, self.MAX_STABILITY_DOUBLINGS)
+        if context.kind == "metadata" and context.normalized_type == "tvseries":
+            base = min(base, self.SERIES_METADATA_MAX)
+        return int(min(max(base, MIN_TTL_SECONDS), MAX_TTL_SECONDS))
+
+
+POLICIES: dict[str, TtlPolicy] = {
+    FlatTtlPolicy.name: FlatTtlPolicy(),
+    AgeAwareTtlPolicy.name: AgeAwareTtlPolicy(),
+}
+_active_policy: TtlPolicy = POLICIES.get(os.environ.get("SHOVO_TTL_POLICY", "age"), POLICIES["age"])
+
+
+def get_ttl_policy() -> TtlPolicy:
+    """Return the policy used for new cache entries."""
+    return _active_policy
+
+
+def set_ttl_policy(policy: TtlPolicy | str) -> None:
+    """Install a policy instance, or select a registered one by name."""
+    global _active_policy
+    _active_policy = POLICIES[policy] if isinstance(policy, str) else policy
+
+
+def parse_year(value: object) -> int | None:
+    """Parse a release year from values like ``1994``, ``"1994"`` or ``"2001–2003"``."""
+    text = str(value or "")[:4]
+    return int(text) if text.isdigit() else None
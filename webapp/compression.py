@@ -0,0 +1,132 @@
+"""Response compression and precompressed static files.
+
+Dynamic responses (JSON, HTML) larger than ``COMPRESS_MIN_BYTES`` are compressed with brotli
+when the ``brotli`` package is installed and the client accepts it, and with gzip otherwise.
+Streamed responses (exports) and responses that already have a ``Content-Encoding`` are
+left alone.
+
+Static files are compressed ahead of time by ``python -m webapp.tools.precompress``, which
+writes ``.br`` and ``.gz`` files next to each asset. They are served in place of the
+original when the client accepts them, by this module or by nginx's ``gzip_static``.
+"""
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import os
+
+from flask import Flask, Response, current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get("SHOVO_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("SHOVO_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("SHOVO_BROTLI_QUALITY", "5"))
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "application/manifest+json",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+# Preference order when a client accepts several encodings.
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Encodings from an ``Accept-Encoding`` header, leaving out those with ``q=0``."""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(header: str | None, available: tuple[str, ...] = ("br", "gzip")) -> str | None:
+    """Pick the best encoding the client accepts, or None for identity."""
+    accepted = _accepted_encodings(header or "")
+    for encoding in available:
+        if encoding == "br" and brotli is None:
+            continue
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress ``data`` with ``br`` or ``gzip``."""
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response: Response) -> Response:
+    """Compress a finished response in place when it is worth it."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def serve_precompressed_static(filename: str) -> Response | None:
+    """Serve a ``.br`` or ``.gz`` copy of a static file if one is newer than the original."""
+    static_folder = current_app.static_folder
+    if not static_folder:
+        return None
+    path = safe_join(static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        if encoding not in accepted:
+            continue
+        compressed = path + suffix
+        if os.path.isfile(compressed) and os.path.getmtime(compressed) >= os.path.getmtime(path):
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype)
+            response.headers["Content-Encoding"] = encoding
+            response.vary.add("Accept-Encoding")
+            return response
+    return None
+
+
+def _precompressed_static_hook() -> Response | None:
+    if request.endpoint == "static" and request.view_args:
+        return serve_precompressed_static(request.view_args.get("filename", ""))
+    return None
+
+
+def register_compression(application: Flask) -> None:
+    """Install response compression and precompressed static files on an application."""
+    application.before_request(_precompressed_static_hook)
+    application.after_request(compress_response)
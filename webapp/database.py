@@ -1,23 +1,61 @@
 from __future__ import annotations
 
+import argparse
 import os
 import sqlite3
+import threading
 import time
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Generator
 
 from flask import g
 
+# Support both package and standalone imports
+try:
+    from .cache_policy import CacheEntryContext, get_ttl_policy
+    from .models import TitleDetails
+except ImportError:
+    from cache_policy import CacheEntryContext, get_ttl_policy
+    from models import TitleDetails
+
 APP_ROOT = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(APP_ROOT, "data.sqlite3")
+DB_PATH = os.environ.get("SHOVO_DB_PATH") or os.path.join(APP_ROOT, "data.sqlite3")
+# Deployments run ``python database.py`` once per deploy and set this to 0, so respawned
+# workers start without touching the schema.
+MIGRATE_ON_START = os.environ.get("SHOVO_MIGRATE_ON_START", "1").lower() in {"1", "true", "yes", "on"}
+# Bump whenever migrate_db changes, so existing databases run it again.
+SCHEMA_VERSION = 4
+# Durability of commits, per connection: FULL (SQLite's default), NORMAL or OFF. In WAL
+# mode NORMAL only risks the last commits on power loss, never corruption.
+SYNCHRONOUS = os.environ.get("SHOVO_SYNCHRONOUS", "").upper()
+# ``wal`` lets readers run alongside the writer. Stored in the database file, so it is set
+# when the schema is migrated; empty leaves the file as it is.
+JOURNAL_MODE = os.environ.get("SHOVO_JOURNAL_MODE", "").lower()
 CACHE_TTL_SECONDS = 60 * 60
+# Seasons that have finished airing never change, the current one can gain episodes.
+FINISHED_SEASON_TTL_SECONDS = 30 * 24 * 60 * 60
+CURRENT_SEASON_TTL_SECONDS = CACHE_TTL_SECONDS
+
+
+def connect(path: str | None = None, **kwargs: Any) -> sqlite3.Connection:
+    """Open a connection to ``path`` (default ``DB_PATH``) with the configured durability."""
+    conn = sqlite3.connect(path or DB_PATH, **kwargs)
+    conn.row_factory = sqlite3.Row
+    if SYNCHRONOUS:
+        conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    return conn
+
+
+def apply_journal_mode(conn: sqlite3.Connection) -> None:
+    """Switch the database file to ``JOURNAL_MODE``, if one is configured."""
+    if JOURNAL_MODE:
+        conn.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}")
 
 
 def get_db() -> sqlite3.Connection:
     """Get database connection from Flask's g object or create new one."""
     if "db" not in g:
-        g.db = sqlite3.connect(DB_PATH)
-        g.db.row_factory = sqlite3.Row
+        g.db = connect()
     return g.db
 
 
@@ -31,16 +69,26 @@ def close_db(e=None) -> None:
 @contextmanager
 def get_db_context() -> Generator[sqlite3.Connection, None, None]:
     """Context manager for database connections outside of request context."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = connect()
     try:
         yield conn
     finally:
         conn.close()
 
 
-def migrate_db(conn: sqlite3.Connection) -> None:
-    """Run database migrations."""
+def schema_version(conn: sqlite3.Connection) -> int:
+    """The schema version recorded in the database's ``user_version``."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate_db(conn: sqlite3.Connection, force: bool = False) -> None:
+    """Run database migrations.
+
+    A database already at ``SCHEMA_VERSION`` costs a single ``PRAGMA`` read, so this is
+    cheap enough to call on every request. ``force`` runs every check regardless.
+    """
+    if not force and schema_version(conn) >= SCHEMA_VERSION:
+        return
     conn.executescript(
         """
         CREATE TABLE IF NOT EXISTS lists (
@@ -62,7 +110,11 @@ def migrate_db(conn: sqlite3.Connection) -> None:
             title_id TEXT PRIMARY KEY,
             rating TEXT,
             rotten_tomatoes TEXT,
-            cached_at INTEGER NOT NULL
+            cached_at INTEGER NOT NULL,
+            expires_at INTEGER,
+            ttl_policy TEXT,
+            stable_count INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'ok'
         );
 
         CREATE TABLE IF NOT EXISTS metadata_cache (
@@ -72,17 +124,60 @@ def migrate_db(conn: sqlite3.Connection) -> None:
             total_episodes INTEGER,
             avg_episode_length INTEGER,
             original_language TEXT,
-            cached_at INTEGER NOT NULL
+            cached_at INTEGER NOT NULL,
+            expires_at INTEGER,
+            ttl_policy TEXT,
+            stable_count INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'ok'
+        );
+
+        CREATE TABLE IF NOT EXISTS season_cache (
+            title_id TEXT NOT NULL,
+            season INTEGER NOT NULL,
+            episodes INTEGER NOT NULL,
+            finished INTEGER NOT NULL DEFAULT 0,
+            cached_at INTEGER NOT NULL,
+            PRIMARY KEY (title_id, season)
+        );
+
+        CREATE TABLE IF NOT EXISTS room_activity (
+            room TEXT PRIMARY KEY,
+            last_seen INTEGER NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS applied_ops (
+            room TEXT NOT NULL,
+            op_id TEXT NOT NULL,
+            applied_at INTEGER NOT NULL,
+            PRIMARY KEY (room, op_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS upstream_quota (
+            upstream TEXT NOT NULL,
+            day TEXT NOT NULL,
+            used INTEGER NOT NULL,
+            PRIMARY KEY (upstream, day)
         );
         """
     )
     columns = {row["name"] for row in conn.execute("PRAGMA table_info(lists)")}
     if "watched" not in columns:
         conn.execute("ALTER TABLE lists ADD COLUMN watched INTEGER NOT NULL DEFAULT 0")
-    conn.execute("UPDATE lists SET watched = 0 WHERE watched IS NULL")
     columns = {row["name"] for row in conn.execute("PRAGMA table_info(lists)")}
     if "position" not in columns:
         conn.execute("ALTER TABLE lists ADD COLUMN position INTEGER")
+    # Only rows that still need fixing up are indexed, so the checks below stay cheap
+    # however many rooms there are.
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_lists_needs_backfill ON lists (room)
+        WHERE position IS NULL OR position = 0 OR watched IS NULL
+        """
+    )
+    conn.execute("UPDATE lists SET watched = 0 WHERE watched IS NULL")
+    # Serves the next position for an add (MAX(position) per tab) and the list pages.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lists_room_watched_position ON lists (room, watched, position)")
+    if "position" not in columns:
         _backfill_positions(conn, force=True)
     else:
         conn.execute("UPDATE lists SET position = NULL WHERE position = 0")
@@ -113,11 +208,32 @@ def migrate_db(conn: sqlite3.Connection) -> None:
         conn.execute("ALTER TABLE metadata_cache ADD COLUMN avg_episode_length INTEGER")
     if "original_language" not in metadata_columns:
         conn.execute("ALTER TABLE metadata_cache ADD COLUMN original_language TEXT")
+    for table, table_columns in (("rating_cache", rating_columns), ("metadata_cache", metadata_columns)):
+        if "expires_at" not in table_columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN expires_at INTEGER")
+        if "ttl_policy" not in table_columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN ttl_policy TEXT")
+        if "stable_count" not in table_columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN stable_count INTEGER NOT NULL DEFAULT 0")
+        if "status" not in table_columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN status TEXT NOT NULL DEFAULT 'ok'")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
 
 
 def _backfill_positions(conn: sqlite3.Connection, force: bool = False) -> None:
-    """Backfill position values for list items."""
-    rooms = [row["room"] for row in conn.execute("SELECT DISTINCT room FROM lists")]
+    """Backfill position values for list items.
+
+    Without ``force`` only rooms that have items without a position are visited.
+    """
+    # Without INDEXED BY the planner prefers scanning all of idx_lists_room_watched_position,
+    # which is sorted by room.
+    query = (
+        "SELECT DISTINCT room FROM lists"
+        if force
+        else "SELECT DISTINCT room FROM lists INDEXED BY idx_lists_needs_backfill WHERE position IS NULL"
+    )
+    rooms = [row["room"] for row in conn.execute(query)]
     for room in rooms:
         if force:
             rows = conn.execute(
@@ -148,19 +264,134 @@ def _backfill_positions(conn: sqlite3.Connection, force: bool = False) -> None:
 def init_db() -> None:
     """Initialize the database with migrations."""
     with get_db_context() as conn:
+        apply_journal_mode(conn)
         migrate_db(conn)
         conn.commit()
 
 
-def rating_cache_get(conn: sqlite3.Connection, title_id: str) -> tuple[str | None, str | None] | None:
-    """Get cached rating for a title."""
+ACTIVITY_WRITE_INTERVAL_SECONDS = 300
+ACTIVITY_MEMO_MAX_ROOMS = 10000
+_activity_lock = threading.Lock()
+# Room -> last write, oldest first. Entries older than the interval no longer matter.
+_activity_written: dict[str, float] = {}
+
+
+def room_activity_due(room: str) -> bool:
+    """Whether opening ``room`` should be recorded: at most once per room every few minutes.
+
+    A True answer counts as recorded, so concurrent requests for the room write it once.
+    """
+    now = time.time()
+    with _activity_lock:
+        if now - _activity_written.get(room, 0.0) < ACTIVITY_WRITE_INTERVAL_SECONDS:
+            return False
+        _activity_written.pop(room, None)
+        while _activity_written:
+            oldest = next(iter(_activity_written))
+            expired = now - _activity_written[oldest] >= ACTIVITY_WRITE_INTERVAL_SECONDS
+            if not expired and len(_activity_written) < ACTIVITY_MEMO_MAX_ROOMS:
+                break
+            del _activity_written[oldest]
+        _activity_written[room] = now
+    return True
+
+
+def record_room_activity(conn: sqlite3.Connection, room: str) -> None:
+    """Note that a room was opened, for the cache warmer; the caller commits."""
+    conn.execute(
+        """
+        INSERT INTO room_activity (room, last_seen) VALUES (?, ?)
+        ON CONFLICT(room) DO UPDATE SET last_seen = excluded.last_seen
+        """,
+        (room, int(time.time())),
+    )
+
+
+def upstream_quota_take(conn: sqlite3.Connection, upstream: str, day: str, limit: int) -> bool:
+    """Count one call against ``upstream``'s quota for ``day``; False once ``limit`` is used up.
+
+    A single statement, so worker processes sharing the database never overshoot the limit.
+    """
+    if limit <= 0:
+        return False
+    taken = conn.execute(
+        """
+        INSERT INTO upstream_quota (upstream, day, used) VALUES (?, ?, 1)
+        ON CONFLICT (upstream, day) DO UPDATE SET used = used + 1 WHERE used < ?
+        """,
+        (upstream, day, limit),
+    ).rowcount
+    conn.commit()
+    return taken > 0
+
+
+def upstream_quota_used(conn: sqlite3.Connection, upstream: str, day: str) -> int:
+    """Calls counted against ``upstream``'s quota for ``day``."""
+    row = conn.execute("SELECT used FROM upstream_quota WHERE upstream = ? AND day = ?", (upstream, day)).fetchone()
+    return int(row["used"]) if row else 0
+
+
+def upstream_quota_prune(conn: sqlite3.Connection, upstream: str, day: str) -> None:
+    """Forget ``upstream``'s counters for days before ``day``."""
+    conn.execute("DELETE FROM upstream_quota WHERE upstream = ? AND day < ?", (upstream, day))
+    conn.commit()
+
+
+def update_list_details(conn: sqlite3.Connection, room: str, title_id: str, details: TitleDetails) -> None:
+    """Fill a list row's ratings and metadata, keeping existing values where details are missing."""
+    conn.execute(
+        """
+        UPDATE lists
+        SET rating = COALESCE(?, rating),
+            rotten_tomatoes = COALESCE(?, rotten_tomatoes),
+            runtime_minutes = COALESCE(?, runtime_minutes),
+            total_seasons = COALESCE(?, total_seasons),
+            total_episodes = COALESCE(?, total_episodes),
+            avg_episode_length = COALESCE(?, avg_episode_length),
+            original_language = COALESCE(?, original_language)
+        WHERE room = ? AND title_id = ?
+        """,
+        (*details.ratings(), *details.metadata(), room, title_id),
+    )
+
+
+def _cache_row_fresh(row: sqlite3.Row) -> bool:
+    """Check a cache row against its stored expiry (or the flat TTL for older rows)."""
+    expires_at = row["expires_at"]
+    if expires_at is None:
+        expires_at = int(row["cached_at"]) + CACHE_TTL_SECONDS
+    return int(expires_at) >= int(time.time())
+
+
+def _cache_entry_expiry(
+    previous: sqlite3.Row | None,
+    values: tuple,
+    context: CacheEntryContext,
+) -> tuple[int, int, str, int]:
+    """Work out ``cached_at``, ``expires_at``, policy name and stable count for a new entry.
+
+    ``values`` ends with the entry's status, so a switch between ``ok`` and ``error`` with the
+    same values counts as a change.
+    """
+    if previous is not None:
+        context.changed = tuple(previous[index] for index in range(len(values))) != values
+        context.stable_count = 0 if context.changed else int(previous["stable_count"] or 0) + 1
+    policy = get_ttl_policy()
+    now = int(time.time())
+    return now, now + policy.ttl_seconds(context), policy.name, context.stable_count
+
+
+def rating_cache_get(
+    conn: sqlite3.Connection, title_id: str, allow_stale: bool = False
+) -> tuple[str | None, str | None] | None:
+    """Get cached rating for a title; expired entries are returned only with ``allow_stale``."""
     row = conn.execute(
-        "SELECT rating, rotten_tomatoes, cached_at FROM rating_cache WHERE title_id = ?",
+        "SELECT rating, rotten_tomatoes, cached_at, expires_at FROM rating_cache WHERE title_id = ?",
         (title_id,),
     ).fetchone()
     if not row:
         return None
-    if int(row["cached_at"]) + CACHE_TTL_SECONDS < int(time.time()):
+    if not allow_stale and not _cache_row_fresh(row):
         return None
     return row["rating"], row["rotten_tomatoes"]
 
@@ -170,28 +401,42 @@ def rating_cache_set(
     title_id: str,
     rating: str | None,
     rotten_tomatoes: str | None,
+    year: int | None = None,
+    normalized_type: str | None = None,
+    status: str = "ok",
 ) -> None:
-    """Set cached rating for a title."""
+    """Set cached rating for a title, with a lifetime chosen by the active TTL policy."""
+    previous = conn.execute(
+        "SELECT rating, rotten_tomatoes, status, stable_count FROM rating_cache WHERE title_id = ?",
+        (title_id,),
+    ).fetchone()
+    context = CacheEntryContext("rating", year=year, normalized_type=normalized_type, status=status)
+    expiry = _cache_entry_expiry(previous, (rating, rotten_tomatoes, status), context)
     conn.execute(
-        "REPLACE INTO rating_cache (title_id, rating, rotten_tomatoes, cached_at) VALUES (?, ?, ?, ?)",
-        (title_id, rating, rotten_tomatoes, int(time.time())),
+        """
+        REPLACE INTO rating_cache (
+            title_id, rating, rotten_tomatoes, cached_at, expires_at, ttl_policy, stable_count, status
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (title_id, rating, rotten_tomatoes, *expiry, status),
     )
 
 
 def metadata_cache_get(
-    conn: sqlite3.Connection, title_id: str
+    conn: sqlite3.Connection, title_id: str, allow_stale: bool = False
 ) -> tuple[int | None, int | None, int | None, int | None, str | None] | None:
-    """Get cached metadata for a title."""
+    """Get cached metadata for a title; expired entries are returned only with ``allow_stale``."""
     row = conn.execute(
         """
-        SELECT runtime_minutes, total_seasons, total_episodes, avg_episode_length, original_language, cached_at
+        SELECT runtime_minutes, total_seasons, total_episodes, avg_episode_length, original_language,
+            cached_at, expires_at
         FROM metadata_cache WHERE title_id = ?
         """,
         (title_id,),
     ).fetchone()
     if not row:
         return None
-    if int(row["cached_at"]) + CACHE_TTL_SECONDS < int(time.time()):
+    if not allow_stale and not _cache_row_fresh(row):
         return None
     return (
         row["runtime_minutes"],
@@ -210,22 +455,71 @@ def metadata_cache_set(
     total_episodes: int | None,
     avg_episode_length: int | None,
     original_language: str | None,
+    year: int | None = None,
+    normalized_type: str | None = None,
+    status: str = "ok",
 ) -> None:
-    """Set cached metadata for a title."""
+    """Set cached metadata for a title, with a lifetime chosen by the active TTL policy."""
+    values = (runtime_minutes, total_seasons, total_episodes, avg_episode_length, original_language)
+    previous = conn.execute(
+        """
+        SELECT runtime_minutes, total_seasons, total_episodes, avg_episode_length, original_language,
+            status, stable_count
+        FROM metadata_cache WHERE title_id = ?
+        """,
+        (title_id,),
+    ).fetchone()
+    context = CacheEntryContext("metadata", year=year, normalized_type=normalized_type, status=status)
+    expiry = _cache_entry_expiry(previous, (*values, status), context)
     conn.execute(
         """
         REPLACE INTO metadata_cache (
             title_id, runtime_minutes, total_seasons, total_episodes, avg_episode_length,
-            original_language, cached_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            original_language, cached_at, expires_at, ttl_policy, stable_count, status
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
-        (
-            title_id,
-            runtime_minutes,
-            total_seasons,
-            total_episodes,
-            avg_episode_length,
-            original_language,
-            int(time.time()),
-        ),
+        (title_id, *values, *expiry, status),
+    )
+
+
+def season_cache_get(conn: sqlite3.Connection, title_id: str) -> dict[int, int]:
+    """Get fresh cached episode counts per season for a title."""
+    now = int(time.time())
+    rows = conn.execute(
+        "SELECT season, episodes, finished, cached_at FROM season_cache WHERE title_id = ?",
+        (title_id,),
+    ).fetchall()
+    counts: dict[int, int] = {}
+    for row in rows:
+        ttl = FINISHED_SEASON_TTL_SECONDS if row["finished"] else CURRENT_SEASON_TTL_SECONDS
+        if int(row["cached_at"]) + ttl >= now:
+            counts[int(row["season"])] = int(row["episodes"])
+    return counts
+
+
+def season_cache_set(conn: sqlite3.Connection, title_id: str, season: int, episodes: int, finished: bool) -> None:
+    """Set the cached episode count for one season of a title."""
+    conn.execute(
+        "REPLACE INTO season_cache (title_id, season, episodes, finished, cached_at) VALUES (?, ?, ?, ?, ?)",
+        (title_id, season, episodes, 1 if finished else 0, int(time.time())),
     )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Migrate the database to the current schema.")
+    parser.add_argument("--db", default=DB_PATH, help=f"database file (default: {DB_PATH})")
+    parser.add_argument("--force", action="store_true", help="run every migration check even if up to date")
+    args = parser.parse_args(argv)
+    conn = connect(args.db)
+    try:
+        apply_journal_mode(conn)
+        previous = schema_version(conn)
+        migrate_db(conn, force=args.force)
+        print(f"{args.db}: schema version {schema_version(conn)} (was {previous})")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
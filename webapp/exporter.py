@@ -0,0 +1,134 @@
+"""Streaming export of lists as NDJSON or CSV.
+
+Rows are read from the cursor one at a time and written out as they arrive, so memory use
+does not grow with the size of a room. The same generators back ``/api/list/export`` and the
+backup command::
+
+    python -m webapp.exporter [--room ROOM] [--format ndjson|csv] [--output FILE]
+
+Without ``--room`` every room is exported, with a ``room`` field on each row. NDJSON exports
+of a single room can be fed back into ``/api/list/import``.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sqlite3
+import sys
+from typing import Iterator
+
+# Support both package and standalone imports
+try:
+    from .database import get_db_context, migrate_db
+except ImportError:
+    from database import get_db_context, migrate_db
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_COLUMNS = (
+    "title_id",
+    "title",
+    "year",
+    "original_language",
+    "type_label",
+    "image",
+    "rating",
+    "rotten_tomatoes",
+    "runtime_minutes",
+    "total_seasons",
+    "total_episodes",
+    "avg_episode_length",
+    "watched",
+    "position",
+    "added_at",
+)
+FETCH_SIZE = 500
+
+
+def export_columns(room: str | None) -> tuple[str, ...]:
+    """Columns of an export; whole-database backups also carry the room."""
+    return EXPORT_COLUMNS if room else ("room", *EXPORT_COLUMNS)
+
+
+def iter_list_rows(
+    conn: sqlite3.Connection, room: str | None = None, watched: int | None = None
+) -> Iterator[sqlite3.Row]:
+    """Yield list rows in display order, a batch of ``FETCH_SIZE`` at a time."""
+    columns = export_columns(room)
+    conditions, params = [], []
+    if room:
+        conditions.append("room = ?")
+        params.append(room)
+    if watched is not None:
+        conditions.append("watched = ?")
+        params.append(watched)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor = conn.execute(
+        f"""
+        SELECT {', '.join(columns)} FROM lists {where}
+        ORDER BY room, watched, (position IS NULL) ASC, position DESC, added_at DESC
+        """,
+        params,
+    )
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def _ndjson_lines(rows: Iterator[sqlite3.Row]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(row), ensure_ascii=False) + "\n"
+
+
+def _csv_lines(rows: Iterator[sqlite3.Row], columns: tuple[str, ...]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(tuple(row))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_lines(rows: Iterator[sqlite3.Row], export_format: str, columns: tuple[str, ...]) -> Iterator[str]:
+    """Serialize rows as NDJSON or CSV lines."""
+    if export_format == "csv":
+        return _csv_lines(rows, columns)
+    return _ndjson_lines(rows)
+
+
+def stream_export(room: str | None, export_format: str, watched: int | None = None) -> Iterator[str]:
+    """Export rows using a connection of its own.
+
+    A streamed response is still being read after the request has finished, so it cannot
+    use the request's connection.
+    """
+    with get_db_context() as conn:
+        migrate_db(conn)
+        yield from export_lines(iter_list_rows(conn, room, watched), export_format, export_columns(room))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export lists as NDJSON or CSV.")
+    parser.add_argument("--room", help="export one room (default: every room)")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    args = parser.parse_args(argv)
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        for line in stream_export(args.room, args.format):
+            output.write(line)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
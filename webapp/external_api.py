@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import datetime
 import json
 import os
 import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Iterable
 
 import requests
 
 # Support both package and standalone imports
 try:
+    from .cache_policy import parse_year
     from .database import (
         get_db_context,
         metadata_cache_get,
@@ -16,9 +20,13 @@ try:
         migrate_db,
         rating_cache_get,
         rating_cache_set,
+        season_cache_get,
+        season_cache_set,
     )
-    from .models import SearchResult
+    from .models import SearchResult, TitleDetails
+    from .upstream import Deadline, UpstreamUnavailable, iter_body, upstream_get
 except ImportError:
+    from cache_policy import parse_year
     from database import (
         get_db_context,
         metadata_cache_get,
@@ -26,17 +34,41 @@ except ImportError:
         migrate_db,
         rating_cache_get,
         rating_cache_set,
+        season_cache_get,
+        season_cache_set,
     )
-    from models import SearchResult
+    from models import SearchResult, TitleDetails
+    from upstream import Deadline, UpstreamUnavailable, iter_body, upstream_get
 
 IMDB_SUGGESTION_URL = "https://v3.sg.media-imdb.com/suggestion/{first}/{query}.json"
 IMDB_TITLE_URL = "https://www.imdb.com/title/{title_id}/"
 IMDB_TRENDING_URL = "https://www.imdb.com/chart/moviemeter/"
 OMDB_URL = "https://www.omdbapi.com/"
+# Point every upstream at the offline simulator (benchmarks/upstream_sim.py).
+UPSTREAM_SIM_URL = os.environ.get("SHOVO_UPSTREAM_SIM", "").rstrip("/")
+if UPSTREAM_SIM_URL:
+    IMDB_SUGGESTION_URL = UPSTREAM_SIM_URL + "/suggestion/{first}/{query}.json"
+    IMDB_TITLE_URL = UPSTREAM_SIM_URL + "/title/{title_id}/"
+    IMDB_TRENDING_URL = UPSTREAM_SIM_URL + "/chart/moviemeter/"
+    OMDB_URL = UPSTREAM_SIM_URL + "/omdb/"
 DEFAULT_USER_AGENT = "shovo-movielist/1.0 (+https://example.com)"
 MAX_RESULTS = 10
 ALLOWED_TYPE_LABELS = {"feature", "movie", "tvseries", "tvminiseries", "tvmovie"}
+IMDB_CHUNK_SIZE = 16 * 1024
+SEASON_FETCH_CONCURRENCY = int(os.environ.get("SHOVO_SEASON_FETCH_CONCURRENCY", "4"))
+SEASON_SETTLE_DAYS = 14
+LD_JSON_START = b'<script type="application/ld+json">'
+LD_JSON_END = b"</script>"
 OMDB_API_KEY = os.environ.get("OMDB_API_KEY", "thewdb")
+# "imdb": take rating, runtime and type from the IMDB page and ask OMDB only for gaps.
+# "omdb": always ask OMDB and prefer its metadata (the original behaviour).
+ENRICHMENT_MODE = os.environ.get("SHOVO_ENRICHMENT_MODE", "imdb")
+OMDB_FIELDS = ("rotten_tomatoes", "original_language", "runtime_minutes", "total_seasons")
+OMDB_GAP_FIELDS = {
+    field.strip()
+    for field in os.environ.get("SHOVO_OMDB_GAP_FIELDS", ",".join(OMDB_FIELDS)).split(",")
+    if field.strip()
+}
 
 
 def normalize_type_label(type_label: str | None) -> str:
@@ -60,39 +92,22 @@ def shrink_image_url(url: str | None) -> str | None:
     )
 
 
-def _fetch_rotten_tomatoes(title_id: str, user_agent: str) -> str | None:
-    """Fetch Rotten Tomatoes rating from OMDB API."""
-    if not OMDB_API_KEY:
-        return None
-    response = requests.get(
-        OMDB_URL,
-        params={"i": title_id, "apikey": OMDB_API_KEY},
-        headers={"User-Agent": user_agent},
-        timeout=10,
-    )
-    response.raise_for_status()
-    payload = response.json()
-    if payload.get("Response") != "True":
-        return None
-    ratings = payload.get("Ratings") or []
-    for rating in ratings:
-        if rating.get("Source") == "Rotten Tomatoes":
-            return rating.get("Value")
-    return None
-
-
-def _fetch_omdb_title(title_id: str, user_agent: str, season: int | None = None) -> dict[str, Any]:
+def _fetch_omdb_title(
+    title_id: str, user_agent: str, season: int | None = None, deadline: Deadline | None = None
+) -> dict[str, Any]:
     """Fetch title info from OMDB API."""
     if not OMDB_API_KEY:
         return {}
     params: dict[str, Any] = {"i": title_id, "apikey": OMDB_API_KEY}
     if season is not None:
         params["Season"] = season
-    response = requests.get(
+    response = upstream_get(
+        "omdb",
         OMDB_URL,
         params=params,
         headers={"User-Agent": user_agent},
         timeout=10,
+        deadline=deadline,
     )
     response.raise_for_status()
     payload = response.json()
@@ -119,11 +134,97 @@ def _parse_original_language(value: str | None) -> str | None:
     return language or None
 
 
-def _fetch_metadata(
-    title_id: str, user_agent: str, normalized_type: str
+def _parse_rotten_tomatoes(payload: dict[str, Any]) -> str | None:
+    """Extract the Rotten Tomatoes rating from an OMDB title payload."""
+    ratings = payload.get("Ratings") or []
+    for rating in ratings:
+        if rating.get("Source") == "Rotten Tomatoes":
+            return rating.get("Value")
+    return None
+
+
+def _season_finished(season: int, total_seasons: int, episodes: list[dict[str, Any]]) -> bool:
+    """A season has finished airing once a later season exists or its last episode aired a while ago."""
+    if not episodes:
+        return False
+    if season < total_seasons:
+        return True
+    cutoff = datetime.date.today() - datetime.timedelta(days=SEASON_SETTLE_DAYS)
+    for episode in episodes:
+        try:
+            released = datetime.date.fromisoformat(episode.get("Released") or "")
+        except ValueError:
+            return False
+        if released > cutoff:
+            return False
+    return True
+
+
+def _fetch_season(
+    title_id: str, user_agent: str, season: int, total_seasons: int, deadline: Deadline | None = None
+) -> tuple[int, bool]:
+    """Fetch one season from OMDB and return its episode count and whether it has finished."""
+    payload = _fetch_omdb_title(title_id, user_agent, season=season, deadline=deadline)
+    episodes = payload.get("Episodes") or []
+    return len(episodes), _season_finished(season, total_seasons, episodes)
+
+
+def _count_episodes(
+    conn: sqlite3.Connection,
+    title_id: str,
+    user_agent: str,
+    total_seasons: int,
+    deadline: Deadline | None = None,
+) -> int | None:
+    """Count a series' episodes from the per-season cache.
+
+    Seasons missing from the cache are fetched concurrently and cached individually, so a
+    refresh usually costs at most one call for the season still airing. Returns None when
+    any season could not be fetched.
+
+    The cache is only written once every fetch has finished: a write transaction held
+    open meanwhile would block the OMDB quota counter used by the queued fetches.
+    """
+    counts = season_cache_get(conn, title_id)
+    missing = [season for season in range(1, total_seasons + 1) if season not in counts]
+    complete = True
+    if missing:
+        fetched: list[tuple[int, int, bool]] = []
+        with ThreadPoolExecutor(max_workers=min(SEASON_FETCH_CONCURRENCY, len(missing))) as executor:
+            futures = {
+                season: executor.submit(_fetch_season, title_id, user_agent, season, total_seasons, deadline)
+                for season in missing
+            }
+            for season, future in futures.items():
+                try:
+                    episodes, finished = future.result()
+                except requests.RequestException:
+                    complete = False
+                    continue
+                fetched.append((season, episodes, finished))
+        for season, episodes, finished in fetched:
+            counts[season] = episodes
+            season_cache_set(conn, title_id, season, episodes, finished)
+        conn.commit()
+    if not complete:
+        return None
+    total_episodes = sum(counts[season] for season in range(1, total_seasons + 1))
+    return total_episodes or None
+
+
+def _metadata_from_omdb(
+    conn: sqlite3.Connection,
+    title_id: str,
+    user_agent: str,
+    normalized_type: str,
+    payload: dict[str, Any],
+    deadline: Deadline | None = None,
 ) -> tuple[int | None, int | None, int | None, int | None, str | None]:
-    """Fetch metadata from OMDB API."""
-    payload = _fetch_omdb_title(title_id, user_agent)
+    """Build metadata from an OMDB title payload.
+
+    Miniseries also need per-season episode counts (see ``_count_episodes``). If a season
+    cannot be fetched, ``total_episodes`` is left unknown and the rest is returned.
+    """
     runtime_minutes = _parse_runtime(payload.get("Runtime"))
     original_language = _parse_original_language(payload.get("Language"))
     total_seasons = payload.get("totalSeasons")
@@ -134,68 +235,246 @@ def _fetch_metadata(
     avg_episode_length = runtime_minutes if normalized_type in {"tvseries", "tvminiseries"} else None
     total_episodes = None
     if normalized_type == "tvminiseries" and total_seasons_int:
-        total_episodes_count = 0
-        for season in range(1, total_seasons_int + 1):
-            season_payload = _fetch_omdb_title(title_id, user_agent, season=season)
-            episodes = season_payload.get("Episodes") or []
-            total_episodes_count += len(episodes)
-        total_episodes = total_episodes_count if total_episodes_count else None
+        total_episodes = _count_episodes(conn, title_id, user_agent, total_seasons_int, deadline)
     return runtime_minutes, total_seasons_int, total_episodes, avg_episode_length, original_language
 
 
-def get_metadata(
-    title_id: str, user_agent: str, normalized_type: str
+def _parse_iso_duration(value: Any) -> int | None:
+    """Parse an ISO-8601 duration such as ``PT2H22M`` to whole minutes."""
+    if not isinstance(value, str):
+        return None
+    match = re.fullmatch(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?", value.strip())
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes, seconds = (int(group) if group else 0 for group in match.groups())
+    total = days * 24 * 60 + hours * 60 + minutes + seconds // 60
+    return total or None
+
+
+def _extract_ld_json(chunks: Iterable[bytes]) -> str | None:
+    """Return the first ld+json script body from a stream of HTML chunks.
+
+    Stops consuming ``chunks`` as soon as the closing tag has been seen, so callers can
+    drop the connection without downloading the rest of the page. Only a marker-sized tail
+    of the bytes before the script is kept in memory.
+    """
+    buffer = b""
+    start = -1
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+        if start < 0:
+            start = buffer.find(LD_JSON_START)
+            if start < 0:
+                buffer = buffer[-(len(LD_JSON_START) - 1) :]
+                continue
+            buffer = buffer[start + len(LD_JSON_START) :]
+        end = buffer.find(LD_JSON_END)
+        if end >= 0:
+            return buffer[:end].decode("utf-8", errors="replace")
+    return None
+
+
+def _structured_data_fields(raw_json: str | None) -> dict[str, Any]:
+    """Extract rating, runtime, type and year from an ld+json document."""
+    if not raw_json:
+        return {}
+    try:
+        data = json.loads(raw_json)
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    rating = (data.get("aggregateRating") or {}).get("ratingValue")
+    normalized_type = normalize_type_label(data.get("@type"))
+    date_published = str(data.get("datePublished") or "")
+    return {
+        "rating": str(rating) if rating is not None else None,
+        "runtime_minutes": _parse_iso_duration(data.get("duration")),
+        "type": normalized_type if normalized_type in ALLOWED_TYPE_LABELS else None,
+        "year": date_published[:4] if date_published[:4].isdigit() else None,
+    }
+
+
+def _parse_imdb_structured_data(html: str) -> dict[str, Any]:
+    """Extract rating, runtime, type and year from an IMDB title page's ld+json block."""
+    return _structured_data_fields(_extract_ld_json([html.encode("utf-8")]))
+
+
+def _fetch_imdb_title(title_id: str, user_agent: str, deadline: Deadline | None = None) -> dict[str, Any]:
+    """Fetch an IMDB title page and parse its structured data.
+
+    The body is streamed and the connection closed once the ld+json block has been read,
+    which skips most of the page. Reading stops with ``DeadlineExceeded`` when the deadline
+    runs out part-way through the body.
+    """
+    headers = {"User-Agent": user_agent}
+    response = upstream_get(
+        "imdb",
+        IMDB_TITLE_URL.format(title_id=title_id),
+        headers=headers,
+        timeout=10,
+        deadline=deadline,
+        stream=True,
+    )
+    try:
+        response.raise_for_status()
+        return _structured_data_fields(_extract_ld_json(iter_body(response, IMDB_CHUNK_SIZE, deadline)))
+    finally:
+        response.close()
+
+
+def _omdb_gaps(imdb_data: dict[str, Any], normalized_type: str | None, omdb_cached: bool = False) -> set[str]:
+    """Fields the IMDB page could not supply that OMDB should fill.
+
+    ``omdb_cached`` means the fields OMDB supplied last time are still fresh in the caches,
+    so there is nothing to fill.
+    """
+    if ENRICHMENT_MODE == "omdb":
+        return set(OMDB_FIELDS)
+    if omdb_cached:
+        return set()
+    gaps = {"rotten_tomatoes", "original_language"}
+    if not imdb_data.get("runtime_minutes"):
+        gaps.add("runtime_minutes")
+    if normalized_type in {"tvseries", "tvminiseries"}:
+        gaps.add("total_seasons")
+    return gaps & OMDB_GAP_FIELDS
+
+
+def _merge_metadata(
+    omdb_metadata: tuple[int | None, int | None, int | None, int | None, str | None],
+    imdb_data: dict[str, Any],
+    normalized_type: str | None,
 ) -> tuple[int | None, int | None, int | None, int | None, str | None]:
-    """Get metadata for a title, using cache if available."""
-    with get_db_context() as conn:
-        migrate_db(conn)
-        cached = metadata_cache_get(conn, title_id)
-        if cached is not None:
-            return cached
+    """Combine OMDB metadata with the runtime from IMDB structured data."""
+    runtime_minutes, total_seasons, total_episodes, _, original_language = omdb_metadata
+    imdb_runtime = imdb_data.get("runtime_minutes")
+    if imdb_runtime and (ENRICHMENT_MODE != "omdb" or runtime_minutes is None):
+        runtime_minutes = imdb_runtime
+    avg_episode_length = runtime_minutes if normalized_type in {"tvseries", "tvminiseries"} else None
+    return runtime_minutes, total_seasons, total_episodes, avg_episode_length, original_language
+
+
+def _is_missing_title(exc: requests.RequestException) -> bool:
+    """True when an upstream error means the title does not exist there, not a failure."""
+    response = getattr(exc, "response", None)
+    return response is not None and response.status_code in (404, 410)
+
+
+def _cache_status(values: tuple[Any, ...], *source_statuses: str) -> str:
+    """Classify a cache entry as ``error``, ``empty`` or ``ok`` (see ``cache_policy``)."""
+    if "error" in source_statuses:
+        return "error"
+    return "empty" if all(value is None for value in values) else "ok"
+
+
+def _enrich_title(
+    conn: sqlite3.Connection,
+    title_id: str,
+    user_agent: str,
+    normalized_type: str | None,
+    deadline: Deadline | None = None,
+    cached_metadata: tuple[int | None, int | None, int | None, int | None, str | None] | None = None,
+) -> TitleDetails:
+    """Fetch ratings and metadata for a title and populate both caches together.
+
+    OMDB is asked at most once, only for what IMDB lacks (see ``_omdb_gaps``), and not at
+    all while ``cached_metadata`` is fresh and a Rotten Tomatoes value is cached. Parts
+    whose upstream is unavailable keep their stale values and are not rewritten, failed
+    fetches keep them with status ``error``, nothing is cached once the deadline has run
+    out, and the returned ``status`` says whether either upstream failed.
+    """
+    cached_ratings = rating_cache_get(conn, title_id, allow_stale=True)
+    stale_ratings = cached_ratings or (None, None)
+    stale_metadata = metadata_cache_get(conn, title_id, allow_stale=True) or (None, None, None, None, None)
+    imdb_status = omdb_status = "ok"
+    imdb_data: dict[str, Any] = {}
+    try:
+        imdb_data = _fetch_imdb_title(title_id, user_agent, deadline)
+        imdb_rating = imdb_data.get("rating")
+    except UpstreamUnavailable:
+        imdb_status = "unavailable"
+        imdb_rating = stale_ratings[0]
+    except requests.RequestException as exc:
+        imdb_status = "ok" if _is_missing_title(exc) else "error"
+        imdb_rating = None if imdb_status == "ok" else stale_ratings[0]
+    normalized_type = normalized_type or imdb_data.get("type")
+    omdb_metadata: tuple[int | None, int | None, int | None, int | None, str | None]
+    omdb_metadata = (None, None, None, None, None)
+    rotten_rating = None
+    year = parse_year(imdb_data.get("year"))
+    omdb_cached = cached_metadata is not None and cached_ratings is not None
+    gaps = _omdb_gaps(imdb_data, normalized_type, omdb_cached)
+    reuse_omdb = omdb_cached and not gaps
+    if reuse_omdb and cached_metadata is not None:
+        rotten_rating = stale_ratings[1]
+        omdb_metadata = cached_metadata
+    elif gaps:
         try:
-            metadata = _fetch_metadata(title_id, user_agent, normalized_type)
-        except requests.RequestException:
-            metadata = (None, None, None, None, None)
-        metadata_cache_set(conn, title_id, *metadata)
+            payload = _fetch_omdb_title(title_id, user_agent, deadline=deadline)
+            year = year or parse_year(payload.get("Year"))
+            rotten_rating = _parse_rotten_tomatoes(payload)
+            omdb_metadata = _metadata_from_omdb(
+                conn, title_id, user_agent, normalized_type or "", payload, deadline
+            )
+        except UpstreamUnavailable:
+            omdb_status = "unavailable"
+            rotten_rating = stale_ratings[1]
+            omdb_metadata = stale_metadata
+        except requests.RequestException as exc:
+            if not _is_missing_title(exc):
+                omdb_status = "error"
+                rotten_rating = stale_ratings[1]
+                omdb_metadata = stale_metadata
+    metadata = _merge_metadata(omdb_metadata, imdb_data, normalized_type)
+    if deadline is None or not deadline.expired:
+        if "unavailable" not in (imdb_status, omdb_status):
+            rating_status = _cache_status((imdb_rating, rotten_rating), imdb_status, omdb_status)
+            rating_cache_set(
+                conn, title_id, imdb_rating, rotten_rating, year, normalized_type, rating_status
+            )
+        if omdb_status != "unavailable" and normalized_type and not reuse_omdb:
+            metadata_status = _cache_status(metadata, omdb_status)
+            metadata_cache_set(conn, title_id, *metadata, year, normalized_type, metadata_status)
         conn.commit()
-        return metadata
+    sources = (imdb_status, omdb_status)
+    status = "unavailable" if "unavailable" in sources else "error" if "error" in sources else "ok"
+    return TitleDetails(imdb_rating, rotten_rating, *metadata, status=status)
 
 
-def _fetch_ratings(title_id: str, user_agent: str) -> tuple[str | None, str | None]:
-    """Fetch IMDB and Rotten Tomatoes ratings."""
-    headers = {"User-Agent": user_agent}
-    response = requests.get(IMDB_TITLE_URL.format(title_id=title_id), headers=headers, timeout=10)
-    response.raise_for_status()
-    match = re.search(r'<script type="application/ld\+json">(.*?)</script>', response.text, re.S)
-    if not match:
-        imdb_rating = None
-    else:
-        try:
-            data = json.loads(match.group(1))
-        except json.JSONDecodeError:
-            data = {}
-        imdb_rating = data.get("aggregateRating", {}).get("ratingValue")
-        imdb_rating = str(imdb_rating) if imdb_rating is not None else None
-    try:
-        rotten_rating = _fetch_rotten_tomatoes(title_id, user_agent)
-    except requests.RequestException:
-        rotten_rating = None
-    return imdb_rating, rotten_rating
+def get_details(
+    title_id: str, user_agent: str, normalized_type: str, deadline: Deadline | None = None
+) -> TitleDetails:
+    """Get ratings and metadata for a title, using the caches if both are fresh."""
+    with get_db_context() as conn:
+        migrate_db(conn)
+        ratings = rating_cache_get(conn, title_id)
+        metadata = metadata_cache_get(conn, title_id)
+        if ratings is not None and metadata is not None:
+            return TitleDetails(*ratings, *metadata)
+        return _enrich_title(conn, title_id, user_agent, normalized_type, deadline, metadata)
+
 
+def get_metadata(
+    title_id: str, user_agent: str, normalized_type: str, deadline: Deadline | None = None
+) -> tuple[int | None, int | None, int | None, int | None, str | None]:
+    """Get metadata for a title, using cache if available."""
+    return get_details(title_id, user_agent, normalized_type, deadline).metadata()
 
-def get_ratings(title_id: str, user_agent: str) -> tuple[str | None, str | None]:
+
+def get_ratings(
+    title_id: str, user_agent: str, deadline: Deadline | None = None
+) -> tuple[str | None, str | None]:
     """Get ratings for a title, using cache if available."""
     with get_db_context() as conn:
+        migrate_db(conn)
         cached = rating_cache_get(conn, title_id)
         if cached is not None:
             return cached
-        try:
-            imdb_rating, rotten_rating = _fetch_ratings(title_id, user_agent)
-        except requests.RequestException:
-            imdb_rating, rotten_rating = None, None
-        rating_cache_set(conn, title_id, imdb_rating, rotten_rating)
-        conn.commit()
-        return imdb_rating, rotten_rating
+        metadata = metadata_cache_get(conn, title_id)
+        return _enrich_title(conn, title_id, user_agent, None, deadline, metadata).ratings()
 
 
 def get_rating(title_id: str, user_agent: str) -> str | None:
@@ -222,35 +501,24 @@ def parse_suggestion_item(
     if normalized_type not in ALLOWED_TYPE_LABELS:
         return None
     image_url = item.get("i", {}).get("imageUrl")
-    runtime_minutes = total_seasons = total_episodes = avg_episode_length = None
-    original_language = None
-    rating = rotten_tomatoes = None
-    if include_details:
-        (
-            runtime_minutes,
-            total_seasons,
-            total_episodes,
-            avg_episode_length,
-            original_language,
-        ) = get_metadata(title_id, user_agent, normalized_type)
-        rating, rotten_tomatoes = get_ratings(title_id, user_agent)
+    details = get_details(title_id, user_agent, normalized_type) if include_details else TitleDetails()
     return SearchResult(
         title_id=title_id,
         title=item.get("l") or "Untitled",
         year=str(item.get("y")) if item.get("y") else None,
-        original_language=original_language,
+        original_language=details.original_language,
         type_label=type_label,
         image=shrink_image_url(image_url),
-        rating=rating,
-        rotten_tomatoes=rotten_tomatoes,
-        runtime_minutes=runtime_minutes,
-        total_seasons=total_seasons,
-        total_episodes=total_episodes,
-        avg_episode_length=avg_episode_length,
+        rating=details.rating,
+        rotten_tomatoes=details.rotten_tomatoes,
+        runtime_minutes=details.runtime_minutes,
+        total_seasons=details.total_seasons,
+        total_episodes=details.total_episodes,
+        avg_episode_length=details.avg_episode_length,
     )
 
 
-def fetch_suggestions(query: str, user_agent: str) -> list[SearchResult]:
+def fetch_suggestions(query: str, user_agent: str, deadline: Deadline | None = None) -> list[SearchResult]:
     """Fetch search suggestions from IMDB."""
     if not query:
         return []
@@ -260,7 +528,7 @@ def fetch_suggestions(query: str, user_agent: str) -> list[SearchResult]:
     first = safe_query[0]
     url = IMDB_SUGGESTION_URL.format(first=first, query=requests.utils.quote(safe_query))
     headers = {"User-Agent": user_agent}
-    response = requests.get(url, headers=headers, timeout=10)
+    response = upstream_get("imdb", url, headers=headers, timeout=10, deadline=deadline)
     response.raise_for_status()
     payload = response.json()
     items: Iterable[dict[str, Any]] = payload.get("d", [])
@@ -272,14 +540,14 @@ def fetch_suggestions(query: str, user_agent: str) -> list[SearchResult]:
     return results
 
 
-def fetch_title_by_id(title_id: str, user_agent: str) -> SearchResult | None:
+def fetch_title_by_id(title_id: str, user_agent: str, deadline: Deadline | None = None) -> SearchResult | None:
     """Fetch a single title by its IMDB ID."""
     if not title_id:
         return None
     first = title_id[0].lower()
     url = IMDB_SUGGESTION_URL.format(first=first, query=requests.utils.quote(title_id))
     headers = {"User-Agent": user_agent}
-    response = requests.get(url, headers=headers, timeout=10)
+    response = upstream_get("imdb", url, headers=headers, timeout=10, deadline=deadline)
     response.raise_for_status()
     payload = response.json()
     items: Iterable[dict[str, Any]] = payload.get("d", [])
@@ -289,10 +557,14 @@ def fetch_title_by_id(title_id: str, user_agent: str) -> SearchResult | None:
     return None
 
 
-def fetch_trending(user_agent: str) -> list[SearchResult]:
-    """Fetch trending titles from IMDB."""
+def fetch_trending(user_agent: str, deadline: Deadline | None = None) -> list[SearchResult]:
+    """Fetch trending titles from IMDB.
+
+    Stops early with the titles resolved so far once the deadline runs out, or when IMDB
+    becomes unavailable (circuit open, rate limited) part-way through the chart.
+    """
     headers = {"User-Agent": user_agent}
-    response = requests.get(IMDB_TRENDING_URL, headers=headers, timeout=10)
+    response = upstream_get("imdb", IMDB_TRENDING_URL, headers=headers, timeout=10, deadline=deadline)
     response.raise_for_status()
     ids = re.findall(r"/title/(tt\d+)/", response.text)
     seen: set[str] = set()
@@ -301,7 +573,10 @@ def fetch_trending(user_agent: str) -> list[SearchResult]:
         if title_id in seen:
             continue
         seen.add(title_id)
-        result = fetch_title_by_id(title_id, user_agent)
+        try:
+            result = fetch_title_by_id(title_id, user_agent, deadline)
+        except UpstreamUnavailable:
+            break
         if result:
             results.append(result)
         if len(results) >= MAX_RESULTS:
@@ -310,35 +585,11 @@ def fetch_trending(user_agent: str) -> list[SearchResult]:
 
 
 def refresh_title_details(
-    title_id: str, user_agent: str, normalized_type: str
-) -> tuple[str | None, str | None, int | None, int | None, int | None, int | None, str | None]:
-    """Refresh details for a title (ratings and metadata)."""
-    try:
-        imdb_rating, rotten_rating = _fetch_ratings(title_id, user_agent)
-    except requests.RequestException:
-        imdb_rating, rotten_rating = None, None
-    try:
-        (
-            runtime_minutes,
-            total_seasons,
-            total_episodes,
-            avg_episode_length,
-            original_language,
-        ) = _fetch_metadata(title_id, user_agent, normalized_type)
-    except requests.RequestException:
-        runtime_minutes = total_seasons = total_episodes = avg_episode_length = original_language = None
+    title_id: str, user_agent: str, normalized_type: str, deadline: Deadline | None = None
+) -> TitleDetails:
+    """Refresh details for a title (ratings and metadata), bypassing the caches.
+
+    Upstream failures do not raise: the stale values come back with a non-``ok`` status.
+    """
     with get_db_context() as conn:
-        rating_cache_set(conn, title_id, imdb_rating, rotten_rating)
-        metadata_cache_set(
-            conn, title_id, runtime_minutes, total_seasons, total_episodes, avg_episode_length, original_language
-        )
-        conn.commit()
-    return (
-        imdb_rating,
-        rotten_rating,
-        runtime_minutes,
-        total_seasons,
-        total_episodes,
-        avg_episode_length,
-        original_language,
-    )
+        return _enrich_title(conn, title_id, user_agent, normalized_type, deadline)
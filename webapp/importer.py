@@ -0,0 +1,194 @@
+"""Bulk import of watchlists from IMDb CSV exports or JSON arrays.
+
+Rows are read one at a time and validated before anything is written. Then every new
+title is inserted in a single write transaction with precomputed positions, run through
+``writer.commit_write`` like the other list mutations. The first row ends up at the top of
+the list, like the order of an IMDb watchlist.
+"""
+from __future__ import annotations
+
+import csv
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator
+
+# Support both package and standalone imports
+try:
+    from .utils import parse_watched
+except ImportError:
+    from utils import parse_watched
+
+MAX_IMPORT_ROWS = int(os.environ.get("SHOVO_IMPORT_MAX_ROWS", "5000"))
+MAX_REPORTED_ERRORS = 20
+MAX_TITLE_LENGTH = 500
+TITLE_ID_PATTERN = re.compile(r"^tt\d{7,}$")
+LIST_COLUMNS = (
+    "title_id",
+    "title",
+    "year",
+    "original_language",
+    "type_label",
+    "image",
+    "rating",
+    "rotten_tomatoes",
+    "runtime_minutes",
+    "total_seasons",
+    "total_episodes",
+    "avg_episode_length",
+    "watched",
+)
+# IMDb list and watchlist exports; other columns are ignored.
+IMDB_CSV_COLUMNS = {
+    "Const": "title_id",
+    "Title": "title",
+    "Year": "year",
+    "Title Type": "type_label",
+    "IMDb Rating": "rating",
+    "Runtime (mins)": "runtime_minutes",
+}
+
+
+class ImportTooLarge(ValueError):
+    """Raised when an import has more rows than ``MAX_IMPORT_ROWS``."""
+
+
+@dataclass
+class ImportResult:
+    """Outcome of a bulk import."""
+
+    imported: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+    missing_details: list[tuple[str, str | None]] = field(default_factory=list)
+    rows: list[dict[str, Any]] = field(default_factory=list)
+
+    def add_error(self, row_number: int, error: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": error})
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "invalid": self.invalid,
+            "errors": self.errors,
+        }
+
+
+def _optional_text(value: Any) -> str | None:
+    text = str(value).strip() if value is not None else ""
+    return text or None
+
+
+def _optional_int(value: Any) -> int | None:
+    try:
+        number = int(float(str(value).strip()))
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def _optional_rating(value: Any) -> str | None:
+    try:
+        rating = float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    return f"{rating:.1f}" if 0 < rating <= 10 else None
+
+
+def validate_item(raw: dict[str, Any]) -> dict[str, Any] | str:
+    """Normalize one imported title, or return the reason it was rejected."""
+    title_id = str(raw.get("title_id") or "").strip()
+    if not TITLE_ID_PATTERN.match(title_id):
+        return "invalid_title_id"
+    title = _optional_text(raw.get("title"))
+    if not title:
+        return "missing_title"
+    if len(title) > MAX_TITLE_LENGTH:
+        return "title_too_long"
+    return {
+        "title_id": title_id,
+        "title": title,
+        "year": _optional_text(raw.get("year")),
+        "original_language": _optional_text(raw.get("original_language")),
+        "type_label": _optional_text(raw.get("type_label")),
+        "image": _optional_text(raw.get("image")),
+        "rating": _optional_rating(raw.get("rating")),
+        "rotten_tomatoes": _optional_text(raw.get("rotten_tomatoes")),
+        "runtime_minutes": _optional_int(raw.get("runtime_minutes")),
+        "total_seasons": _optional_int(raw.get("total_seasons")),
+        "total_episodes": _optional_int(raw.get("total_episodes")),
+        "avg_episode_length": _optional_int(raw.get("avg_episode_length")),
+        "watched": parse_watched(raw.get("watched", 0)),
+    }
+
+
+def read_imdb_csv(lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """Yield rows of an IMDb CSV export, renamed to list columns."""
+    for row in csv.DictReader(lines):
+        yield {column: row.get(header) for header, column in IMDB_CSV_COLUMNS.items()}
+
+
+def validate_items(items: Iterable[Any]) -> ImportResult:
+    """Read and validate ``items``, keeping the valid rows in ``rows``.
+
+    Titles repeated in the import are skipped. Raises ``ImportTooLarge`` if there are too
+    many rows.
+    """
+    result = ImportResult()
+    seen: set[str] = set()
+    for row_number, raw in enumerate(items, start=1):
+        if row_number > MAX_IMPORT_ROWS:
+            raise ImportTooLarge(f"imports are limited to {MAX_IMPORT_ROWS} rows")
+        item = validate_item(raw) if isinstance(raw, dict) else "invalid_row"
+        if isinstance(item, str):
+            result.add_error(row_number, item)
+            continue
+        if item["title_id"] in seen:
+            result.skipped += 1
+            continue
+        seen.add(item["title_id"])
+        result.rows.append(item)
+    return result
+
+
+def import_items(conn: sqlite3.Connection, room: str, result: ImportResult) -> ImportResult:
+    """Insert the validated rows of ``result`` into ``room``; the caller commits.
+
+    Titles already in the room are skipped. The existing titles and the top positions are
+    read under the write lock (``BEGIN IMMEDIATE`` unless a transaction is already open),
+    so a concurrent add cannot take a title or a position in between.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    existing = {row["title_id"] for row in conn.execute("SELECT title_id FROM lists WHERE room = ?", (room,))}
+    rows = [row for row in result.rows if row["title_id"] not in existing]
+    result.skipped += len(result.rows) - len(rows)
+    now = int(time.time())
+    values = []
+    for watched in (0, 1):
+        group = [row for row in rows if row["watched"] == watched]
+        base = conn.execute(
+            "SELECT COALESCE(MAX(position), 0) FROM lists WHERE room = ? AND watched = ?",
+            (room, watched),
+        ).fetchone()[0]
+        for index, row in enumerate(group):
+            values.append((room, *(row[column] for column in LIST_COLUMNS), now, base + len(group) - index))
+    placeholders = ", ".join("?" for _ in range(len(LIST_COLUMNS) + 3))
+    conn.executemany(
+        f"""
+        INSERT INTO lists (room, {', '.join(LIST_COLUMNS)}, added_at, position) VALUES ({placeholders})
+        ON CONFLICT (room, title_id) DO NOTHING
+        """,
+        values,
+    )
+    result.imported = len(rows)
+    for row in rows:
+        if row["rating"] is None or row["runtime_minutes"] is None:
+            result.missing_details.append((row["title_id"], row["type_label"]))
+    return result
@@ -0,0 +1,160 @@
+"""In-process background enrichment jobs.
+
+Titles added without ratings or runtime are queued here, and a small pool of worker threads
+fills their list rows (and the rating and metadata caches) from the upstreams. The list
+render then finds the details in place instead of calling ``/api/details`` once per card.
+
+Jobs live in memory and are lost on restart. Titles that were not enriched by then are
+fetched by ``/api/details`` or the cache warmer as before.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import requests
+
+# Support both package and standalone imports
+try:
+    from .database import get_db_context, update_list_details
+    from .external_api import ALLOWED_TYPE_LABELS, get_details, normalize_type_label
+except ImportError:
+    from database import get_db_context, update_list_details
+    from external_api import ALLOWED_TYPE_LABELS, get_details, normalize_type_label
+
+ENRICH_WORKERS = int(os.environ.get("SHOVO_ENRICH_WORKERS", "2"))
+ENRICH_QUEUE_SIZE = int(os.environ.get("SHOVO_ENRICH_QUEUE_SIZE", "5000"))
+ENRICH_THREAD_PREFIX = "shovo-enrich"
+# Finished jobs are kept this long so clients can read their final progress.
+JOB_RETENTION_SECONDS = 60 * 60
+
+
+@dataclass
+class EnrichmentJob:
+    """Progress of one batch of titles being enriched."""
+
+    job_id: int
+    room: str
+    total: int = 0
+    processed: int = 0
+    failed: int = 0
+    dropped: int = 0
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.processed + self.failed + self.dropped >= self.total
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "room": self.room,
+            "total": self.total,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "done": self.done,
+        }
+
+
+_queue: queue.Queue[tuple[EnrichmentJob, str, str | None, str]] = queue.Queue(ENRICH_QUEUE_SIZE)
+_jobs: dict[int, EnrichmentJob] = {}
+_job_ids = itertools.count(1)
+_lock = threading.Lock()
+_workers: list[threading.Thread] = []
+
+
+def _record(job: EnrichmentJob, outcome: str) -> None:
+    with _lock:
+        setattr(job, outcome, getattr(job, outcome) + 1)
+        if job.done and job.finished_at is None:
+            job.finished_at = time.time()
+
+
+def _enrich(job: EnrichmentJob, title_id: str, type_label: str | None, user_agent: str) -> bool:
+    """Fill a list row's details; False when the upstreams returned nothing for it.
+
+    ``get_details`` falls back to cached values instead of raising when an upstream fails,
+    so a failed fetch shows up as a result without any values.
+    """
+    normalized_type = normalize_type_label(type_label)
+    if normalized_type not in ALLOWED_TYPE_LABELS:
+        normalized_type = "movie"
+    details = get_details(title_id, user_agent, normalized_type)
+    if details.is_empty():
+        return False
+    with get_db_context() as conn:
+        update_list_details(conn, job.room, title_id, details)
+        conn.commit()
+    return True
+
+
+def _run_worker() -> None:
+    while True:
+        job, title_id, type_label, user_agent = _queue.get()
+        try:
+            _record(job, "processed" if _enrich(job, title_id, type_label, user_agent) else "failed")
+        except (requests.RequestException, sqlite3.Error):
+            _record(job, "failed")
+        finally:
+            _queue.task_done()
+
+
+def _ensure_workers() -> None:
+    with _lock:
+        _workers[:] = [worker for worker in _workers if worker.is_alive()]
+        for index in range(len(_workers), max(ENRICH_WORKERS, 1)):
+            worker = threading.Thread(target=_run_worker, name=f"{ENRICH_THREAD_PREFIX}-{index}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+
+def _forget_finished_jobs(now: float) -> None:
+    for job_id, job in list(_jobs.items()):
+        if job.finished_at is not None and now - job.finished_at > JOB_RETENTION_SECONDS:
+            del _jobs[job_id]
+
+
+def enqueue_enrichment(room: str, items: list[tuple[str, str | None]], user_agent: str) -> EnrichmentJob:
+    """Queue ``(title_id, type_label)`` pairs of a room for background enrichment.
+
+    Titles that do not fit in the queue are counted as ``dropped``; they are fetched on
+    demand later.
+    """
+    with _lock:
+        _forget_finished_jobs(time.time())
+        job = EnrichmentJob(next(_job_ids), room, total=len(items))
+        _jobs[job.job_id] = job
+    _ensure_workers()
+    for title_id, type_label in items:
+        try:
+            _queue.put_nowait((job, title_id, type_label, user_agent))
+        except queue.Full:
+            _record(job, "dropped")
+    if not items:
+        with _lock:
+            job.finished_at = time.time()
+    return job
+
+
+def get_job(job_id: int) -> EnrichmentJob | None:
+    """Return a queued, running or recently finished job."""
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def wait_for_idle(timeout: float = 10.0) -> bool:
+    """Wait until the queue is empty and no title is being processed."""
+    expires_at = time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if time.monotonic() >= expires_at:
+            return False
+        time.sleep(0.01)
+    return True
@@ -17,3 +17,34 @@ class SearchResult:
     total_seasons: int | None
     total_episodes: int | None
     avg_episode_length: int | None
+
+
+@dataclass
+class TitleDetails:
+    rating: str | None = None
+    rotten_tomatoes: str | None = None
+    runtime_minutes: int | None = None
+    total_seasons: int | None = None
+    total_episodes: int | None = None
+    avg_episode_length: int | None = None
+    original_language: str | None = None
+    # "error" or "unavailable" when an upstream failed and cached values were kept instead.
+    status: str = "ok"
+
+    def ratings(self) -> tuple[str | None, str | None]:
+        """Values stored in the rating cache."""
+        return self.rating, self.rotten_tomatoes
+
+    def metadata(self) -> tuple[int | None, int | None, int | None, int | None, str | None]:
+        """Values stored in the metadata cache."""
+        return (
+            self.runtime_minutes,
+            self.total_seasons,
+            self.total_episodes,
+            self.avg_episode_length,
+            self.original_language,
+        )
+
+    def is_empty(self) -> bool:
+        """True when no rating or metadata is known."""
+        return all(value is None for value in (*self.ratings(), *self.metadata()))
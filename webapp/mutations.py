@@ -0,0 +1,212 @@
+"""List mutations, applied one at a time or as an atomic batch.
+
+The single-title endpoints and ``POST /api/list/batch`` share these helpers. None of them
+commit: routes run them through ``writer.commit_write``. A batch is validated completely
+before anything is written, then applied in order in one transaction, so it either
+succeeds as a whole or changes nothing.
+
+Every batch operation carries a client-chosen ``op_id``. Ids are recorded per room in
+``applied_ops``, and operations whose id is already there are skipped, so a batch can be
+resent safely after a lost response (as the service worker's offline queue does).
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+# Support both package and standalone imports
+try:
+    from .utils import parse_watched
+except ImportError:
+    from utils import parse_watched
+
+MAX_BATCH_OPS = int(os.environ.get("SHOVO_BATCH_MAX_OPS", "200"))
+MAX_OP_ID_LENGTH = 64
+# Long enough for any offline queue to come back; older ids are forgotten.
+APPLIED_OP_RETENTION_SECONDS = 30 * 24 * 60 * 60
+
+
+# Details a re-add does not send are kept from the existing row.
+_ADD_DETAIL_COLUMNS = (
+    "year",
+    "original_language",
+    "type_label",
+    "image",
+    "rating",
+    "rotten_tomatoes",
+    "runtime_minutes",
+    "total_seasons",
+    "total_episodes",
+    "avg_episode_length",
+)
+_ADD_SQL = f"""
+    INSERT INTO lists (room, title_id, title, {", ".join(_ADD_DETAIL_COLUMNS)}, added_at, watched, position)
+    VALUES (?, ?, ?, {", ".join("?" for _ in _ADD_DETAIL_COLUMNS)}, ?, ?, (
+        SELECT COALESCE(MAX(position), 0) + 1 FROM lists WHERE room = ? AND watched = ?
+    ))
+    ON CONFLICT (room, title_id) DO UPDATE SET
+        title = excluded.title,
+        {", ".join(f"{column} = COALESCE(excluded.{column}, {column})" for column in _ADD_DETAIL_COLUMNS)},
+        position = CASE WHEN watched = excluded.watched THEN position ELSE excluded.position END,
+        watched = excluded.watched
+"""
+
+
+def add_title(conn: sqlite3.Connection, room: str, data: dict[str, Any]) -> None:
+    """Add a title at the top of its tab, or update it if it is already in the room.
+
+    One statement: the new position is read under the same write lock as the insert, so
+    concurrent adds cannot get the same one. A title that is already listed keeps its
+    ``added_at``, its position (unless it moves to the other tab, where it goes on top)
+    and any details the request leaves out.
+    """
+    watched = parse_watched(data.get("watched", 0))
+    conn.execute(
+        _ADD_SQL,
+        (
+            room,
+            data["title_id"],
+            data["title"],
+            *(data.get(column) for column in _ADD_DETAIL_COLUMNS),
+            int(time.time()),
+            watched,
+            room,
+            watched,
+        ),
+    )
+
+
+def set_watched(conn: sqlite3.Connection, room: str, title_id: str, watched: int) -> None:
+    """Move a title between the watchlist and the watched tab."""
+    conn.execute(
+        "UPDATE lists SET watched = ? WHERE room = ? AND title_id = ?",
+        (watched, room, title_id),
+    )
+
+
+def delete_title(conn: sqlite3.Connection, room: str, title_id: str) -> None:
+    """Remove a title from a room."""
+    conn.execute(
+        "DELETE FROM lists WHERE room = ? AND title_id = ?",
+        (room, title_id),
+    )
+
+
+def set_order(conn: sqlite3.Connection, room: str, order: list[str]) -> None:
+    """Number ``order`` so that its first title is shown first."""
+    total = len(order)
+    conn.executemany(
+        "UPDATE lists SET position = ? WHERE room = ? AND title_id = ?",
+        [(total - index, room, title_id) for index, title_id in enumerate(order)],
+    )
+
+
+def rename_room(conn: sqlite3.Connection, room: str, next_room: str) -> bool:
+    """Move a room's titles, activity and applied op ids to ``next_room``.
+
+    False, and nothing changes, when ``next_room`` already has titles. The check runs under
+    the write lock (``BEGIN IMMEDIATE`` unless a transaction is already open), so a
+    concurrent add to ``next_room`` cannot slip in before the move.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    if conn.execute("SELECT 1 FROM lists WHERE room = ? LIMIT 1", (next_room,)).fetchone():
+        return False
+    conn.execute("UPDATE lists SET room = ? WHERE room = ?", (next_room, room))
+    # ``next_room`` may have been opened or used before while empty; the moved rows win.
+    conn.execute("UPDATE OR REPLACE room_activity SET room = ? WHERE room = ?", (next_room, room))
+    conn.execute("UPDATE OR REPLACE applied_ops SET room = ? WHERE room = ?", (next_room, room))
+    return True
+
+
+def needs_details(data: dict[str, Any]) -> bool:
+    """Whether an added title should be queued for enrichment."""
+    return data.get("rating") is None or data.get("runtime_minutes") is None
+
+
+def _apply_add(conn: sqlite3.Connection, room: str, op: dict[str, Any]) -> None:
+    add_title(conn, room, op)
+
+
+def _apply_patch(conn: sqlite3.Connection, room: str, op: dict[str, Any]) -> None:
+    set_watched(conn, room, op["title_id"], parse_watched(op.get("watched")))
+
+
+def _apply_delete(conn: sqlite3.Connection, room: str, op: dict[str, Any]) -> None:
+    delete_title(conn, room, op["title_id"])
+
+
+def _apply_move(conn: sqlite3.Connection, room: str, op: dict[str, Any]) -> None:
+    set_order(conn, room, op["order"])
+
+
+OPERATIONS: dict[str, Callable[[sqlite3.Connection, str, dict[str, Any]], None]] = {
+    "add": _apply_add,
+    "patch": _apply_patch,
+    "delete": _apply_delete,
+    "move": _apply_move,
+}
+
+
+def _is_text(value: Any) -> bool:
+    return isinstance(value, str) and bool(value)
+
+
+def validate_op(op: Any) -> str | None:
+    """The error code for an invalid batch operation, or ``None`` if it can be applied."""
+    if not isinstance(op, dict):
+        return "invalid_op"
+    op_id = op.get("op_id")
+    if not isinstance(op_id, str) or not op_id or len(op_id) > MAX_OP_ID_LENGTH:
+        return "invalid_op_id"
+    kind = op.get("op")
+    if kind not in OPERATIONS:
+        return "unknown_op"
+    # Anything but a non-empty string would fail to bind once the batch is being applied.
+    if kind == "add" and not (_is_text(op.get("title_id")) and _is_text(op.get("title"))):
+        return "missing_title"
+    if kind in ("patch", "delete") and not _is_text(op.get("title_id")):
+        return "missing_title_id"
+    if kind == "move":
+        order = op.get("order")
+        if not isinstance(order, list) or not order or not all(isinstance(title_id, str) for title_id in order):
+            return "invalid_order"
+    return None
+
+
+@dataclass
+class BatchResult:
+    """Outcome of each operation, in request order."""
+
+    results: list[dict[str, Any]] = field(default_factory=list)
+    missing_details: list[tuple[str, str | None]] = field(default_factory=list)
+
+
+def apply_batch(conn: sqlite3.Connection, room: str, ops: list[dict[str, Any]]) -> BatchResult:
+    """Apply validated ``ops`` to ``room`` in order; the caller commits them together.
+
+    Operations whose ``op_id`` was already applied, in an earlier batch or earlier in this
+    one, are reported as ``duplicate`` and skipped.
+    """
+    result = BatchResult()
+    now = int(time.time())
+    conn.execute(
+        "DELETE FROM applied_ops WHERE room = ? AND applied_at < ?",
+        (room, now - APPLIED_OP_RETENTION_SECONDS),
+    )
+    for op in ops:
+        applied = conn.execute(
+            "INSERT OR IGNORE INTO applied_ops (room, op_id, applied_at) VALUES (?, ?, ?)",
+            (room, op["op_id"], now),
+        ).rowcount
+        if not applied:
+            result.results.append({"op_id": op["op_id"], "status": "duplicate"})
+            continue
+        OPERATIONS[op["op"]](conn, room, op)
+        result.results.append({"op_id": op["op_id"], "status": "applied"})
+        if op["op"] == "add" and needs_details(op):
+            result.missing_details.append((op["title_id"], op.get("type_label")))
+    return result
@@ -0,0 +1,215 @@
+"""On-demand stack sampling profiler.
+
+Profiling is opt-in per request: a signed ``X-Shovo-Profile`` header, or a ``?profile=1``
+query flag on a request that carries the admin token header, starts a sampler for the
+duration of that request. Samples are written in the collapsed-stack format understood by
+flamegraph.pl, speedscope and inferno.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any, Callable
+
+from flask import Flask, g, request
+
+# Support both package and standalone imports
+try:
+    from .utils import is_admin_request
+except ImportError:
+    from utils import is_admin_request
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.environ.get("SHOVO_PROFILE_DIR", os.path.join(APP_ROOT, "profiles"))
+PROFILE_SECRET = os.environ.get("SHOVO_PROFILE_SECRET", "")
+PROFILE_HEADER = "X-Shovo-Profile"
+PROFILE_SIGNATURE_MAX_AGE_SECONDS = 300
+SAMPLE_INTERVAL_SECONDS = float(os.environ.get("SHOVO_PROFILE_INTERVAL", "0.005"))
+MAX_BACKGROUND_DURATION_SECONDS = 120
+REFRESH_THREAD_PREFIX = "shovo-refresh"
+
+# Makes profile file names unique within a process; the pid covers other workers.
+_profile_sequence = itertools.count(1)
+
+
+def _frame_label(frame: FrameType) -> str:
+    """Format a frame as ``module:function:line``."""
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def collapse_stack(frame: FrameType | None) -> list[str]:
+    """Return the frames of a stack from outermost to innermost."""
+    labels: list[str] = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class StackSampler:
+    """Periodically sample the stacks of selected threads.
+
+    The sampler runs in its own daemon thread and reads ``sys._current_frames()`` every
+    ``interval`` seconds, so the profiled code runs untraced. ``sys.setprofile`` style
+    deterministic tracing would cost a callback per function call instead.
+    """
+
+    def __init__(
+        self,
+        thread_filter: Callable[[threading.Thread], bool],
+        interval: float = SAMPLE_INTERVAL_SECONDS,
+    ) -> None:
+        self.thread_filter = thread_filter
+        self.interval = max(interval, 0.001)
+        self.samples: Counter[str] = Counter()
+        self.sample_count = 0
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> StackSampler:
+        """Start sampling in a background thread."""
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="shovo-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> StackSampler:
+        """Stop sampling and wait for the sampler thread to finish."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.stopped_at = time.time()
+        return self
+
+    def sample_once(self) -> None:
+        """Record one stack sample for every matching thread."""
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            thread = threads.get(thread_id)
+            if thread is None or thread is self._thread or not self.thread_filter(thread):
+                continue
+            stack = [thread.name, *collapse_stack(frame)]
+            self.samples[";".join(stack)] += 1
+        self.sample_count += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.sample_once()
+            self._stop.wait(self.interval)
+
+    def collapsed(self) -> str:
+        """Render samples in collapsed-stack format (``frame;frame;frame count``)."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    def write(self, label: str, directory: str | None = None) -> str:
+        """Write collapsed stacks to a file and return its path."""
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        safe_label = "".join(char if char.isalnum() or char in "-_" else "_" for char in label).strip("_")
+        filename = (
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label or 'profile'}"
+            f"-{os.getpid()}-{next(_profile_sequence)}.folded"
+        )
+        path = os.path.join(directory, filename)
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(self.collapsed())
+        return path
+
+
+def sign_profile_request(path: str, timestamp: int | None = None, secret: str | None = None) -> str:
+    """Build an ``X-Shovo-Profile`` header value for a request path."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    key = (PROFILE_SECRET if secret is None else secret).encode()
+    digest = hmac.new(key, f"{timestamp}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{timestamp}:{digest}"
+
+
+def verify_profile_signature(value: str | None, path: str) -> bool:
+    """Check a signed ``X-Shovo-Profile`` header value."""
+    if not value or not PROFILE_SECRET:
+        return False
+    timestamp_text, _, _ = value.partition(":")
+    try:
+        timestamp = int(timestamp_text)
+    except ValueError:
+        return False
+    if abs(time.time() - timestamp) > PROFILE_SIGNATURE_MAX_AGE_SECONDS:
+        return False
+    return hmac.compare_digest(value, sign_profile_request(path, timestamp))
+
+
+def profiling_requested() -> bool:
+    """Return True when the current request asked to be profiled."""
+    if verify_profile_signature(request.headers.get(PROFILE_HEADER), request.path):
+        return True
+    return request.args.get("profile") == "1" and is_admin_request()
+
+
+def _start_request_profile() -> None:
+    if not profiling_requested():
+        return
+    request_thread = threading.current_thread()
+    g.profiler = StackSampler(lambda thread: thread is request_thread).start()
+
+
+def _finish_request_profile(response: Any) -> Any:
+    sampler: StackSampler | None = g.pop("profiler", None)
+    if sampler is None:
+        return response
+    sampler.stop()
+    path = sampler.write(f"request-{request.endpoint or 'unknown'}")
+    response.headers["X-Shovo-Profile-File"] = os.path.basename(path)
+    response.headers["X-Shovo-Profile-Samples"] = str(sampler.sample_count)
+    return response
+
+
+def _abandon_request_profile(e: BaseException | None = None) -> None:
+    sampler: StackSampler | None = g.pop("profiler", None)
+    if sampler is not None:
+        sampler.stop()
+
+
+def register_profiling(application: Flask) -> None:
+    """Install the per-request profiling hooks on an application."""
+    application.before_request(_start_request_profile)
+    application.after_request(_finish_request_profile)
+    application.teardown_request(_abandon_request_profile)
+
+
+def profile_background_threads(
+    duration: float,
+    prefix: str = REFRESH_THREAD_PREFIX,
+    interval: float = SAMPLE_INTERVAL_SECONDS,
+) -> str:
+    """Sample threads whose name starts with ``prefix`` for ``duration`` seconds.
+
+    Blocks for the whole duration and returns the path of the collapsed-stack file.
+    """
+    duration = min(max(duration, 0.0), MAX_BACKGROUND_DURATION_SECONDS)
+    sampler = StackSampler(lambda thread: thread.name.startswith(prefix), interval=interval).start()
+    time.sleep(duration)
+    sampler.stop()
+    return sampler.write(f"threads-{prefix}")
+
+
+def start_background_profile(duration: float, prefix: str = REFRESH_THREAD_PREFIX) -> None:
+    """Run ``profile_background_threads`` without blocking the caller."""
+    thread = threading.Thread(
+        target=profile_background_threads,
+        args=(duration, prefix),
+        name="shovo-profiler-background",
+        daemon=True,
+    )
+    thread.start()
@@ -1,56 +1,110 @@
 from __future__ import annotations
 
+import csv
+import io
+import json
+import os
+import sqlite3
 import threading
 import time
 from typing import Any
 
-import requests
-from flask import Blueprint, jsonify, redirect, render_template, request
+from flask import Blueprint, Response, jsonify, redirect, render_template, request
 
 # Support both package and standalone imports
 try:
-    from .database import get_db, get_db_context, migrate_db
-    from .external_api import (
-        ALLOWED_TYPE_LABELS,
-        MAX_RESULTS,
-        fetch_suggestions,
-        fetch_trending,
-        get_metadata,
-        get_ratings,
-        normalize_type_label,
-        refresh_title_details,
+    from .database import (
+        get_db,
+        get_db_context,
+        metadata_cache_get,
+        migrate_db,
+        rating_cache_get,
+        record_room_activity,
+        room_activity_due,
     )
+    from .exporter import EXPORT_COLUMNS, EXPORT_FORMATS, stream_export
+    from .importer import ImportTooLarge, import_items, read_imdb_csv, validate_items
+    from .mutations import (
+        MAX_BATCH_OPS,
+        add_title,
+        apply_batch,
+        delete_title,
+        needs_details,
+        rename_room,
+        set_order,
+        set_watched,
+        validate_op,
+    )
+    from .profiling import MAX_BACKGROUND_DURATION_SECONDS, REFRESH_THREAD_PREFIX, start_background_profile
     from .utils import (
         default_room,
+        is_admin_request,
+        lazy_import,
         parse_watched,
         request_user_agent,
         room_from_request,
         sanitize_room,
         serialize_result,
     )
+    from .writer import WriteTimeout, commit_write
 except ImportError:
-    from database import get_db, get_db_context, migrate_db
-    from external_api import (
-        ALLOWED_TYPE_LABELS,
-        MAX_RESULTS,
-        fetch_suggestions,
-        fetch_trending,
-        get_metadata,
-        get_ratings,
-        normalize_type_label,
-        refresh_title_details,
+    from database import (
+        get_db,
+        get_db_context,
+        metadata_cache_get,
+        migrate_db,
+        rating_cache_get,
+        record_room_activity,
+        room_activity_due,
+    )
+    from exporter import EXPORT_COLUMNS, EXPORT_FORMATS, stream_export
+    from importer import ImportTooLarge, import_items, read_imdb_csv, validate_items
+    from mutations import (
+        MAX_BATCH_OPS,
+        add_title,
+        apply_batch,
+        delete_title,
+        needs_details,
+        rename_room,
+        set_order,
+        set_watched,
+        validate_op,
     )
+    from profiling import MAX_BACKGROUND_DURATION_SECONDS, REFRESH_THREAD_PREFIX, start_background_profile
     from utils import (
         default_room,
+        is_admin_request,
+        lazy_import,
         parse_watched,
         request_user_agent,
         room_from_request,
         sanitize_room,
         serialize_result,
     )
+    from writer import WriteTimeout, commit_write
+
+# The upstream stack is only imported by the first request that needs it.
+requests = lazy_import("requests")
+external_api = lazy_import(".external_api")
+jobs = lazy_import(".jobs")
+upstream = lazy_import(".upstream")
 
 APP_VERSION = "1.6.23"
 DEFAULT_ROOM_COOKIE = "shovo_default_room"
+# Larger reads go through /api/list/export, which streams instead of building the page in memory.
+MAX_PER_PAGE = 100
+DEFAULT_PER_PAGE = 10
+# Fields of /api/details, in the order of TitleDetails.ratings() and metadata().
+DETAIL_COLUMNS = (
+    "rating",
+    "rotten_tomatoes",
+    "runtime_minutes",
+    "total_seasons",
+    "total_episodes",
+    "avg_episode_length",
+    "original_language",
+)
+ENRICH_ON_ADD = os.environ.get("SHOVO_ENRICH_ON_ADD", "1").lower() in {"1", "true", "yes", "on"}
 
 bp = Blueprint("main", __name__)
 
@@ -58,6 +112,12 @@ _refresh_lock = threading.Lock()
 _refresh_state: dict[str, dict[str, int | bool]] = {}
 
 
+@bp.errorhandler(WriteTimeout)
+def write_timeout(exc: WriteTimeout) -> Any:
+    """Answer a write the group writer did not commit in time; it may still be applied."""
+    return jsonify({"error": "write_timeout", "message": "The list is busy. Reload it and try again."}), 503
+
+
 @bp.route("/")
 def root() -> Any:
     """Redirect to the default room or new room."""
@@ -75,7 +135,7 @@ def room(room: str) -> Any:
         if default_room_value:
             return redirect(f"/r/{default_room_value}")
         return redirect(f"/r/{default_room()}")
-    return render_template("index.html", room=room, app_version=APP_VERSION)
+    return render_template("index.html", room=room, app_version=APP_VERSION, initial_list=_initial_list(room))
 
 
 @bp.route("/api/search")
@@ -84,8 +144,8 @@ def api_search() -> Any:
     query = request.args.get("q", "")
     user_agent = request_user_agent()
     try:
-        results = fetch_suggestions(query, user_agent)
-        return jsonify({"results": [serialize_result(result) for result in results[:MAX_RESULTS]]})
+        results = external_api.fetch_suggestions(query, user_agent, upstream.Deadline())
+        return jsonify({"results": [serialize_result(result) for result in results[: external_api.MAX_RESULTS]]})
     except requests.RequestException as exc:
         return jsonify({"error": "imdb_fetch_failed", "detail": str(exc), "results": []})
 
@@ -97,23 +157,20 @@ def api_details() -> Any:
     if not title_id:
         return jsonify({"error": "missing_title_id"}), 400
     type_label = request.args.get("type_label")
-    normalized_type = normalize_type_label(type_label)
-    if normalized_type not in ALLOWED_TYPE_LABELS:
+    normalized_type = external_api.normalize_type_label(type_label)
+    if normalized_type not in external_api.ALLOWED_TYPE_LABELS:
         normalized_type = "movie"
     user_agent = request_user_agent()
-    runtime_minutes, total_seasons, total_episodes, avg_episode_length, original_language = get_metadata(
-        title_id, user_agent, normalized_type
-    )
-    rating, rotten_tomatoes = get_ratings(title_id, user_agent)
+    details = external_api.get_details(title_id, user_agent, normalized_type, upstream.Deadline())
     return jsonify(
         {
-            "rating": rating,
-            "rotten_tomatoes": rotten_tomatoes,
-            "runtime_minutes": runtime_minutes,
-            "total_seasons": total_seasons,
-            "total_episodes": total_episodes,
-            "avg_episode_length": avg_episode_length,
-            "original_language": original_language,
+            "rating": details.rating,
+            "rotten_tomatoes": details.rotten_tomatoes,
+            "runtime_minutes": details.runtime_minutes,
+            "total_seasons": details.total_seasons,
+            "total_episodes": details.total_episodes,
+            "avg_episode_length": details.avg_episode_length,
+            "original_language": details.original_language,
         }
     )
 
@@ -146,12 +203,34 @@ def api_refresh_status() -> Any:
         return jsonify(state)
 
 
+@bp.route("/api/admin/profile/refresh", methods=["POST"])
+def api_profile_refresh() -> Any:
+    """Sample the background refresh threads for a fixed duration (admin only)."""
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    try:
+        duration = float(request.args.get("duration", 10))
+    except ValueError:
+        return jsonify({"error": "invalid_duration"}), 400
+    duration = min(max(duration, 0.1), MAX_BACKGROUND_DURATION_SECONDS)
+    start_background_profile(duration, REFRESH_THREAD_PREFIX)
+    return jsonify({"status": "started", "duration": duration}), 202
+
+
+@bp.route("/api/admin/upstreams")
+def api_upstreams() -> Any:
+    """Report circuit breaker and rate limiter state per upstream (admin only)."""
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    return jsonify(upstream.upstream_status())
+
+
 @bp.route("/api/trending")
 def api_trending() -> Any:
     """Get trending titles."""
     user_agent = request_user_agent()
     try:
-        results = fetch_trending(user_agent)
+        results = external_api.fetch_trending(user_agent, upstream.Deadline())
     except requests.RequestException as exc:
         return jsonify({"error": "imdb_fetch_failed", "detail": str(exc)}), 502
     return jsonify({"results": [serialize_result(result) for result in results]})
@@ -159,40 +238,110 @@ def api_trending() -> Any:
 
 @bp.route("/api/list", methods=["GET"])
 def api_list() -> Any:
-    """Get the list of titles for a room."""
+    """Get the list of titles for a room.
+
+    ``fields`` (comma separated) limits the columns returned; ``title_id`` is always
+    included. ``format=compact`` sends the column names once and each item as an array.
+    """
     room = room_from_request() or request.args.get("room", "")
     if not room:
         return jsonify({"error": "missing_room"}), 400
+    fields = _requested_list_fields()
+    if fields is None:
+        return jsonify({"error": "invalid_fields"}), 400
+    compact = request.args.get("format") == "compact"
     status = request.args.get("status", "unwatched")
     watched_flag = 1 if status == "watched" else 0
     page = max(int(request.args.get("page", 1)), 1)
-    per_page = max(int(request.args.get("per_page", MAX_RESULTS)), 1)
-    offset = (page - 1) * per_page
+    per_page = min(max(int(request.args.get("per_page", DEFAULT_PER_PAGE)), 1), MAX_PER_PAGE)
     conn = get_db()
     migrate_db(conn)
+    _note_room_activity(room)
+    columns, rows, page_info = _list_page(conn, room, watched_flag, page, per_page, fields)
+    if compact:
+        return jsonify({"columns": columns, "rows": [tuple(row) for row in rows], **page_info})
+    return jsonify({"items": [dict(row) for row in rows], **page_info})
+
+
+def _list_page(
+    conn: sqlite3.Connection,
+    room: str,
+    watched_flag: int,
+    page: int,
+    per_page: int,
+    fields: tuple[str, ...] = (),
+) -> tuple[list[str], list[sqlite3.Row], dict[str, int]]:
+    """One page of a room's list in display order, with its columns and paging info."""
     total_count = conn.execute(
         "SELECT COUNT(*) FROM lists WHERE room = ? AND watched = ?",
         (room, watched_flag),
     ).fetchone()[0]
-    rows = conn.execute(
-        """
-        SELECT * FROM lists
+    cursor = conn.execute(
+        f"""
+        SELECT {", ".join(fields) if fields else "*"} FROM lists
         WHERE room = ? AND watched = ?
         ORDER BY (position IS NULL) ASC, position DESC, added_at DESC
         LIMIT ? OFFSET ?
         """,
-        (room, watched_flag, per_page, offset),
-    ).fetchall()
-    total_pages = max((total_count + per_page - 1) // per_page, 1)
-    return jsonify(
-        {
-            "items": [dict(row) for row in rows],
-            "page": page,
-            "per_page": per_page,
-            "total_pages": total_pages,
-            "total_count": total_count,
-        }
+        (room, watched_flag, per_page, (page - 1) * per_page),
     )
+    rows = cursor.fetchall()
+    page_info = {
+        "page": page,
+        "per_page": per_page,
+        "total_pages": max((total_count + per_page - 1) // per_page, 1),
+        "total_count": total_count,
+    }
+    return [column[0] for column in cursor.description], rows, page_info
+
+
+def _note_room_activity(room: str) -> None:
+    """Record that ``room`` was opened, for the cache warmer, through the writer.
+
+    Best effort: a missed write only delays warming until the room is opened again.
+    """
+    if not room_activity_due(room):
+        return
+    try:
+        commit_write(lambda conn: record_room_activity(conn, room))
+    except (WriteTimeout, sqlite3.Error):
+        pass
+
+
+def _initial_list(room: str) -> dict[str, Any] | None:
+    """The first page of unwatched titles, as ``/api/list`` returns it, for embedding in the page.
+
+    Cached details for titles whose rows are incomplete are included under ``details``,
+    in the shape ``/api/details`` returns, so the cards do not have to ask for them.
+    """
+    room = sanitize_room(room)
+    if not room:
+        return None
+    conn = get_db()
+    migrate_db(conn)
+    _note_room_activity(room)
+    _, rows, page_info = _list_page(conn, room, 0, 1, DEFAULT_PER_PAGE)
+    items = [dict(row) for row in rows]
+    details = {}
+    for item in items:
+        if all(item[column] is not None for column in DETAIL_COLUMNS):
+            continue
+        ratings = rating_cache_get(conn, item["title_id"])
+        metadata = metadata_cache_get(conn, item["title_id"])
+        if ratings is not None and metadata is not None:
+            details[item["title_id"]] = dict(zip(DETAIL_COLUMNS, (*ratings, *metadata)))
+    return {"status": "unwatched", "items": items, "details": details, **page_info}
+
+
+def _requested_list_fields() -> tuple[str, ...] | None:
+    """Columns requested with ``fields=``; empty for all, None if any is unknown."""
+    value = request.args.get("fields", "")
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    if not fields:
+        return ()
+    if any(field not in EXPORT_COLUMNS for field in fields):
+        return None
+    return tuple(dict.fromkeys(["title_id", *fields]))
 
 
 @bp.route("/api/list", methods=["POST"])
@@ -208,46 +357,82 @@ def api_add() -> Any:
     title = data.get("title")
     if not title_id or not title:
         return jsonify({"error": "missing_title"}), 400
-    watched = parse_watched(data.get("watched", 0))
-    conn = get_db()
-    migrate_db(conn)
-    next_position = conn.execute(
-        "SELECT COALESCE(MAX(position), 0) + 1 FROM lists WHERE room = ? AND watched = ?",
-        (room, watched),
-    ).fetchone()[0]
-    conn.execute(
-        """
-        REPLACE INTO lists (
-            room, title_id, title, year, original_language, type_label, image, rating, rotten_tomatoes,
-            runtime_minutes, total_seasons, total_episodes, avg_episode_length, added_at, watched
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            room,
-            title_id,
-            title,
-            data.get("year"),
-            data.get("original_language"),
-            data.get("type_label"),
-            data.get("image"),
-            data.get("rating"),
-            data.get("rotten_tomatoes"),
-            data.get("runtime_minutes"),
-            data.get("total_seasons"),
-            data.get("total_episodes"),
-            data.get("avg_episode_length"),
-            int(time.time()),
-            watched,
-        ),
-    )
-    conn.execute(
-        "UPDATE lists SET position = ? WHERE room = ? AND title_id = ?",
-        (next_position, room, title_id),
-    )
-    conn.commit()
+    migrate_db(get_db())
+    commit_write(lambda conn: add_title(conn, room, data))
+    if needs_details(data):
+        job = _enqueue_enrichment(room, [(title_id, data.get("type_label"))])
+        if job is not None:
+            return jsonify({"status": "ok", "job_id": job.job_id})
     return jsonify({"status": "ok"})
 
 
+@bp.route("/api/list/export")
+def api_export() -> Any:
+    """Stream a room's list as NDJSON (default) or CSV."""
+    room = sanitize_room(request.args.get("room"))
+    if not room:
+        return jsonify({"error": "missing_room"}), 400
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "invalid_format"}), 400
+    status = request.args.get("status", "all")
+    watched = {"watched": 1, "unwatched": 0}.get(status)
+    response = Response(stream_export(room, export_format, watched), mimetype=EXPORT_FORMATS[export_format])
+    response.headers["Content-Disposition"] = f'attachment; filename="{room}.{export_format}"'
+    return response
+
+
+@bp.route("/api/list/import", methods=["POST"])
+def api_import() -> Any:
+    """Import many titles into a list from an IMDb CSV export, a JSON array or NDJSON.
+
+    CSV is read from the request body (``Content-Type: text/csv``) or a ``file`` upload.
+    JSON is an array of titles shaped like ``POST /api/list`` bodies, or an object with
+    ``room`` and ``items``. NDJSON (``application/x-ndjson``, as written by
+    ``/api/list/export``) has one such title per line.
+    """
+    room = sanitize_room(request.args.get("room"))
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            room = room or sanitize_room(payload.get("room"))
+            payload = payload.get("items")
+        if not isinstance(payload, list):
+            return jsonify({"error": "invalid_payload"}), 400
+        items: Any = payload
+    elif request.mimetype == EXPORT_FORMATS["ndjson"]:
+        lines = io.TextIOWrapper(request.stream, encoding="utf-8")
+        items = (json.loads(line) for line in lines if line.strip())
+    else:
+        upload = request.files.get("file")
+        stream = upload.stream if upload is not None else request.stream
+        items = read_imdb_csv(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    if not room:
+        return jsonify({"error": "missing_room"}), 400
+    try:
+        validated = validate_items(items)
+    except ImportTooLarge as exc:
+        return jsonify({"error": "too_many_rows", "message": str(exc)}), 413
+    except (csv.Error, UnicodeDecodeError, ValueError):
+        return jsonify({"error": "invalid_payload"}), 400
+    migrate_db(get_db())
+    result = commit_write(lambda conn: import_items(conn, room, validated))
+    response = {"status": "ok", **result.to_dict()}
+    job = _enqueue_enrichment(room, result.missing_details)
+    if job is not None:
+        response["job_id"] = job.job_id
+    return jsonify(response)
+
+
+@bp.route("/api/list/jobs/<int:job_id>")
+def api_job_status(job_id: int) -> Any:
+    """Get the progress of a background enrichment job."""
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "unknown_job"}), 404
+    return jsonify(job.to_dict())
+
+
 @bp.route("/api/list", methods=["PATCH"], endpoint="api_list_patch")
 def api_patch_list() -> Any:
     """Update the watched status of a title."""
@@ -260,13 +445,8 @@ def api_patch_list() -> Any:
     watched = parse_watched(request.json.get("watched"))
     if not title_id:
         return jsonify({"error": "missing_title_id"}), 400
-    conn = get_db()
-    migrate_db(conn)
-    conn.execute(
-        "UPDATE lists SET watched = ? WHERE room = ? AND title_id = ?",
-        (watched, room, title_id),
-    )
-    conn.commit()
+    migrate_db(get_db())
+    commit_write(lambda conn: set_watched(conn, room, title_id, watched))
     return jsonify({"status": "ok"})
 
 
@@ -281,16 +461,8 @@ def api_order() -> Any:
     order = request.json.get("order")
     if not isinstance(order, list) or not order:
         return jsonify({"error": "invalid_order"}), 400
-    conn = get_db()
-    migrate_db(conn)
-    total = len(order)
-    for index, title_id in enumerate(order):
-        position = total - index
-        conn.execute(
-            "UPDATE lists SET position = ? WHERE room = ? AND title_id = ?",
-            (position, room, title_id),
-        )
-    conn.commit()
+    migrate_db(get_db())
+    commit_write(lambda conn: set_order(conn, room, order))
     return jsonify({"status": "ok"})
 
 
@@ -305,16 +477,49 @@ def api_delete() -> Any:
     title_id = request.json.get("title_id")
     if not title_id:
         return jsonify({"error": "missing_title_id"}), 400
-    conn = get_db()
-    migrate_db(conn)
-    conn.execute(
-        "DELETE FROM lists WHERE room = ? AND title_id = ?",
-        (room, title_id),
-    )
-    conn.commit()
+    migrate_db(get_db())
+    commit_write(lambda conn: delete_title(conn, room, title_id))
     return jsonify({"status": "ok"})
 
 
+@bp.route("/api/list/batch", methods=["POST"])
+def api_batch() -> Any:
+    """Apply an ordered list of add, patch, delete and move operations atomically.
+
+    The body is ``{"room": ..., "ops": [{"op_id": ..., "op": "add", ...}, ...]}``. Each
+    operation takes the fields of the matching single-title request (``move`` takes
+    ``order``). If any operation is invalid nothing is applied and the response says
+    which ones failed. Operation ids that were already applied are skipped.
+    """
+    if not request.is_json:
+        return jsonify({"error": "invalid_payload"}), 400
+    room = room_from_request()
+    if not room:
+        return jsonify({"error": "missing_room"}), 400
+    ops = request.json.get("ops")
+    if not isinstance(ops, list) or not ops:
+        return jsonify({"error": "invalid_ops"}), 400
+    if len(ops) > MAX_BATCH_OPS:
+        return jsonify({"error": "too_many_ops", "message": f"batches are limited to {MAX_BATCH_OPS} operations"}), 413
+    errors = [validate_op(op) for op in ops]
+    if any(errors):
+        results = [
+            {
+                "op_id": op.get("op_id") if isinstance(op, dict) else None,
+                **({"status": "invalid", "error": error} if error else {"status": "skipped"}),
+            }
+            for op, error in zip(ops, errors)
+        ]
+        return jsonify({"error": "invalid_ops", "results": results}), 400
+    migrate_db(get_db())
+    result = commit_write(lambda conn: apply_batch(conn, room, ops))
+    response = {"status": "ok", "results": result.results}
+    job = _enqueue_enrichment(room, result.missing_details)
+    if job is not None:
+        response["job_id"] = job.job_id
+    return jsonify(response)
+
+
 @bp.route("/api/list/rename", methods=["PATCH"])
 def api_rename_list() -> Any:
     """Rename a list (change room ID)."""
@@ -328,13 +533,8 @@ def api_rename_list() -> Any:
         return jsonify({"error": "missing_next_room"}), 400
     if next_room == room:
         return jsonify({"status": "ok", "room": room})
-    conn = get_db()
-    migrate_db(conn)
-    existing = conn.execute(
-        "SELECT 1 FROM lists WHERE room = ? LIMIT 1",
-        (next_room,),
-    ).fetchone()
-    if existing:
+    migrate_db(get_db())
+    if not commit_write(lambda conn: rename_room(conn, room, next_room)):
         return (
             jsonify(
                 {
@@ -344,11 +544,16 @@ def api_rename_list() -> Any:
             ),
             409,
         )
-    conn.execute("UPDATE lists SET room = ? WHERE room = ?", (next_room, room))
-    conn.commit()
     return jsonify({"status": "ok", "room": next_room})
 
 
+def _enqueue_enrichment(room: str, items: list[tuple[str, str | None]]) -> jobs.EnrichmentJob | None:
+    """Queue titles missing details for background enrichment, if enabled."""
+    if not ENRICH_ON_ADD or not items:
+        return None
+    return jobs.enqueue_enrichment(room, items, request_user_agent())
+
+
 def _start_refresh(room: str, user_agent: str) -> int:
     """Start a background refresh of all titles in a room."""
     with get_db_context() as conn:
@@ -366,18 +571,10 @@ def _start_refresh(room: str, user_agent: str) -> int:
         with get_db_context() as conn:
             migrate_db(conn)
             for title_id, type_label in items:
-                normalized_type = normalize_type_label(type_label)
-                if normalized_type not in ALLOWED_TYPE_LABELS:
+                normalized_type = external_api.normalize_type_label(type_label)
+                if normalized_type not in external_api.ALLOWED_TYPE_LABELS:
                     normalized_type = "movie"
-                (
-                    imdb_rating,
-                    rotten_rating,
-                    runtime_minutes,
-                    total_seasons,
-                    total_episodes,
-                    avg_episode_length,
-                    original_language,
-                ) = refresh_title_details(title_id, user_agent, normalized_type)
+                details = external_api.refresh_title_details(title_id, user_agent, normalized_type)
                 conn.execute(
                     """
                     UPDATE lists
@@ -385,17 +582,7 @@ def _start_refresh(room: str, user_agent: str) -> int:
                         total_episodes = ?, avg_episode_length = ?, original_language = ?
                     WHERE room = ? AND title_id = ?
                     """,
-                    (
-                        imdb_rating,
-                        rotten_rating,
-                        runtime_minutes,
-                        total_seasons,
-                        total_episodes,
-                        avg_episode_length,
-                        original_language,
-                        room,
-                        title_id,
-                    ),
+                    (*details.ratings(), *details.metadata(), room, title_id),
                 )
                 conn.commit()
                 with _refresh_lock:
@@ -407,6 +594,6 @@ def _start_refresh(room: str, user_agent: str) -> int:
                 if state:
                     state["refreshing"] = False
 
-    thread = threading.Thread(target=_run_refresh, daemon=True)
+    thread = threading.Thread(target=_run_refresh, name=f"{REFRESH_THREAD_PREFIX}-{room}", daemon=True)
     thread.start()
     return total
@@ -66,29 +66,71 @@ export async function getTrending() {
   return data;
 }
 
+/**
+ * Columns rendered by list cards (see cards.js)
+ */
+export const CARD_FIELDS = [
+  'title_id',
+  'title',
+  'year',
+  'original_language',
+  'type_label',
+  'image',
+  'rating',
+  'rotten_tomatoes',
+  'runtime_minutes',
+  'total_seasons',
+  'total_episodes',
+  'avg_episode_length',
+  'watched'
+];
+
+/**
+ * Turn a compact list response (columns + rows) back into items
+ * @param {object} data - List response
+ * @returns {object} - List response with items
+ */
+function expandCompactList(data) {
+  if (!data.columns || !data.rows) {
+    return data;
+  }
+  const { columns, rows, ...rest } = data;
+  const items = rows.map((row) => Object.fromEntries(columns.map((column, index) => [column, row[index]])));
+  return { ...rest, items };
+}
+
 /**
  * Get list items for a room
  * @param {string} room - Room ID
  * @param {string} status - Status (unwatched/watched)
  * @param {number} page - Page number
  * @param {number} perPage - Items per page
+ * @param {object} options - `fields` to limit the columns, `compact` for the columnar format
  * @returns {Promise<object>} - List data
  */
-export async function getList(room, status, page = 1, perPage = MAX_RESULTS) {
+export async function getList(room, status, page = 1, perPage = MAX_RESULTS, options = {}) {
+  const { fields = null, compact = false } = options;
+  const variant = [fields ? fields.join(',') : '', compact ? 'compact' : ''].filter(Boolean).join('_');
+
   // Check cache first
-  const cacheKey = getListCacheKey(room, status, page);
+  const cacheKey = getListCacheKey(room, status, page, variant);
   const cached = getCached(cacheKey);
   if (cached) {
     return cached;
   }
 
-  const response = await fetch(
-    `/api/list?room=${encodeURIComponent(room)}&status=${status}&page=${page}&per_page=${perPage}`
-  );
+  let url = `/api/list?room=${encodeURIComponent(room)}&status=${status}&page=${page}&per_page=${perPage}`;
+  if (fields) {
+    url += `&fields=${encodeURIComponent(fields.join(','))}`;
+  }
+  if (compact) {
+    url += '&format=compact';
+  }
+  const response = await fetch(url);
   if (!response.ok) {
     throw new Error('Failed to fetch list');
   }
-  const data = await response.json();
+  const data = expandCompactList(await response.json());
 
   // Cache the results
   setCached(cacheKey, data);
@@ -18,6 +18,7 @@ import {
   searchTitles,
   getTrending,
   getList,
+  CARD_FIELDS,
   getDetails,
   addToList as apiAddToList,
   updateWatched,
@@ -30,7 +31,7 @@ import {
 import { buildCard, buildMobileSearchResult, applyCardDetails, needsDetails } from './cards.js';
 import { attachDragHandlers, getCurrentOrder } from './drag.js';
 import { attachCardLongPressHandlers, isMobile, setupMobileEnhancements } from './mobile.js';
-import { getCached, setCached, getDetailCacheKey } from './cache.js';
+import { getCached, setCached, getDetailCacheKey, invalidateListCache } from './cache.js';
 
 // DOM Elements
 const room = window.APP_ROOM;
@@ -104,6 +105,8 @@ const cardActionRemove = document.getElementById('card-action-remove');
 
 // State
 const PAGE_SIZE = 10;
+// Mobile cards only need the rendered columns, sent in the compact columnar format.
+const listOptions = () => (isMobile() ? { fields: CARD_FIELDS, compact: true } : {});
 let activeTab = 'unwatched';
 let searchTimer;
 let activeSearchController;
@@ -113,6 +116,10 @@ const pageState = { unwatched: 1, watched: 1 };
 const totalPages = { unwatched: 1, watched: 1 };
 const pendingDetailRequests = new Set();
 const detailCache = new Map();
+// First page of the watchlist (and cached details for it) rendered into the page by the server.
+const initialListElement = document.getElementById('initial-list');
+let initialList = initialListElement ? JSON.parse(initialListElement.textContent) : null;
+Object.entries(initialList?.details || {}).forEach(([titleId, details]) => detailCache.set(titleId, details));
 let refreshPollingTimer;
 let refreshOwner = false;
 const preloadedTabs = new Set();
@@ -473,6 +480,14 @@ const debounceSearch = () => {
   searchTimer = setTimeout(fetchSearch, 250);
 };
 
+// The embedded page is used once, for the first load; after that the list comes from the API.
+const takeInitialList = (status, page) => {
+  const data = initialList;
+  initialList = null;
+  if (!data || data.status !== status || data.page !== page || data.per_page !== PAGE_SIZE) return null;
+  return data;
+};
+
 const loadList = async () => {
   if (isRoomPrivate(settings, room) && !isRoomAuthorized(settings, room)) {
     showStatus(listResults, 'This list is private. Enter the password to continue.');
@@ -482,7 +497,7 @@ const loadList = async () => {
   showStatus(listResults, 'Loading list...');
   const page = pageState[activeTab];
   try {
-    const data = await getList(room, activeTab, page, PAGE_SIZE);
+    const data = takeInitialList(activeTab, page) || await getList(room, activeTab, page, PAGE_SIZE, listOptions());
     if (!data.items?.length && page > 1) {
       pageState[activeTab] = page - 1;
       await loadList();
@@ -516,7 +531,7 @@ const preloadTabImages = async (tab) => {
   if (!tab || preloadedTabs.has(tab)) return;
   preloadedTabs.add(tab);
   try {
-    const data = await getList(room, tab, 1, PAGE_SIZE);
+    const data = await getList(room, tab, 1, PAGE_SIZE, listOptions());
     (data.items || []).forEach((item) => {
       if (item.image) {
         const img = new Image();
@@ -691,8 +706,8 @@ const updateVisitedRoomCounts = async () => {
     rooms.map(async (roomId) => {
       try {
         const [unwatched, watched] = await Promise.all([
-          getList(roomId, 'unwatched', 1, 1),
-          getList(roomId, 'watched', 1, 1)
+          getList(roomId, 'unwatched', 1, 1, { fields: ['title_id'], compact: true }),
+          getList(roomId, 'watched', 1, 1, { fields: ['title_id'], compact: true })
         ]);
         const total = (unwatched.total_count || 0) + (watched.total_count || 0);
         settings.rooms[roomId].count = total;
@@ -1033,6 +1048,19 @@ document.addEventListener('click', (event) => {
   closeTrendingPopover();
 });
 
+// Edits made offline are queued by the service worker and sent in one batch later.
+if ('serviceWorker' in navigator) {
+  navigator.serviceWorker.addEventListener('message', (event) => {
+    if (event.data?.type === 'OFFLINE_QUEUE_FLUSHED') {
+      invalidateListCache(room);
+      loadList();
+    }
+  });
+  const flushOfflineQueue = () => navigator.serviceWorker.controller?.postMessage({ type: 'FLUSH_QUEUE' });
+  window.addEventListener('online', flushOfflineQueue);
+  flushOfflineQueue();
+}
+
 // Initialize
 initializeSettings();
 applyShareToken();
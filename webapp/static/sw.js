@@ -1,9 +1,14 @@
-const CACHE_NAME = 'shovo-v1.6.16';
-const STATIC_CACHE = 'shovo-static-v1.6.16';
-const API_CACHE = 'shovo-api-v1.6.16';
+// The page registers this worker as sw.js?v=<asset version>, so every deploy that changes
+// a static file installs a new worker with fresh caches.
+const VERSION = new URL(self.location.href).searchParams.get('v') || 'dev';
+const STATIC_CACHE = `shovo-static-${VERSION}`;
+const API_CACHE = `shovo-api-${VERSION}`;
+// Written by `python -m webapp.tools.build_static`.
+const ASSET_MANIFEST = '/static/dist/manifest.json';
+const FINGERPRINTED_PREFIX = '/static/dist/';
 
-const STATIC_ASSETS = [
-  '/',
+// Used when the static files have not been built (development).
+const FALLBACK_ASSETS = [
   '/static/style.css',
   '/static/app.js',
   '/static/share.svg',
@@ -14,17 +19,40 @@ const STATIC_ASSETS = [
   '/static/telegram.svg',
   '/static/instagram.svg',
   '/static/imdb-logo.svg',
-  '/static/rotten-tomatoes.svg',
-  '/manifest.json'
+  '/static/rotten-tomatoes.svg'
 ];
 
 const API_CACHE_DURATION = 60 * 60 * 1000; // 1 hour in milliseconds
 
+// List edits made while offline are kept in IndexedDB and sent to /api/list/batch,
+// one request per room, when the network is back. Each op gets an id so a batch
+// whose response was lost can be sent again without applying anything twice.
+const QUEUE_DB = 'shovo-offline';
+const QUEUE_STORE = 'ops';
+const QUEUE_SYNC_TAG = 'shovo-flush-queue';
+const QUEUE_BATCH_SIZE = 100; // The server accepts up to SHOVO_BATCH_MAX_OPS (200)
+const QUEUED_MUTATIONS = {
+  'POST /api/list': 'add',
+  'PATCH /api/list': 'patch',
+  'DELETE /api/list': 'delete',
+  'PATCH /api/list/order': 'move'
+};
+
+async function precacheUrls() {
+  try {
+    const response = await fetch(ASSET_MANIFEST, { cache: 'no-cache' });
+    if (!response.ok) return FALLBACK_ASSETS;
+    const manifest = await response.json();
+    return Object.values(manifest.assets).map((name) => FINGERPRINTED_PREFIX + name);
+  } catch (error) {
+    return FALLBACK_ASSETS;
+  }
+}
+
 self.addEventListener('install', (event) => {
   event.waitUntil(
-    caches.open(STATIC_CACHE).then((cache) => {
-      return cache.addAll(STATIC_ASSETS.filter(url => !url.startsWith('/r/')));
-    })
+    Promise.all([caches.open(STATIC_CACHE), precacheUrls()])
+      .then(([cache, urls]) => cache.addAll(urls))
   );
   self.skipWaiting();
 });
@@ -45,6 +73,13 @@ self.addEventListener('activate', (event) => {
 self.addEventListener('fetch', (event) => {
   const url = new URL(event.request.url);
 
+  // Queue list edits while offline
+  const mutation = QUEUED_MUTATIONS[`${event.request.method} ${url.pathname}`];
+  if (mutation) {
+    event.respondWith(handleMutation(event.request, mutation));
+    return;
+  }
+
   // Handle API requests
   if (url.pathname.startsWith('/api/')) {
     event.respondWith(handleApiRequest(event.request));
@@ -71,6 +106,11 @@ self.addEventListener('fetch', (event) => {
 
 async function handleStaticRequest(request) {
   const cached = await caches.match(request);
+  // Fingerprinted files never change, so there is nothing to revalidate.
+  const { pathname } = new URL(request.url);
+  if (cached && pathname.startsWith(FINGERPRINTED_PREFIX) && pathname !== ASSET_MANIFEST) {
+    return cached;
+  }
   if (cached) {
     // Return cached and update in background
     fetchAndCache(request, STATIC_CACHE);
@@ -177,11 +217,133 @@ async function fetchAndCache(request, cacheName) {
   }
 }
 
+function queueRequest(mode, work) {
+  return new Promise((resolve, reject) => {
+    const open = indexedDB.open(QUEUE_DB, 1);
+    open.onupgradeneeded = () => {
+      open.result.createObjectStore(QUEUE_STORE, { keyPath: 'seq', autoIncrement: true });
+    };
+    open.onerror = () => reject(open.error);
+    open.onsuccess = () => {
+      const transaction = open.result.transaction(QUEUE_STORE, mode);
+      const request = work(transaction.objectStore(QUEUE_STORE));
+      transaction.oncomplete = () => resolve(request ? request.result : undefined);
+      transaction.onerror = () => reject(transaction.error);
+    };
+  });
+}
+
+const queuedOps = () => queueRequest('readonly', (store) => store.getAll());
+const enqueueOp = (entry) => queueRequest('readwrite', (store) => store.add(entry));
+const dropOps = (entries) => queueRequest('readwrite', (store) => {
+  entries.forEach((entry) => store.delete(entry.seq));
+  return null;
+});
+
+async function handleMutation(request, kind) {
+  const body = await request.clone().json().catch(() => null);
+  if (!body || !body.room) {
+    return fetch(request);
+  }
+  const pending = await queuedOps().catch(() => []);
+  if (!pending.length) {
+    try {
+      return await fetch(request);
+    } catch (error) {
+      // Offline: queue it below.
+    }
+  }
+  // Offline, or earlier edits are still queued and this one has to go after them.
+  const { room, ...fields } = body;
+  await enqueueOp({ room, op: { ...fields, op: kind, op_id: crypto.randomUUID() } });
+  if (self.registration.sync) {
+    self.registration.sync.register(QUEUE_SYNC_TAG).catch(() => {});
+  }
+  flushQueue();
+  return new Response(JSON.stringify({ status: 'queued' }), {
+    status: 202,
+    headers: { 'Content-Type': 'application/json' }
+  });
+}
+
+let flushing = null;
+
+function flushQueue() {
+  if (!flushing) {
+    flushing = sendQueuedOps().finally(() => {
+      flushing = null;
+    });
+  }
+  return flushing;
+}
+
+async function sendQueuedOps() {
+  const entries = await queuedOps();
+  const batches = new Map();
+  entries.forEach((entry) => {
+    const roomBatches = batches.get(entry.room) || [[]];
+    if (roomBatches[roomBatches.length - 1].length >= QUEUE_BATCH_SIZE) roomBatches.push([]);
+    roomBatches[roomBatches.length - 1].push(entry);
+    batches.set(entry.room, roomBatches);
+  });
+  let sent = false;
+  for (const [room, roomBatches] of batches) {
+    for (const roomEntries of roomBatches) {
+      const outcome = await sendBatch(room, roomEntries);
+      if (outcome === 'offline') return finishFlush(sent);
+      if (outcome !== 'sent') break; // Keep the room's later ops behind the ones that failed.
+      sent = true;
+    }
+  }
+  return finishFlush(sent);
+}
+
+async function sendBatch(room, roomEntries) {
+  let response;
+  try {
+    response = await fetch('/api/list/batch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ room, ops: roomEntries.map((entry) => entry.op) })
+    });
+  } catch (error) {
+    return 'offline'; // The next edit, sync event or page load tries again.
+  }
+  if (response.ok) {
+    await dropOps(roomEntries);
+    return 'sent';
+  }
+  if (response.status === 400) {
+    // The server would reject these forever: drop the invalid ops (or, without per-op
+    // results, the whole batch) and send the rest next time.
+    const { results } = await response.json().catch(() => ({}));
+    await dropOps(results ? roomEntries.filter((entry, index) => results[index]?.status === 'invalid') : roomEntries);
+  }
+  return 'failed';
+}
+
+async function finishFlush(sent) {
+  if (sent) {
+    await caches.delete(API_CACHE);
+    const clients = await self.clients.matchAll();
+    clients.forEach((client) => client.postMessage({ type: 'OFFLINE_QUEUE_FLUSHED' }));
+  }
+}
+
+self.addEventListener('sync', (event) => {
+  if (event.tag === QUEUE_SYNC_TAG) {
+    event.waitUntil(flushQueue());
+  }
+});
+
 // Handle messages from the main thread
 self.addEventListener('message', (event) => {
   if (event.data.type === 'CLEAR_API_CACHE') {
     caches.delete(API_CACHE);
   }
+  if (event.data.type === 'FLUSH_QUEUE') {
+    event.waitUntil(flushQueue());
+  }
   if (event.data.type === 'SKIP_WAITING') {
     self.skipWaiting();
   }
@@ -6,9 +6,17 @@ import tempfile
 
 import pytest
 
-# Set test database path before importing app
+# Point the app at a temporary database before anything imports ``webapp.database``, so
+# no test (or import-time migration) touches the tracked data.sqlite3.
 TEST_DB_FD, TEST_DB_PATH = tempfile.mkstemp()
+# Closed right away: closing it again in a later teardown would close whatever file
+# (often a live SQLite connection) reused the descriptor number by then.
+os.close(TEST_DB_FD)
 os.environ["SHOVO_TEST_DB"] = TEST_DB_PATH
+os.environ["SHOVO_DB_PATH"] = TEST_DB_PATH
+# The ``app`` fixture migrates the test database itself.
+os.environ["SHOVO_MIGRATE_ON_START"] = "0"
+os.environ.pop("SHOVO_WARMER", None)
 
 
 @pytest.fixture
@@ -36,16 +44,17 @@ def app():
 
     yield app
 
-    # Cleanup
+    # Cleanup: nothing may still write to the database once its file is gone
+    from webapp import jobs, writer
+
+    jobs.wait_for_idle()
+    writer.close_writers()
     database.DB_PATH = original_db_path
-    try:
-        os.close(TEST_DB_FD)
-    except OSError:
-        pass  # File descriptor may already be closed
-    try:
-        os.unlink(TEST_DB_PATH)
-    except FileNotFoundError:
-        pass  # File may already be deleted
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        try:
+            os.unlink(TEST_DB_PATH + suffix)
+        except FileNotFoundError:
+            pass  # File may already be deleted
 
 
 @pytest.fixture
@@ -58,3 +67,11 @@ def client(app):
 def runner(app):
     """Create CLI test runner."""
     return app.test_cli_runner()
+
+
+@pytest.fixture(autouse=True)
+def no_background_enrichment(monkeypatch):
+    """Keep list additions from queueing upstream fetches unless a test opts in."""
+    from webapp import routes
+
+    monkeypatch.setattr(routes, "ENRICH_ON_ADD", False)
@@ -0,0 +1,158 @@
+"""Tests for static asset fingerprinting and fingerprinted URLs."""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from webapp.assets import IMMUTABLE_MAX_AGE_SECONDS, AssetManifest, load_manifest
+from webapp.tools import build_static
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    """A small static tree with a module graph, a stylesheet and an image."""
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "main.js").write_text(
+        "import { load } from './api.js';\nimport { draw } from './draw.js';\nload(); draw();\n"
+    )
+    (tmp_path / "js" / "api.js").write_text("import { get } from './cache.js';\nexport const load = get;\n")
+    (tmp_path / "js" / "cache.js").write_text("export const get = () => 1;\n")
+    (tmp_path / "js" / "draw.js").write_text("export const draw = () => '<img src=\"/static/logo.svg\">';\n")
+    (tmp_path / "logo.svg").write_text("<svg></svg>\n")
+    (tmp_path / "style.css").write_text(
+        ".logo { background: url('logo.svg'); }\n@import url(\"https://x.test/a.css\");\n"
+    )
+    (tmp_path / "sw.js").write_text("self.addEventListener('fetch', () => {});\n")
+    return tmp_path
+
+
+def _dist_text(static_dir, manifest, path):
+    return (static_dir / "dist" / manifest["assets"][path]).read_text()
+
+
+class TestBuildStatic:
+    """Tests for the build_static fingerprinting step."""
+
+    def test_fingerprints_and_writes_manifest(self, static_dir):
+        """Test every asset except the service worker is copied under a hashed name."""
+        manifest = build_static.build(str(static_dir))
+        assert set(manifest["assets"]) == {
+            "js/main.js",
+            "js/api.js",
+            "js/cache.js",
+            "js/draw.js",
+            "logo.svg",
+            "style.css",
+        }
+        assert manifest["assets"]["logo.svg"].startswith("logo.")
+        for name in manifest["assets"].values():
+            assert (static_dir / "dist" / name).exists()
+        assert json.loads((static_dir / "dist" / "manifest.json").read_text()) == manifest
+
+    def test_rewrites_references(self, static_dir):
+        """Test imports, url() and /static/ paths point at fingerprinted names."""
+        manifest = build_static.build(str(static_dir))
+        names = manifest["assets"]
+        assert f"from './{names['js/api.js'][3:]}'" in _dist_text(static_dir, manifest, "js/main.js")
+        assert f"/static/dist/{names['logo.svg']}" in _dist_text(static_dir, manifest, "js/draw.js")
+        css = _dist_text(static_dir, manifest, "style.css")
+        assert f"url('./{names['logo.svg']}')" in css
+        assert 'url("https://x.test/a.css")' in css
+
+    def test_changes_propagate_to_importers(self, static_dir):
+        """Test changing a module renames it and everything importing it, and nothing else."""
+        before = build_static.build(str(static_dir))["assets"]
+        (static_dir / "js" / "cache.js").write_text("export const get = () => 2;\n")
+        after = build_static.build(str(static_dir))["assets"]
+        changed = {path for path in before if before[path] != after[path]}
+        assert changed == {"js/cache.js", "js/api.js", "js/main.js"}
+
+    def test_lists_transitive_imports(self, static_dir):
+        """Test the manifest lists every module a script loads."""
+        manifest = build_static.build(str(static_dir))
+        assert set(manifest["imports"]["js/main.js"]) == {"js/api.js", "js/cache.js", "js/draw.js"}
+
+    def test_clean_removes_stale_files(self, static_dir):
+        """Test --clean drops files from earlier builds and keeps current ones."""
+        old = build_static.build(str(static_dir))["assets"]["js/cache.js"]
+        (static_dir / "js" / "cache.js").write_text("export const get = () => 3;\n")
+        build_static.build(str(static_dir))
+        assert (static_dir / "dist" / old).exists()
+        manifest = build_static.build(str(static_dir), clean=True)
+        assert not (static_dir / "dist" / old).exists()
+        assert (static_dir / "dist" / manifest["assets"]["js/cache.js"]).exists()
+
+    def test_reference_cycle_rejected(self, static_dir):
+        """Test modules importing each other are reported instead of looping."""
+        (static_dir / "js" / "cache.js").write_text("import { load } from './api.js';\nexport const get = load;\n")
+        with pytest.raises(ValueError, match="reference cycle"):
+            build_static.build(str(static_dir))
+
+
+    def test_tools_do_not_start_the_app(self, tmp_path):
+        """Test running a build step neither creates the app nor touches the database."""
+        db_path = tmp_path / "untouched.sqlite3"
+        package_parent = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        probe = "import sys, webapp.tools.build_static, webapp.tools.precompress; print('webapp.app' in sys.modules)"
+        output = subprocess.run(
+            [sys.executable, "-c", probe],
+            env=dict(os.environ, SHOVO_DB_PATH=str(db_path)),
+            cwd=package_parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        assert output.strip() == "False"
+        assert not db_path.exists()
+
+
+class TestAssetUrls:
+    """Tests for asset_url and how fingerprinted files are served."""
+
+    def test_falls_back_without_build(self, tmp_path):
+        """Test unbuilt trees use plain /static/ URLs and the app version."""
+        manifest = load_manifest(str(tmp_path), "1.0.0")
+        assert manifest.version == "1.0.0"
+        assert manifest.url("style.css") == "/static/style.css"
+        assert manifest.preloads("js/main.js") == []
+
+    def test_built_urls(self, static_dir):
+        """Test built trees map paths to their fingerprinted URLs."""
+        built = build_static.build(str(static_dir))
+        manifest = load_manifest(str(static_dir), "1.0.0")
+        assert manifest.version == built["version"]
+        assert manifest.url("style.css") == f"/static/dist/{built['assets']['style.css']}"
+        assert manifest.url("missing.png") == "/static/missing.png"
+        assert f"/static/dist/{built['assets']['js/cache.js']}" in manifest.preloads("js/main.js")
+
+    def test_room_page_uses_manifest(self, app, client, monkeypatch):
+        """Test the room page links fingerprinted assets and versions the service worker."""
+        manifest = AssetManifest(
+            version="abc12345",
+            assets={"js/main.js": "js/main.1111.js", "js/api.js": "js/api.2222.js", "style.css": "style.3333.css"},
+            imports={"js/main.js": ["js/api.js"]},
+        )
+        monkeypatch.setitem(app.jinja_env.globals, "asset_url", manifest.url)
+        monkeypatch.setitem(app.jinja_env.globals, "asset_preloads", manifest.preloads)
+        monkeypatch.setitem(app.jinja_env.globals, "asset_version", manifest.version)
+        html = client.get("/r/assetroom").get_data(as_text=True)
+        assert 'src="/static/dist/js/main.1111.js"' in html
+        assert '<link rel="modulepreload" href="/static/dist/js/api.2222.js" />' in html
+        assert 'href="/static/dist/style.3333.css"' in html
+        assert "/static/sw.js?v=abc12345" in html
+
+    def test_fingerprinted_files_immutable(self, app, client, static_dir, monkeypatch):
+        """Test files under dist/ are cached for a year and the service worker never is."""
+        built = build_static.build(str(static_dir))
+        monkeypatch.setattr(app, "static_folder", str(static_dir))
+        response = client.get(f"/static/dist/{built['assets']['style.css']}")
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == IMMUTABLE_MAX_AGE_SECONDS
+        assert not client.get("/static/dist/manifest.json").cache_control.immutable
+        response = client.get("/static/sw.js")
+        assert response.headers["Service-Worker-Allowed"] == "/"
+        assert response.cache_control.no_cache
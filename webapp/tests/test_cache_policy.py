@@ -0,0 +1,148 @@
+"""Tests for cache TTL policies."""
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+from webapp import cache_policy
+from webapp.cache_policy import (
+    DAY,
+    EMPTY_TTL_SECONDS,
+    FAILURE_JITTER,
+    FAILURE_TTL_SECONDS,
+    AgeAwareTtlPolicy,
+    CacheEntryContext,
+    FlatTtlPolicy,
+    parse_year,
+)
+
+THIS_YEAR = datetime.date.today().year
+
+
+@pytest.fixture
+def age_policy():
+    """Activate the age-aware policy for the duration of a test."""
+    previous = cache_policy.get_ttl_policy()
+    cache_policy.set_ttl_policy("age")
+    yield cache_policy.get_ttl_policy()
+    cache_policy.set_ttl_policy(previous)
+
+
+class TestAgeAwareTtlPolicy:
+    """Tests for AgeAwareTtlPolicy."""
+
+    def test_old_titles_live_longer(self):
+        """Test an old film's entries outlive a new release's."""
+        policy = AgeAwareTtlPolicy()
+        new = policy.ttl_seconds(CacheEntryContext("rating", year=THIS_YEAR))
+        old = policy.ttl_seconds(CacheEntryContext("rating", year=1972))
+        assert old >= 14 * DAY
+        assert new < old
+
+    def test_stable_values_back_off(self):
+        """Test unchanged values get longer lifetimes, capped at 8x."""
+        policy = AgeAwareTtlPolicy()
+        base = policy.ttl_seconds(CacheEntryContext("rating", year=THIS_YEAR))
+        stable = policy.ttl_seconds(CacheEntryContext("rating", year=THIS_YEAR, changed=False, stable_count=2))
+        capped = policy.ttl_seconds(CacheEntryContext("rating", year=THIS_YEAR, changed=False, stable_count=10))
+        assert stable == base * 4
+        assert capped == base * 8
+
+    def test_failures_retry_soon(self):
+        """Test failed fetches get the short, jittered failure lifetime."""
+        policy = AgeAwareTtlPolicy()
+        ttl = policy.ttl_seconds(CacheEntryContext("metadata", year=1972, status="error"))
+        assert FAILURE_TTL_SECONDS * (1 - FAILURE_JITTER) <= ttl <= FAILURE_TTL_SECONDS * (1 + FAILURE_JITTER)
+
+    def test_repeated_failures_back_off(self):
+        """Test consecutive failures wait longer, up to 16x."""
+        policy = AgeAwareTtlPolicy()
+        ttl = policy.ttl_seconds(CacheEntryContext("rating", status="error", changed=False, stable_count=10))
+        assert ttl >= 16 * FAILURE_TTL_SECONDS * (1 - FAILURE_JITTER)
+        assert ttl <= 16 * FAILURE_TTL_SECONDS * (1 + FAILURE_JITTER)
+
+    def test_empty_results_cached_long(self):
+        """Test older titles the upstream has no data for are not refetched for days."""
+        for policy in (AgeAwareTtlPolicy(), FlatTtlPolicy()):
+            assert policy.ttl_seconds(CacheEntryContext("rating", year=1972, status="empty")) == EMPTY_TTL_SECONDS
+            assert policy.ttl_seconds(CacheEntryContext("rating", status="empty")) == EMPTY_TTL_SECONDS
+
+    def test_empty_recent_release_uses_policy_ttl(self):
+        """Test a new release without a rating yet is rechecked as often as a rated one."""
+        for policy in (AgeAwareTtlPolicy(), FlatTtlPolicy()):
+            for year in (THIS_YEAR - 1, THIS_YEAR, THIS_YEAR + 1):
+                empty = policy.ttl_seconds(CacheEntryContext("rating", year=year, status="empty"))
+                assert empty == policy.ttl_seconds(CacheEntryContext("rating", year=year))
+                assert empty < EMPTY_TTL_SECONDS
+
+    def test_ongoing_series_metadata_capped(self):
+        """Test series metadata is refreshed at least daily."""
+        policy = AgeAwareTtlPolicy()
+        context = CacheEntryContext("metadata", year=1990, normalized_type="tvseries")
+        assert policy.ttl_seconds(context) == DAY
+
+    def test_flat_policy(self):
+        """Test the flat policy ignores the context."""
+        assert FlatTtlPolicy(60).ttl_seconds(CacheEntryContext("rating", year=1950)) == 60
+
+
+class TestParseYear:
+    """Tests for parse_year."""
+
+    def test_parse_year_values(self):
+        """Test years are read from the formats IMDB and OMDB use."""
+        assert parse_year("1994") == 1994
+        assert parse_year("2001–2003") == 2001
+        assert parse_year(1972) == 1972
+        assert parse_year("N/A") is None
+        assert parse_year(None) is None
+
+
+class TestCacheRows:
+    """Tests for policy-driven cache rows."""
+
+    def test_rows_record_policy_and_expiry(self, app, age_policy):
+        """Test cache rows store the policy name and expiry."""
+        from webapp import database
+
+        with database.get_db_context() as conn:
+            database.rating_cache_set(conn, "tt0300001", "8.0", "90%", year=1972, normalized_type="movie")
+            row = conn.execute(
+                "SELECT cached_at, expires_at, ttl_policy, stable_count FROM rating_cache WHERE title_id = ?",
+                ("tt0300001",),
+            ).fetchone()
+            assert row["ttl_policy"] == "age"
+            assert row["expires_at"] - row["cached_at"] >= 14 * DAY
+            assert row["stable_count"] == 0
+
+            database.rating_cache_set(conn, "tt0300001", "8.0", "90%", year=1972, normalized_type="movie")
+            row = conn.execute(
+                "SELECT stable_count FROM rating_cache WHERE title_id = ?", ("tt0300001",)
+            ).fetchone()
+            assert row["stable_count"] == 1
+
+    def test_expired_rows_are_stale(self, app, age_policy):
+        """Test rows past their expiry are only served with allow_stale."""
+        from webapp import database
+
+        with database.get_db_context() as conn:
+            database.rating_cache_set(conn, "tt0300002", "6.0", None, year=THIS_YEAR)
+            conn.execute("UPDATE rating_cache SET expires_at = 0 WHERE title_id = ?", ("tt0300002",))
+            assert database.rating_cache_get(conn, "tt0300002") is None
+            assert database.rating_cache_get(conn, "tt0300002", allow_stale=True) == ("6.0", None)
+
+    def test_status_change_resets_stability(self, app, age_policy):
+        """Test an error after a good value with the same values does not count as stable."""
+        from webapp import database
+
+        with database.get_db_context() as conn:
+            database.rating_cache_set(conn, "tt0300003", "7.0", None, year=1972)
+            database.rating_cache_set(conn, "tt0300003", "7.0", None, year=1972, status="error")
+            row = conn.execute(
+                "SELECT status, stable_count, expires_at - cached_at AS ttl FROM rating_cache WHERE title_id = ?",
+                ("tt0300003",),
+            ).fetchone()
+            assert row["status"] == "error"
+            assert row["stable_count"] == 0
+            assert row["ttl"] <= FAILURE_TTL_SECONDS * (1 + FAILURE_JITTER)
@@ -0,0 +1,99 @@
+"""Tests for response compression and precompressed static files."""
+from __future__ import annotations
+
+import gzip
+import os
+
+import pytest
+
+from webapp import compression
+from webapp.compression import choose_encoding
+from webapp.tools import precompress
+
+
+def _fill_room(client, room: str, count: int) -> None:
+    client.post(
+        "/api/list/import",
+        json={
+            "room": room,
+            "items": [{"title_id": f"tt{index:07d}", "title": f"Movie {index}"} for index in range(count)],
+        },
+    )
+
+
+class TestChooseEncoding:
+    """Tests for Accept-Encoding negotiation."""
+
+    def test_gzip_without_brotli(self, monkeypatch):
+        """Test gzip is used when brotli is not installed."""
+        monkeypatch.setattr(compression, "brotli", None)
+        assert choose_encoding("gzip, deflate, br") == "gzip"
+
+    def test_zero_quality_refused(self):
+        """Test encodings with q=0 are not used."""
+        assert choose_encoding("gzip;q=0") is None
+        assert choose_encoding("") is None
+
+
+class TestJsonCompression:
+    """Tests for compressing dynamic responses."""
+
+    def test_large_json_gzipped(self, client, monkeypatch):
+        """Test large JSON responses are gzipped for clients that accept it."""
+        monkeypatch.setattr(compression, "brotli", None)
+        _fill_room(client, "gziproom", 40)
+        response = client.get("/api/list?room=gziproom&per_page=40", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert b"tt0000001" in gzip.decompress(response.data)
+
+    def test_identity_without_accept_encoding(self, client):
+        """Test clients that do not ask for compression get plain JSON."""
+        _fill_room(client, "plainroom", 40)
+        response = client.get("/api/list?room=plainroom&per_page=40")
+        assert "Content-Encoding" not in response.headers
+        assert response.get_json()["total_count"] == 40
+
+    def test_small_responses_untouched(self, client):
+        """Test responses under the threshold are not compressed."""
+        response = client.get("/api/list?room=tinyroom", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+
+    def test_streamed_exports_untouched(self, client):
+        """Test streamed responses are passed through."""
+        _fill_room(client, "streamroom", 40)
+        response = client.get("/api/list/export?room=streamroom", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+
+
+class TestPrecompressedStatic:
+    """Tests for the precompress build step and serving its output."""
+
+    @pytest.fixture
+    def static_dir(self, app, tmp_path, monkeypatch):
+        """Point the app's static folder at a scratch copy with one stylesheet."""
+        (tmp_path / "site.css").write_text("body { color: red; }\n" * 200)
+        (tmp_path / "tiny.css").write_text("a{}")
+        monkeypatch.setattr(app, "static_folder", str(tmp_path))
+        return tmp_path
+
+    def test_build_writes_siblings(self, static_dir):
+        """Test gzip siblings are written for files large enough to benefit."""
+        written = precompress.precompress_directory(str(static_dir))
+        assert str(static_dir / "site.css.gz") in written
+        assert not os.path.exists(static_dir / "tiny.css.gz")
+
+    def test_serves_gzip_sibling(self, client, static_dir):
+        """Test the precompressed file is served to clients that accept gzip."""
+        precompress.precompress_directory(str(static_dir))
+        response = client.get("/static/site.css", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.mimetype == "text/css"
+        assert gzip.decompress(response.data).startswith(b"body")
+
+    def test_stale_sibling_ignored(self, client, static_dir):
+        """Test an outdated compressed copy is not served."""
+        precompress.precompress_directory(str(static_dir))
+        os.utime(static_dir / "site.css.gz", (0, 0))
+        response = client.get("/static/site.css", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
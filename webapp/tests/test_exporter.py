@@ -0,0 +1,98 @@
+"""Tests for streaming list export."""
+from __future__ import annotations
+
+import csv
+import io
+import json
+
+from webapp import exporter
+
+
+def _fill_room(client, room: str, count: int) -> None:
+    client.post(
+        "/api/list/import",
+        json={
+            "room": room,
+            "items": [
+                {"title_id": f"tt{index:07d}", "title": f"Movie {index}", "watched": index % 2}
+                for index in range(count)
+            ],
+        },
+    )
+
+
+class TestExportAPI:
+    """Tests for GET /api/list/export."""
+
+    def test_ndjson_export(self, client):
+        """Test every title is streamed as one JSON object per line."""
+        _fill_room(client, "exportroom", 5)
+        response = client.get("/api/list/export?room=exportroom")
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert response.is_streamed
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert len(rows) == 5
+        assert {row["title_id"] for row in rows} == {f"tt{index:07d}" for index in range(5)}
+        assert "room" not in rows[0]
+
+    def test_csv_export_filtered_by_status(self, client):
+        """Test CSV exports have a header and honour the status filter."""
+        _fill_room(client, "csvexport", 4)
+        response = client.get("/api/list/export?room=csvexport&format=csv&status=watched")
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert response.mimetype == "text/csv"
+        assert [row["title_id"] for row in rows] == ["tt0000001", "tt0000003"]
+
+    def test_round_trip_through_import(self, client):
+        """Test an NDJSON export can be imported into another room."""
+        _fill_room(client, "sourceroom", 3)
+        exported = client.get("/api/list/export?room=sourceroom").get_data()
+        response = client.post(
+            "/api/list/import?room=copyroom", data=exported, content_type="application/x-ndjson"
+        )
+        assert response.get_json()["imported"] == 3
+        copied = client.get("/api/list/export?room=copyroom").get_data(as_text=True).splitlines()
+        assert [json.loads(line)["watched"] for line in copied] == [0, 0, 1]
+
+    def test_invalid_format(self, client):
+        """Test unknown formats are rejected."""
+        assert client.get("/api/list/export?room=exportroom&format=xml").status_code == 400
+
+    def test_per_page_capped(self, client):
+        """Test /api/list no longer builds arbitrarily large pages."""
+        response = client.get("/api/list?room=exportroom&per_page=100000")
+        assert response.get_json()["per_page"] == 100
+
+
+class TestBackup:
+    """Tests for the backup command."""
+
+    def test_backup_includes_rooms(self, app, tmp_path):
+        """Test a whole-database export tags each row with its room."""
+        from webapp import database
+
+        with database.get_db_context() as conn:
+            conn.execute(
+                "INSERT INTO lists (room, title_id, title, added_at) VALUES ('backuproom', 'tt0600001', 'B', 0)"
+            )
+            conn.commit()
+        output = tmp_path / "backup.ndjson"
+        assert exporter.main(["--output", str(output)]) == 0
+        rows = [json.loads(line) for line in output.read_text().splitlines()]
+        assert {"room": "backuproom", "title_id": "tt0600001"}.items() <= next(
+            row for row in rows if row["title_id"] == "tt0600001"
+        ).items()
+
+    def test_fetches_in_batches(self, app, monkeypatch):
+        """Test rows are pulled from the cursor in small batches."""
+        from webapp import database
+
+        monkeypatch.setattr(exporter, "FETCH_SIZE", 2)
+        with database.get_db_context() as conn:
+            conn.executemany(
+                "INSERT INTO lists (room, title_id, title, added_at) VALUES ('batchroom', ?, 'x', 0)",
+                [(f"tt07{index:05d}",) for index in range(5)],
+            )
+            rows = list(exporter.iter_list_rows(conn, "batchroom"))
+        assert len(rows) == 5
@@ -1,8 +1,41 @@
 """Tests for external API functions."""
 from __future__ import annotations
 
+import datetime
+from unittest import mock
+
+import requests
+
+from webapp import external_api
 from webapp.external_api import normalize_type_label, shrink_image_url
 
+IMDB_PAGE = (
+    '<html><head><script type="application/ld+json">'
+    '{"@type": "Movie", "aggregateRating": {"ratingValue": 8.1}, '
+    '"duration": "PT2H22M", "datePublished": "1994-10-14"}'
+    "</script></head><body></body></html>"
+)
+OMDB_TITLE = {
+    "Response": "True",
+    "Runtime": "142 min",
+    "Language": "English, French",
+    "Ratings": [{"Source": "Rotten Tomatoes", "Value": "91%"}],
+}
+
+
+def fake_upstream_get(calls: list[tuple[str, dict]]):
+    """Build an upstream_get replacement that records calls and serves canned payloads."""
+
+    def _get(name, url, deadline=None, **kwargs):
+        calls.append((name, kwargs.get("params") or {}))
+        response = mock.Mock(status_code=200)
+        response.text = IMDB_PAGE
+        response.iter_content.side_effect = lambda chunk_size: iter([IMDB_PAGE.encode()])
+        response.json.return_value = OMDB_TITLE
+        return response
+
+    return _get
+
 
 class TestNormalizeTypeLabel:
     """Tests for normalize_type_label function."""
@@ -66,3 +99,236 @@ class TestShrinkImageUrl:
         """Test shrinking non-IMDB URL returns unchanged."""
         url = "https://example.com/image.jpg"
         assert shrink_image_url(url) == url
+
+
+class TestTitleEnrichment:
+    """Tests for the unified per-title enrichment pipeline."""
+
+    def test_single_omdb_request_per_title(self, app):
+        """Test ratings and metadata come from one IMDB and one OMDB request."""
+        calls: list[tuple[str, dict]] = []
+        with mock.patch.object(external_api, "upstream_get", side_effect=fake_upstream_get(calls)):
+            details = external_api.get_details("tt0100001", "test", "movie")
+        assert [name for name, _ in calls] == ["imdb", "omdb"]
+        assert details.rating == "8.1"
+        assert details.rotten_tomatoes == "91%"
+        assert details.runtime_minutes == 142
+        assert details.original_language == "English"
+
+    def test_caches_populated_together(self, app):
+        """Test a second lookup is served from both caches without upstream calls."""
+        calls: list[tuple[str, dict]] = []
+        with mock.patch.object(external_api, "upstream_get", side_effect=fake_upstream_get(calls)):
+            external_api.get_details("tt0100002", "test", "movie")
+            calls.clear()
+            assert external_api.get_ratings("tt0100002", "test") == ("8.1", "91%")
+            assert external_api.get_metadata("tt0100002", "test", "movie")[0] == 142
+        assert calls == []
+
+    def test_refresh_bypasses_cache(self, app):
+        """Test refresh_title_details always refetches."""
+        calls: list[tuple[str, dict]] = []
+        with mock.patch.object(external_api, "upstream_get", side_effect=fake_upstream_get(calls)):
+            external_api.get_details("tt0100003", "test", "movie")
+            external_api.refresh_title_details("tt0100003", "test", "movie")
+        assert [name for name, _ in calls] == ["imdb", "omdb", "imdb", "omdb"]
+
+
+class TestNegativeCaching:
+    """Tests for caching upstream errors and missing data."""
+
+    @staticmethod
+    def _status(title_id: str) -> str:
+        from webapp import database
+
+        with database.get_db_context() as conn:
+            return conn.execute(
+                "SELECT status FROM rating_cache WHERE title_id = ?", (title_id,)
+            ).fetchone()["status"]
+
+    def test_error_keeps_stale_values(self, app):
+        """Test a failed refresh keeps the previous values with status error."""
+        calls: list[tuple[str, dict]] = []
+        with mock.patch.object(external_api, "upstream_get", side_effect=fake_upstream_get(calls)):
+            external_api.get_details("tt0100004", "test", "movie")
+        with mock.patch.object(external_api, "upstream_get", side_effect=requests.ConnectionError("blip")):
+            details = external_api.refresh_title_details("tt0100004", "test", "movie")
+        assert details.rating == "8.1"
+        assert details.rotten_tomatoes == "91%"
+        assert self._status("tt0100004") == "error"
+
+    def test_missing_title_cached_as_empty(self, app):
+        """Test a 404 from the upstream is cached as empty rather than error."""
+        missing = requests.HTTPError("not found", response=mock.Mock(status_code=404))
+        with mock.patch.object(external_api, "upstream_get", side_effect=missing):
+            details = external_api.refresh_title_details("tt0100005", "test", "movie")
+        assert details.rating is None
+        assert self._status("tt0100005") == "empty"
+
+
+class TestImdbStructuredData:
+    """Tests for IMDB structured data parsing."""
+
+    def test_parse_iso_duration(self):
+        """Test ISO-8601 durations are converted to minutes."""
+        assert external_api._parse_iso_duration("PT2H22M") == 142
+        assert external_api._parse_iso_duration("PT45M") == 45
+        assert external_api._parse_iso_duration("PT1H") == 60
+        assert external_api._parse_iso_duration("P") is None
+        assert external_api._parse_iso_duration("garbage") is None
+        assert external_api._parse_iso_duration(None) is None
+
+    def test_parse_structured_data(self):
+        """Test rating, runtime, type and year are read from ld+json."""
+        data = external_api._parse_imdb_structured_data(IMDB_PAGE)
+        assert data == {"rating": "8.1", "runtime_minutes": 142, "type": "movie", "year": "1994"}
+
+    def test_parse_missing_block(self):
+        """Test pages without structured data parse to nothing."""
+        assert external_api._parse_imdb_structured_data("<html></html>") == {}
+
+    def test_stream_split_markers(self):
+        """Test the ld+json block is found when tags straddle chunk boundaries."""
+        page = IMDB_PAGE.encode()
+        chunks = [page[index : index + 7] for index in range(0, len(page), 7)]
+        raw = external_api._extract_ld_json(chunks)
+        assert raw is not None and raw.startswith('{"@type": "Movie"')
+
+    def test_stream_stops_after_block(self):
+        """Test no chunks are consumed after the closing script tag."""
+        consumed = []
+
+        def chunks():
+            for chunk in (b"<html><head>", IMDB_PAGE.encode(), b"<body>" * 100, b"<footer>"):
+                consumed.append(chunk)
+                yield chunk
+
+        assert external_api._extract_ld_json(chunks()) is not None
+        assert len(consumed) == 2
+
+    def test_fetch_streams_page(self):
+        """Test the IMDB title page is requested as a stream."""
+        calls: list[tuple[str, dict]] = []
+        with mock.patch.object(external_api, "upstream_get", side_effect=fake_upstream_get(calls)) as get:
+            assert external_api._fetch_imdb_title("tt0100006", "test")["rating"] == "8.1"
+        assert get.call_args.kwargs["stream"] is True
+
+    def test_omdb_skipped_without_gaps(self, app, monkeypatch):
+        """Test OMDB is not called when it has nothing to add."""
+        monkeypatch.setattr(external_api, "OMDB_GAP_FIELDS", {"total_seasons"})
+        calls: list[tuple[str, dict]] = []
+        with mock.patch.object(external_api, "upstream_get", side_effect=fake_upstream_get(calls)):
+            details = external_api.get_details("tt0100004", "test", "movie")
+        assert [name for name, _ in calls] == ["imdb"]
+        assert details.rating == "8.1"
+        assert details.runtime_minutes == 142
+        assert details.rotten_tomatoes is None
+
+    def test_expired_rating_reuses_fresh_omdb_fields(self, app):
+        """Test an expired rating is refreshed from IMDB alone while the metadata is fresh."""
+        from webapp import database
+
+        calls: list[tuple[str, dict]] = []
+        with mock.patch.object(external_api, "upstream_get", side_effect=fake_upstream_get(calls)):
+            external_api.get_details("tt0100007", "test", "movie")
+            assert [name for name, _ in calls] == ["imdb", "omdb"]
+            with database.get_db_context() as conn:
+                conn.execute("UPDATE rating_cache SET expires_at = 0 WHERE title_id = ?", ("tt0100007",))
+                conn.commit()
+                metadata_row = conn.execute("SELECT * FROM metadata_cache WHERE title_id = 'tt0100007'").fetchone()
+            calls.clear()
+            details = external_api.get_details("tt0100007", "test", "movie")
+            assert [name for name, _ in calls] == ["imdb"]
+            assert (details.rotten_tomatoes, details.original_language) == ("91%", "English")
+            with database.get_db_context() as conn:
+                assert conn.execute("SELECT * FROM metadata_cache WHERE title_id = 'tt0100007'").fetchone() == metadata_row
+                assert database.rating_cache_get(conn, "tt0100007") == ("8.1", "91%")
+            calls.clear()
+            external_api.refresh_title_details("tt0100007", "test", "movie")
+        assert [name for name, _ in calls] == ["imdb", "omdb"]
+
+    def test_omdb_mode_always_calls_omdb(self, app, monkeypatch):
+        """Test the omdb enrichment mode keeps the original behaviour."""
+        monkeypatch.setattr(external_api, "ENRICHMENT_MODE", "omdb")
+        monkeypatch.setattr(external_api, "OMDB_GAP_FIELDS", {"total_seasons"})
+        calls: list[tuple[str, dict]] = []
+        with mock.patch.object(external_api, "upstream_get", side_effect=fake_upstream_get(calls)):
+            external_api.get_details("tt0100005", "test", "movie")
+        assert [name for name, _ in calls] == ["imdb", "omdb"]
+
+
+class TestSeasonCache:
+    """Tests for per-season episode caching."""
+
+    @staticmethod
+    def _miniseries_upstream(calls: list[tuple[str, dict]]):
+        today = datetime.date.today().isoformat()
+
+        def _get(name, url, deadline=None, **kwargs):
+            params = kwargs.get("params") or {}
+            calls.append((name, params))
+            response = mock.Mock(status_code=200)
+            response.iter_content.side_effect = lambda chunk_size: iter([b"<html></html>"])
+            if "Season" not in params:
+                response.json.return_value = {"Response": "True", "Runtime": "55 min", "totalSeasons": "3"}
+            else:
+                released = today if params["Season"] == 3 else "2001-09-09"
+                episodes = [{"Episode": str(number), "Released": released} for number in range(1, 5)]
+                response.json.return_value = {"Response": "True", "Episodes": episodes}
+            return response
+
+        return _get
+
+    def test_counts_episodes_across_seasons(self, app):
+        """Test episodes are summed over every season."""
+        calls: list[tuple[str, dict]] = []
+        with mock.patch.object(external_api, "upstream_get", side_effect=self._miniseries_upstream(calls)):
+            details = external_api.refresh_title_details("tt0200001", "test", "tvminiseries")
+        assert details.total_seasons == 3
+        assert details.total_episodes == 12
+        assert sorted(params["Season"] for _, params in calls if "Season" in params) == [1, 2, 3]
+
+    def test_refresh_reuses_cached_seasons(self, app):
+        """Test a refresh refetches only the season still airing once the short TTL passes."""
+        from webapp import database
+
+        calls: list[tuple[str, dict]] = []
+        with mock.patch.object(external_api, "upstream_get", side_effect=self._miniseries_upstream(calls)):
+            external_api.refresh_title_details("tt0200002", "test", "tvminiseries")
+            calls.clear()
+            external_api.refresh_title_details("tt0200002", "test", "tvminiseries")
+            assert [params for _, params in calls if "Season" in params] == []
+
+            with database.get_db_context() as conn:
+                conn.execute("UPDATE season_cache SET cached_at = cached_at - 7200 WHERE title_id = ?", ("tt0200002",))
+                conn.commit()
+            details = external_api.refresh_title_details("tt0200002", "test", "tvminiseries")
+        assert [params["Season"] for _, params in calls if "Season" in params] == [3]
+        assert details.total_episodes == 12
+
+    def test_season_fetches_leave_database_writable(self, app, monkeypatch):
+        """Test queued season fetches can still write, e.g. to count the OMDB quota."""
+        from webapp import database
+
+        monkeypatch.setattr(external_api, "SEASON_FETCH_CONCURRENCY", 1)
+        calls: list[tuple[str, dict]] = []
+        fetch = self._miniseries_upstream(calls)
+        locked: list[int] = []
+
+        def _get(name, url, deadline=None, **kwargs):
+            params = kwargs.get("params") or {}
+            if "Season" in params:
+                conn = database.connect(timeout=0)
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.rollback()
+                except database.sqlite3.OperationalError:
+                    locked.append(params["Season"])
+                finally:
+                    conn.close()
+            return fetch(name, url, deadline=deadline, **kwargs)
+
+        with mock.patch.object(external_api, "upstream_get", side_effect=_get):
+            details = external_api.refresh_title_details("tt0200003", "test", "tvminiseries")
+        assert locked == []
+        assert details.total_episodes == 12
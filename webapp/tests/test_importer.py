@@ -0,0 +1,128 @@
+"""Tests for bulk watchlist import."""
+from __future__ import annotations
+
+from unittest import mock
+
+from webapp import importer, jobs, routes
+from webapp.models import TitleDetails
+
+IMDB_CSV = """﻿Position,Const,Created,Modified,Description,Title,URL,Title Type,IMDb Rating,Runtime (mins),Year
+1,tt0111161,2024-01-01,2024-01-01,,The Shawshank Redemption,https://www.imdb.com/title/tt0111161/,movie,9.3,142,1994
+2,tt0903747,2024-01-02,2024-01-02,,Breaking Bad,https://www.imdb.com/title/tt0903747/,tvSeries,9.5,,2008
+3,nonsense,2024-01-03,2024-01-03,,Broken,,movie,,,
+"""
+
+
+def _items(client, room: str) -> list[dict]:
+    return client.get(f"/api/list?room={room}&per_page=50").get_json()["items"]
+
+
+class TestImportItems:
+    """Tests for validating and inserting imported rows."""
+
+    def test_validate_item(self):
+        """Test rows are normalized and bad ones are rejected with a reason."""
+        item = importer.validate_item(
+            {"title_id": "tt0111161", "title": " Film ", "rating": "9.30", "runtime_minutes": "142"}
+        )
+        assert item["title"] == "Film"
+        assert item["rating"] == "9.3"
+        assert item["runtime_minutes"] == 142
+        assert importer.validate_item({"title_id": "12", "title": "x"}) == "invalid_title_id"
+        assert importer.validate_item({"title_id": "tt0111161"}) == "missing_title"
+
+    def test_row_limit(self, monkeypatch):
+        """Test oversized imports are rejected before anything is written."""
+        monkeypatch.setattr(importer, "MAX_IMPORT_ROWS", 2)
+        rows = [{"title_id": f"tt{index:07d}", "title": "x"} for index in range(3)]
+        try:
+            importer.validate_items(rows)
+        except importer.ImportTooLarge:
+            pass
+        else:
+            raise AssertionError("expected ImportTooLarge")
+
+    def test_add_between_validation_and_insert(self, app):
+        """Test a title added after validation is skipped instead of failing the import."""
+        from webapp import database
+
+        validated = importer.validate_items(
+            [{"title_id": "tt0000201", "title": "A"}, {"title_id": "tt0000202", "title": "B"}]
+        )
+        with database.get_db_context() as conn:
+            database.migrate_db(conn)
+            conn.execute(
+                "INSERT INTO lists (room, title_id, title, added_at, position) VALUES ('raceroom', 'tt0000202', 'B', 0, 1)"
+            )
+            conn.commit()
+            result = importer.import_items(conn, "raceroom", validated)
+            conn.commit()
+            assert (result.imported, result.skipped) == (1, 1)
+            positions = conn.execute("SELECT position FROM lists WHERE room = 'raceroom' ORDER BY position").fetchall()
+            assert [row["position"] for row in positions] == [1, 2]
+
+
+class TestImportAPI:
+    """Tests for POST /api/list/import."""
+
+    def test_imdb_csv(self, client):
+        """Test an IMDb export is imported in file order, skipping invalid rows."""
+        response = client.post("/api/list/import?room=csvroom", data=IMDB_CSV, content_type="text/csv")
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data["imported"] == 2
+        assert data["invalid"] == 1
+        assert data["errors"] == [{"row": 3, "error": "invalid_title_id"}]
+        items = _items(client, "csvroom")
+        assert [item["title_id"] for item in items] == ["tt0111161", "tt0903747"]
+        assert items[0]["rating"] == "9.3"
+        assert items[0]["runtime_minutes"] == 142
+
+    def test_csv_file_upload(self, client):
+        """Test the CSV can be sent as a multipart file."""
+        import io
+
+        response = client.post(
+            "/api/list/import?room=uploadroom",
+            data={"file": (io.BytesIO(IMDB_CSV.encode()), "watchlist.csv")},
+            content_type="multipart/form-data",
+        )
+        assert response.get_json()["imported"] == 2
+
+    def test_json_goes_above_existing_and_skips_duplicates(self, client):
+        """Test imported titles go on top of the list and existing titles are kept."""
+        client.post("/api/list", json={"room": "jsonroom", "title_id": "tt0000100", "title": "Old", "rating": "5.0"})
+        response = client.post(
+            "/api/list/import",
+            json={
+                "room": "jsonroom",
+                "items": [
+                    {"title_id": "tt0000101", "title": "New"},
+                    {"title_id": "tt0000100", "title": "Old again", "rating": "9.0"},
+                    {"title_id": "tt0000102", "title": "Seen", "watched": True},
+                ],
+            },
+        )
+        data = response.get_json()
+        assert data["imported"] == 2
+        assert data["skipped"] == 1
+        items = _items(client, "jsonroom")
+        assert [item["title_id"] for item in items] == ["tt0000101", "tt0000100"]
+        assert items[1]["rating"] == "5.0"
+
+    def test_schedules_enrichment(self, client, monkeypatch):
+        """Test titles without details are enriched by a job whose progress can be read."""
+        monkeypatch.setattr(routes, "ENRICH_ON_ADD", True)
+        with mock.patch.object(jobs, "get_details", return_value=TitleDetails(runtime_minutes=49)) as get_details:
+            response = client.post("/api/list/import?room=enrichimport", data=IMDB_CSV, content_type="text/csv")
+            job_id = response.get_json()["job_id"]
+            assert jobs.wait_for_idle()
+        get_details.assert_called_once_with("tt0903747", mock.ANY, "tvseries")
+        status = client.get(f"/api/list/jobs/{job_id}").get_json()
+        assert status == {**status, "total": 1, "processed": 1, "done": True}
+
+    def test_requires_room(self, client):
+        """Test the room is required."""
+        response = client.post("/api/list/import", json=[{"title_id": "tt0000001", "title": "x"}])
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "missing_room"
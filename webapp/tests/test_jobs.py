@@ -0,0 +1,85 @@
+"""Tests for background enrichment jobs."""
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+
+from webapp import jobs, routes
+from webapp.models import TitleDetails
+
+DETAILS = TitleDetails(rating="7.7", rotten_tomatoes="81%", runtime_minutes=101, original_language="English")
+
+
+@pytest.fixture
+def enrichment(monkeypatch):
+    """Enable enrichment on add, with upstream lookups replaced by canned details."""
+    monkeypatch.setattr(routes, "ENRICH_ON_ADD", True)
+    with mock.patch.object(jobs, "get_details", return_value=DETAILS) as get_details:
+        yield get_details
+        assert jobs.wait_for_idle()
+
+
+def _items(client, room: str) -> list[dict]:
+    return client.get(f"/api/list?room={room}").get_json()["items"]
+
+
+class TestEnrichOnAdd:
+    """Tests for enrichment queued by POST /api/list."""
+
+    def test_missing_details_are_filled(self, client, enrichment):
+        """Test a title added without details gets them in the background."""
+        response = client.post(
+            "/api/list",
+            json={"room": "enrichroom", "title_id": "tt0500001", "title": "Bare", "type_label": "tvSeries"},
+        )
+        job_id = response.get_json()["job_id"]
+        assert jobs.wait_for_idle()
+        enrichment.assert_called_once_with("tt0500001", mock.ANY, "tvseries")
+        item = _items(client, "enrichroom")[0]
+        assert item["rating"] == "7.7"
+        assert item["runtime_minutes"] == 101
+        status = client.get(f"/api/list/jobs/{job_id}").get_json()
+        assert status["done"] and status["processed"] == 1
+
+    def test_complete_titles_not_queued(self, client, enrichment):
+        """Test titles that arrive with rating and runtime are not refetched."""
+        response = client.post(
+            "/api/list",
+            json={
+                "room": "enrichroom",
+                "title_id": "tt0500002",
+                "title": "Full",
+                "rating": "6.0",
+                "runtime_minutes": 90,
+            },
+        )
+        assert "job_id" not in response.get_json()
+        enrichment.assert_not_called()
+
+    def test_existing_values_kept(self, client, enrichment):
+        """Test details missing upstream do not erase values the client sent."""
+        enrichment.return_value = TitleDetails()
+        client.post(
+            "/api/list",
+            json={"room": "enrichroom", "title_id": "tt0500003", "title": "Partial", "rating": "5.5"},
+        )
+        assert jobs.wait_for_idle()
+        item = next(item for item in _items(client, "enrichroom") if item["title_id"] == "tt0500003")
+        assert item["rating"] == "5.5"
+
+    def test_nothing_found_counts_as_failed(self, client, enrichment):
+        """Test a title the upstreams returned nothing for is reported as failed."""
+        enrichment.return_value = TitleDetails()
+        response = client.post(
+            "/api/list",
+            json={"room": "enrichroom", "title_id": "tt0500004", "title": "Unknown"},
+        )
+        job_id = response.get_json()["job_id"]
+        assert jobs.wait_for_idle()
+        status = client.get(f"/api/list/jobs/{job_id}").get_json()
+        assert status == {**status, "done": True, "processed": 0, "failed": 1}
+
+    def test_unknown_job(self, client):
+        """Test unknown job ids return 404."""
+        assert client.get("/api/list/jobs/999999").status_code == 404
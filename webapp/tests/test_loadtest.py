@@ -0,0 +1,74 @@
+"""Tests for the HTTP load-test harness."""
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from webapp import database
+from webapp.benchmarks import loadtest
+
+
+class TestReportHelpers:
+    """Tests for mix parsing, percentiles and comparisons."""
+
+    def test_parse_mix(self):
+        """Test weights override the default mix and unknown endpoints are rejected."""
+        mix = loadtest.parse_mix("list=60, refresh=0")
+        assert mix["list"] == 60
+        assert mix["refresh"] == 0
+        assert mix["search"] == loadtest.DEFAULT_MIX["search"]
+        with pytest.raises(ValueError):
+            loadtest.parse_mix("export=5")
+
+    def test_parse_mix_preset(self):
+        """Test a preset name picks the starting weights that overrides then change."""
+        mix = loadtest.parse_mix("writes,list=0")
+        assert mix["list"] == 0
+        assert mix["add"] == loadtest.WRITE_MIX["add"]
+        assert mix["search"] == 0
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = [float(value) for value in range(1, 101)]
+        assert loadtest.percentile(values, 50) == 50
+        assert loadtest.percentile(values, 99) == 99
+        assert loadtest.percentile([7.0], 95) == 7
+        assert loadtest.percentile([], 50) == 0
+
+    def test_compare(self):
+        """Test changes are reported relative to the earlier run."""
+        row = {"throughput_rps": 100.0, "p50_ms": 10.0, "p95_ms": 20.0, "p99_ms": 40.0}
+        faster = {**row, "throughput_rps": 150.0, "p99_ms": 30.0}
+        lines = loadtest.compare({"total": faster, "endpoints": {}}, {"total": row, "endpoints": {}})
+        assert "throughput_rps +50.0%" in lines[0]
+        assert "p99_ms -25.0%" in lines[0]
+
+
+class TestRun:
+    """Tests for a short in-process run."""
+
+    def test_seed_database(self, tmp_path):
+        """Test seeding creates the rooms with positions and fresh caches."""
+        db_path = str(tmp_path / "load.sqlite3")
+        loadtest.seed_database(db_path, rooms=2, titles_per_room=5)
+        loadtest.seed_database(db_path, rooms=2, titles_per_room=5)
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM lists").fetchone()[0] == 10
+        assert conn.execute("SELECT COUNT(*) FROM rating_cache").fetchone()[0] == 10
+        conn.close()
+
+    def test_in_process_run(self, tmp_path):
+        """Test a run reports every endpoint in the mix and restores the app's settings."""
+        original_db = database.DB_PATH
+        config = loadtest.LoadTestConfig(
+            concurrency=2, requests=60, rooms=2, titles=20, mix=loadtest.parse_mix("refresh=0")
+        )
+        report = loadtest.run(config, db_path=str(tmp_path / "load.sqlite3"))
+        results = report["results"]
+        assert results["total"]["requests"] == 60
+        assert results["total"]["errors"] == 0
+        assert {"list", "search", "details"} <= set(results["endpoints"])
+        assert results["total"]["p50_ms"] <= results["total"]["p99_ms"]
+        assert report["config"]["mix"]["refresh"] == 0
+        assert database.DB_PATH == original_db
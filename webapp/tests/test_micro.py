@@ -0,0 +1,75 @@
+"""Tests for the microbenchmark suite and its regression gate."""
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from webapp.benchmarks import micro
+
+
+def _result(name: str, min_us: float, reference_us: float = 10.0) -> micro.BenchmarkResult:
+    return micro.BenchmarkResult(name, min_us, 0.0, min_us, 1, 5, 0, reference_us)
+
+
+def _baseline(min_us: float, reference_us: float = 10.0) -> dict[str, float]:
+    return {"median_us": min_us, "min_us": min_us, "reference_us": reference_us}
+
+
+class TestTiming:
+    """Tests for sampling and outlier rejection."""
+
+    def test_reject_outliers(self):
+        """Test samples far outside the quartiles are dropped."""
+        samples = [10.0, 10.2, 9.9, 10.1, 10.0, 10.3, 55.0]
+        assert micro.reject_outliers(samples) == [10.0, 10.2, 9.9, 10.1, 10.0, 10.3]
+        assert micro.reject_outliers([1.0, 50.0]) == [1.0, 50.0]
+
+    def test_every_benchmark_runs(self, monkeypatch):
+        """Test each registered benchmark sets up, runs and cleans up."""
+        monkeypatch.setattr(micro, "MIN_SAMPLE_SECONDS", 0)
+        monkeypatch.setattr(micro, "WARMUP_SAMPLES", 0)
+        results = micro.run_benchmarks(repeat=2)
+        assert set(results) == set(micro.BENCHMARKS)
+        assert all(result.median_us > 0 for result in results.values())
+
+
+class TestRegressions:
+    """Tests for comparing results with baselines."""
+
+    def test_normalized_by_reference(self):
+        """Test a uniformly slower machine is not a regression, but a slower helper is."""
+        baselines = {"benchmarks": {"reference": _baseline(10.0), "sanitize_room": _baseline(2.0)}}
+        slower_machine = {"reference": _result("reference", 20.0, 20.0), "sanitize_room": _result("sanitize_room", 4.0, 20.0)}
+        assert micro.find_regressions(slower_machine, baselines, threshold=0.25) == []
+        slower_helper = {"reference": _result("reference", 10.0), "sanitize_room": _result("sanitize_room", 3.0)}
+        regressions = micro.find_regressions(slower_helper, baselines, threshold=0.25)
+        assert len(regressions) == 1
+        assert regressions[0].startswith("sanitize_room: 1.50x")
+
+    def test_check_reruns_flagged_benchmarks(self, monkeypatch):
+        """Test a slow run that is fast again on the rerun is not reported."""
+        baselines = {"benchmarks": {"reference": _baseline(10.0), "sanitize_room": _baseline(2.0)}}
+        reruns = []
+
+        def rerun(names, repeat):
+            reruns.append(names)
+            return {"reference": _result("reference", 10.0), "sanitize_room": _result("sanitize_room", 2.1)}
+
+        monkeypatch.setattr(micro, "run_benchmarks", rerun)
+        noisy = {"reference": _result("reference", 10.0), "sanitize_room": _result("sanitize_room", 4.0)}
+        assert micro.check_regressions(noisy, baselines, threshold=0.25) == []
+        assert reruns == [["sanitize_room"]]
+
+    def test_save_keeps_other_baselines(self, tmp_path):
+        """Test saving a filtered run leaves other baselines in place."""
+        path = str(tmp_path / "baselines.json")
+        micro.save_baselines({"reference": _result("reference", 10.0), "a": _result("a", 1.0)}, path)
+        micro.save_baselines({"reference": _result("reference", 12.0, 12.0)}, path)
+        stored = micro.load_baselines(path)["benchmarks"]
+        assert stored == {"a": _baseline(1.0), "reference": _baseline(12.0, 12.0)}
+
+    @pytest.mark.skipif(os.environ.get("SHOVO_BENCH_GATE") != "1", reason="set SHOVO_BENCH_GATE=1 to run")
+    def test_no_regressions_against_baselines(self):
+        """Test no tracked benchmark is slower than its stored baseline."""
+        assert micro.check_regressions(micro.run_benchmarks(), micro.load_baselines()) == []
@@ -0,0 +1,184 @@
+"""Tests for list mutations and the batch endpoint."""
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from webapp import database, mutations
+
+
+def _items(client, room: str, status: str = "unwatched") -> list[dict]:
+    return client.get(f"/api/list?room={room}&status={status}&per_page=50").get_json()["items"]
+
+
+def _add(op_id: str, title_id: str, **fields) -> dict:
+    return {"op_id": op_id, "op": "add", "title_id": title_id, "title": title_id, **fields}
+
+
+class TestAddTitle:
+    """Tests for the single-statement add."""
+
+    def _row(self, room: str, title_id: str) -> dict:
+        with database.get_db_context() as conn:
+            return dict(
+                conn.execute("SELECT * FROM lists WHERE room = ? AND title_id = ?", (room, title_id)).fetchone()
+            )
+
+    def test_new_titles_go_on_top_of_their_tab(self, app):
+        """Test each add takes the next position in its own tab."""
+        with database.get_db_context() as conn:
+            mutations.add_title(conn, "addroom", {"title_id": "tt0970001", "title": "A"})
+            mutations.add_title(conn, "addroom", {"title_id": "tt0970002", "title": "B"})
+            mutations.add_title(conn, "addroom", {"title_id": "tt0970003", "title": "C", "watched": 1})
+            conn.commit()
+        assert self._row("addroom", "tt0970001")["position"] == 1
+        assert self._row("addroom", "tt0970002")["position"] == 2
+        assert self._row("addroom", "tt0970003")["position"] == 1
+
+    def test_readd_keeps_position_added_at_and_details(self, app):
+        """Test adding a listed title again updates it in place."""
+        with database.get_db_context() as conn:
+            mutations.add_title(conn, "readdroom", {"title_id": "tt0971001", "title": "A", "rating": "7.1"})
+            mutations.add_title(conn, "readdroom", {"title_id": "tt0971002", "title": "B"})
+            conn.execute("UPDATE lists SET added_at = 1 WHERE title_id = 'tt0971001'")
+            mutations.add_title(conn, "readdroom", {"title_id": "tt0971001", "title": "A2", "year": "1999"})
+            conn.commit()
+        row = self._row("readdroom", "tt0971001")
+        assert (row["title"], row["year"], row["rating"]) == ("A2", "1999", "7.1")
+        assert (row["position"], row["added_at"]) == (1, 1)
+
+    def test_readd_to_other_tab_goes_on_top(self, app):
+        """Test a re-add that changes the watched state moves the title to the top of that tab."""
+        with database.get_db_context() as conn:
+            mutations.add_title(conn, "moveroom", {"title_id": "tt0972001", "title": "Seen", "watched": 1})
+            mutations.add_title(conn, "moveroom", {"title_id": "tt0972002", "title": "A"})
+            mutations.add_title(conn, "moveroom", {"title_id": "tt0972002", "title": "A", "watched": 1})
+            conn.commit()
+        row = self._row("moveroom", "tt0972002")
+        assert (row["watched"], row["position"]) == (1, 2)
+
+    def test_concurrent_adds_get_distinct_positions(self, app):
+        """Test adds racing from separate connections never share a position."""
+        errors = []
+
+        def add(index: int) -> None:
+            try:
+                with database.get_db_context() as conn:
+                    mutations.add_title(conn, "raceroom", {"title_id": f"tt0973{index:03d}", "title": "x"})
+                    conn.commit()
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+
+        threads = [threading.Thread(target=add, args=(index,)) for index in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        with database.get_db_context() as conn:
+            positions = [row[0] for row in conn.execute("SELECT position FROM lists WHERE room = 'raceroom'")]
+        assert sorted(positions) == list(range(1, 21))
+
+
+class TestValidateOp:
+    """Tests for validating batch operations."""
+
+    def test_valid_ops(self):
+        """Test well-formed operations of every kind pass."""
+        assert mutations.validate_op(_add("1", "tt0900001")) is None
+        assert mutations.validate_op({"op_id": "2", "op": "patch", "title_id": "tt0900001", "watched": 1}) is None
+        assert mutations.validate_op({"op_id": "3", "op": "delete", "title_id": "tt0900001"}) is None
+        assert mutations.validate_op({"op_id": "4", "op": "move", "order": ["tt0900001"]}) is None
+
+    def test_invalid_ops(self):
+        """Test malformed operations are rejected with a reason."""
+        assert mutations.validate_op("add") == "invalid_op"
+        assert mutations.validate_op({"op": "delete", "title_id": "tt0900001"}) == "invalid_op_id"
+        assert mutations.validate_op({"op_id": "x" * 65, "op": "delete", "title_id": "t"}) == "invalid_op_id"
+        assert mutations.validate_op({"op_id": "1", "op": "rename"}) == "unknown_op"
+        assert mutations.validate_op({"op_id": "1", "op": "add", "title_id": "tt0900001"}) == "missing_title"
+        assert mutations.validate_op({"op_id": "1", "op": "patch"}) == "missing_title_id"
+        assert mutations.validate_op({"op_id": "1", "op": "add", "title_id": ["tt1"], "title": "T"}) == "missing_title"
+        assert mutations.validate_op({"op_id": "1", "op": "add", "title_id": "tt1", "title": 7}) == "missing_title"
+        assert mutations.validate_op({"op_id": "1", "op": "delete", "title_id": 900001}) == "missing_title_id"
+        assert mutations.validate_op({"op_id": "1", "op": "move", "order": []}) == "invalid_order"
+
+
+class TestBatchAPI:
+    """Tests for POST /api/list/batch."""
+
+    def test_applies_ops_in_order(self, client):
+        """Test adds, a watched toggle, a delete and a move land in one request."""
+        ops = [
+            _add("a1", "tt0900001"),
+            _add("a2", "tt0900002"),
+            _add("a3", "tt0900003"),
+            {"op_id": "p1", "op": "patch", "title_id": "tt0900002", "watched": 1},
+            {"op_id": "d1", "op": "delete", "title_id": "tt0900003"},
+            _add("a4", "tt0900004"),
+            {"op_id": "m1", "op": "move", "order": ["tt0900001", "tt0900004"]},
+        ]
+        response = client.post("/api/list/batch", json={"room": "batchroom", "ops": ops})
+        assert response.status_code == 200
+        assert response.get_json()["results"] == [{"op_id": op["op_id"], "status": "applied"} for op in ops]
+        assert [item["title_id"] for item in _items(client, "batchroom")] == ["tt0900001", "tt0900004"]
+        assert [item["title_id"] for item in _items(client, "batchroom", "watched")] == ["tt0900002"]
+
+    def test_resend_is_idempotent(self, client):
+        """Test operations already applied are skipped when a batch is sent again."""
+        ops = [_add("r1", "tt0910001"), {"op_id": "r2", "op": "delete", "title_id": "tt0910001"}]
+        client.post("/api/list/batch", json={"room": "resendroom", "ops": ops})
+        client.post("/api/list", json={"room": "resendroom", "title_id": "tt0910001", "title": "Back"})
+        response = client.post("/api/list/batch", json={"room": "resendroom", "ops": ops})
+        assert [result["status"] for result in response.get_json()["results"]] == ["duplicate", "duplicate"]
+        assert [item["title"] for item in _items(client, "resendroom")] == ["Back"]
+
+    def test_op_ids_are_per_room(self, client):
+        """Test the same op id can be used in different rooms."""
+        client.post("/api/list/batch", json={"room": "idroom-a", "ops": [_add("same", "tt0920001")]})
+        response = client.post("/api/list/batch", json={"room": "idroom-b", "ops": [_add("same", "tt0920001")]})
+        assert response.get_json()["results"][0]["status"] == "applied"
+
+    def test_invalid_op_rejects_whole_batch(self, client):
+        """Test nothing is applied when any operation is invalid."""
+        ops = [_add("i1", "tt0930001"), {"op_id": "i2", "op": "patch"}]
+        response = client.post("/api/list/batch", json={"room": "invalidroom", "ops": ops})
+        assert response.status_code == 400
+        assert response.get_json()["results"] == [
+            {"op_id": "i1", "status": "skipped"},
+            {"op_id": "i2", "status": "invalid", "error": "missing_title_id"},
+        ]
+        assert _items(client, "invalidroom") == []
+
+    def test_non_string_title_id_is_invalid(self, client):
+        """Test a title id that is not a string is reported per op instead of failing the request."""
+        ops = [{"op_id": "n1", "op": "patch", "title_id": {"a": 1}, "watched": 1}]
+        response = client.post("/api/list/batch", json={"room": "typeroom", "ops": ops})
+        assert response.status_code == 400
+        assert response.get_json()["results"] == [{"op_id": "n1", "status": "invalid", "error": "missing_title_id"}]
+
+    def test_failure_rolls_back(self, client, monkeypatch):
+        """Test an error part way through leaves the room and op log unchanged."""
+
+        def fail(conn, room, op):
+            raise RuntimeError("boom")
+
+        monkeypatch.setitem(mutations.OPERATIONS, "delete", fail)
+        ops = [_add("f1", "tt0940001"), {"op_id": "f2", "op": "delete", "title_id": "tt0940001"}]
+        with pytest.raises(RuntimeError):
+            client.post("/api/list/batch", json={"room": "failroom", "ops": ops})
+        monkeypatch.undo()
+        assert _items(client, "failroom") == []
+        response = client.post("/api/list/batch", json={"room": "failroom", "ops": ops[:1]})
+        assert response.get_json()["results"][0]["status"] == "applied"
+
+    def test_limits(self, client, monkeypatch):
+        """Test empty and oversized batches are rejected."""
+        assert client.post("/api/list/batch", json={"room": "limitroom", "ops": []}).status_code == 400
+        assert client.post("/api/list/batch", json={"ops": [_add("l1", "tt0950001")]}).status_code == 400
+        monkeypatch.setattr("webapp.routes.MAX_BATCH_OPS", 1)
+        ops = [_add("l1", "tt0950001"), _add("l2", "tt0950002")]
+        response = client.post("/api/list/batch", json={"room": "limitroom", "ops": ops})
+        assert response.status_code == 413
+        assert response.get_json()["error"] == "too_many_ops"
@@ -0,0 +1,122 @@
+"""Tests for the on-demand stack sampling profiler."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+from webapp import profiling, utils
+from webapp.profiling import StackSampler, sign_profile_request, verify_profile_signature
+
+
+def _busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestStackSampler:
+    """Tests for StackSampler."""
+
+    def test_samples_matching_thread(self, tmp_path):
+        """Test samples are collected for the selected thread only."""
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_loop, args=(stop,), name="shovo-refresh-test")
+        worker.start()
+        sampler = StackSampler(lambda thread: thread is worker, interval=0.001).start()
+        time.sleep(0.05)
+        sampler.stop()
+        stop.set()
+        worker.join()
+
+        assert sampler.sample_count > 0
+        collapsed = sampler.collapsed()
+        assert "_busy_loop" in collapsed
+        for line in collapsed.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert stack.startswith("shovo-refresh-test;")
+            assert int(count) > 0
+
+        path = sampler.write("unit", directory=str(tmp_path))
+        assert path.endswith(".folded")
+        with open(path, encoding="utf-8") as handle:
+            assert handle.read() == collapsed
+
+    def test_write_names_are_unique(self, tmp_path):
+        """Test profiles written in the same second do not overwrite each other."""
+        sampler = StackSampler(lambda thread: False)
+        paths = {sampler.write("same", directory=str(tmp_path)) for _ in range(5)}
+        assert len(paths) == 5
+        assert len(os.listdir(tmp_path)) == 5
+
+
+class TestProfileSignature:
+    """Tests for signed profile headers."""
+
+    def test_valid_signature(self, monkeypatch):
+        """Test a freshly signed header verifies for the same path."""
+        monkeypatch.setattr(profiling, "PROFILE_SECRET", "secret")
+        value = sign_profile_request("/api/trending")
+        assert verify_profile_signature(value, "/api/trending")
+
+    def test_signature_bound_to_path(self, monkeypatch):
+        """Test a signature for one path is rejected for another."""
+        monkeypatch.setattr(profiling, "PROFILE_SECRET", "secret")
+        value = sign_profile_request("/api/trending")
+        assert not verify_profile_signature(value, "/api/list")
+
+    def test_expired_signature(self, monkeypatch):
+        """Test old signatures are rejected."""
+        monkeypatch.setattr(profiling, "PROFILE_SECRET", "secret")
+        value = sign_profile_request("/api/trending", timestamp=int(time.time()) - 3600)
+        assert not verify_profile_signature(value, "/api/trending")
+
+    def test_disabled_without_secret(self, monkeypatch):
+        """Test signatures are never accepted when no secret is configured."""
+        monkeypatch.setattr(profiling, "PROFILE_SECRET", "")
+        assert not verify_profile_signature(sign_profile_request("/", secret=""), "/")
+
+
+class TestRequestProfiling:
+    """Tests for the per-request profiling hook."""
+
+    def test_unprofiled_request(self, client):
+        """Test requests are not profiled by default."""
+        response = client.get("/api/list?room=profileroom&profile=1")
+        assert response.status_code == 200
+        assert "X-Shovo-Profile-File" not in response.headers
+
+    def test_admin_query_flag(self, client, monkeypatch, tmp_path):
+        """Test the admin query flag writes a collapsed-stack file."""
+        monkeypatch.setattr(utils, "ADMIN_TOKEN", "admin")
+        monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+        response = client.get(
+            "/api/list?room=profileroom&profile=1",
+            headers={utils.ADMIN_TOKEN_HEADER: "admin"},
+        )
+        assert response.status_code == 200
+        filename = response.headers["X-Shovo-Profile-File"]
+        assert os.path.exists(tmp_path / filename)
+
+    def test_admin_token_not_accepted_in_query(self, client, monkeypatch, tmp_path):
+        """Test the admin token is ignored in the query string."""
+        monkeypatch.setattr(utils, "ADMIN_TOKEN", "admin")
+        monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+        response = client.get("/api/list?room=profileroom&profile=1&admin_token=admin")
+        assert response.status_code == 200
+        assert "X-Shovo-Profile-File" not in response.headers
+
+    def test_signed_header(self, client, monkeypatch, tmp_path):
+        """Test a signed header enables profiling."""
+        monkeypatch.setattr(profiling, "PROFILE_SECRET", "secret")
+        monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+        response = client.get(
+            "/api/list?room=profileroom",
+            headers={"X-Shovo-Profile": sign_profile_request("/api/list")},
+        )
+        assert response.status_code == 200
+        assert "X-Shovo-Profile-File" in response.headers
+
+    def test_background_profile_requires_admin(self, client):
+        """Test the background thread profiler is admin only."""
+        response = client.post("/api/admin/profile/refresh?duration=1")
+        assert response.status_code == 403
@@ -31,6 +31,54 @@ class TestRoomRoute:
         assert b"Shovo" in response.data
         assert b"testroom" in response.data
 
+    def _initial_list(self, response):
+        html = response.get_data(as_text=True)
+        start = html.index('<script id="initial-list" type="application/json">')
+        start = html.index(">", start) + 1
+        return json.loads(html[start : html.index("</script>", start)])
+
+    def test_room_embeds_first_page(self, client):
+        """Test the room page embeds the same first page /api/list returns."""
+        for index in range(12):
+            client.post("/api/list", json={"room": "ssrroom", "title_id": f"tt08000{index:02d}", "title": f"T{index}"})
+        embedded = self._initial_list(client.get("/r/ssrroom"))
+        listed = client.get("/api/list?room=ssrroom&status=unwatched&page=1").get_json()
+        assert embedded["status"] == "unwatched"
+        assert embedded["items"] == listed["items"]
+        assert {key: embedded[key] for key in ("page", "per_page", "total_pages", "total_count")} == {
+            "page": 1,
+            "per_page": 10,
+            "total_pages": 2,
+            "total_count": 12,
+        }
+
+    def test_room_embeds_cached_details(self, client):
+        """Test cached details of incomplete items are embedded with the list."""
+        from webapp import database
+
+        client.post("/api/list", json={"room": "ssrdetails", "title_id": "tt0810001", "title": "Cached"})
+        with database.get_db_context() as conn:
+            database.rating_cache_set(conn, "tt0810001", "7.5", "88%")
+            database.metadata_cache_set(conn, "tt0810001", 120, None, None, None, "English")
+            conn.commit()
+        embedded = self._initial_list(client.get("/r/ssrdetails"))
+        assert embedded["details"]["tt0810001"] == {
+            "rating": "7.5",
+            "rotten_tomatoes": "88%",
+            "runtime_minutes": 120,
+            "total_seasons": None,
+            "total_episodes": None,
+            "avg_episode_length": None,
+            "original_language": "English",
+        }
+
+    def test_room_escapes_embedded_json(self, client):
+        """Test titles cannot close the embedding script tag."""
+        client.post("/api/list", json={"room": "ssrescape", "title_id": "tt0820001", "title": "</script><b>x"})
+        response = client.get("/r/ssrescape")
+        assert b"</script><b>" not in response.data
+        assert self._initial_list(response)["items"][0]["title"] == "</script><b>x"
+
 
 class TestListAPI:
     """Tests for list API endpoints."""
@@ -280,6 +328,23 @@ class TestRenameAPI:
         data = json.loads(rename_response.data)
         assert data["error"] == "room_exists"
 
+    def test_rename_moves_activity_and_applied_ops(self, client):
+        """Test a renamed list keeps its warming activity and batch idempotency."""
+        from webapp import database
+
+        ops = [{"op_id": "rn1", "op": "add", "title_id": "tt3333333", "title": "Movie 3"}]
+        client.post("/api/list/batch", json={"room": "oldname", "ops": ops})
+        client.get("/api/list?room=oldname")
+        client.patch("/api/list/rename", json={"room": "oldname", "next_room": "newname"})
+
+        response = client.post("/api/list/batch", json={"room": "newname", "ops": ops})
+        assert [result["status"] for result in response.get_json()["results"]] == ["duplicate"]
+        with database.get_db_context() as conn:
+            rooms = {row["room"] for row in conn.execute("SELECT room FROM room_activity")}
+            op_rooms = {row["room"] for row in conn.execute("SELECT room FROM applied_ops WHERE op_id = 'rn1'")}
+        assert "newname" in rooms and "oldname" not in rooms
+        assert op_rooms == {"newname"}
+
 
 class TestDetailsAPI:
     """Tests for details API."""
@@ -346,3 +411,44 @@ class TestPagination:
         page2_response = client.get("/api/list?room=paginationroom&page=2&per_page=10")
         page2_data = json.loads(page2_response.data)
         assert len(page2_data["items"]) == 5
+
+
+class TestListProjection:
+    """Tests for fields= and format=compact on GET /api/list."""
+
+    def _seed(self, client):
+        client.post(
+            "/api/list",
+            json={"room": "projroom", "title_id": "tt0700001", "title": "First", "rating": "7.0", "year": "2001"},
+        )
+        client.post(
+            "/api/list",
+            json={"room": "projroom", "title_id": "tt0700002", "title": "Second", "rating": "8.0", "year": "2002"},
+        )
+
+    def test_fields_limit_columns(self, client):
+        """Test only the requested columns (plus title_id) are returned."""
+        self._seed(client)
+        data = client.get("/api/list?room=projroom&fields=title,rating").get_json()
+        assert data["items"][0] == {"title_id": "tt0700002", "title": "Second", "rating": "8.0"}
+        assert data["total_count"] == 2
+
+    def test_compact_format(self, client):
+        """Test compact responses send column names once and rows as arrays."""
+        self._seed(client)
+        data = client.get("/api/list?room=projroom&fields=title,year&format=compact").get_json()
+        assert data["columns"] == ["title_id", "title", "year"]
+        assert data["rows"] == [["tt0700002", "Second", "2002"], ["tt0700001", "First", "2001"]]
+        assert "items" not in data
+
+    def test_compact_without_fields(self, client):
+        """Test compact responses without fields include every column."""
+        data = client.get("/api/list?room=emptyprojroom&format=compact").get_json()
+        assert "title_id" in data["columns"]
+        assert data["rows"] == []
+
+    def test_unknown_field_rejected(self, client):
+        """Test fields outside the whitelist are rejected."""
+        response = client.get("/api/list?room=projroom&fields=title,room")
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "invalid_fields"
@@ -0,0 +1,165 @@
+"""Scale tests against a generated database with many rooms and one very large room.
+
+The database size can be raised with ``SHOVO_SCALE_ROOMS`` and ``SHOVO_SCALE_BIG_ROOM``
+(for example 100000 and 20000) and the latency budgets scaled with
+``SHOVO_SCALE_BUDGET_FACTOR`` on slow machines.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+from webapp import database
+from webapp.benchmarks.datagen import DatasetSpec, generate_database
+
+SCALE_ROOMS = int(os.environ.get("SHOVO_SCALE_ROOMS", "20000"))
+BIG_ROOM_SIZE = int(os.environ.get("SHOVO_SCALE_BIG_ROOM", "20000"))
+BUDGET_FACTOR = float(os.environ.get("SHOVO_SCALE_BUDGET_FACTOR", "1"))
+BIG_ROOM = "big-0"
+
+
+def _plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> list[str]:
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def _assert_no_full_scan(plan: list[str]) -> None:
+    assert plan
+    for step in plan:
+        assert not (step.startswith("SCAN lists") and "INDEX" not in step), plan
+
+
+def _elapsed_ms(func) -> float:
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+@pytest.fixture(scope="module")
+def scale_db(tmp_path_factory):
+    """A generated database shared by the tests in this module."""
+    path = str(tmp_path_factory.mktemp("scale") / "scale.sqlite3")
+    generate_database(path, DatasetSpec(rooms=SCALE_ROOMS, big_rooms=[BIG_ROOM_SIZE], unpositioned_share=0.001))
+    return path
+
+
+@pytest.fixture
+def scale_conn(scale_db):
+    """A migrated connection to the generated database."""
+    conn = sqlite3.connect(scale_db)
+    conn.row_factory = sqlite3.Row
+    database.migrate_db(conn)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def scale_client(scale_db, monkeypatch):
+    """A test client for an app using the generated database."""
+    monkeypatch.setattr(database, "DB_PATH", scale_db)
+    from webapp import create_app
+
+    return create_app().test_client()
+
+
+class TestDatagen:
+    """Tests for the generated data."""
+
+    def test_shape(self, scale_conn):
+        """Test room count, the big room and positions match the spec."""
+        rooms = scale_conn.execute("SELECT COUNT(DISTINCT room) FROM lists").fetchone()[0]
+        big = scale_conn.execute("SELECT COUNT(*) FROM lists WHERE room = ?", (BIG_ROOM,)).fetchone()[0]
+        unpositioned = scale_conn.execute("SELECT COUNT(*) FROM lists WHERE position IS NULL").fetchone()[0]
+        assert rooms == SCALE_ROOMS + 1
+        assert big == BIG_ROOM_SIZE
+        assert unpositioned == 0
+        assert scale_conn.execute("SELECT COUNT(*) FROM rating_cache").fetchone()[0] > 0
+
+
+class TestQueryPlans:
+    """Tests that the per-room queries are served from indexes."""
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "SELECT * FROM lists WHERE room = ? AND watched = 0 "
+            "ORDER BY (position IS NULL) ASC, position DESC, added_at DESC LIMIT 50 OFFSET 0",
+            "SELECT COUNT(*) FROM lists WHERE room = ? AND watched = 0",
+            "SELECT COALESCE(MAX(position), 0) + 1 FROM lists WHERE room = ? AND watched = 0",
+            "UPDATE lists SET position = 1 WHERE room = ? AND title_id = 'tt1000001'",
+            "DELETE FROM lists WHERE room = ? AND title_id = 'tt1000001'",
+            "SELECT 1 FROM lists WHERE room = ? LIMIT 1",
+            "UPDATE lists SET room = 'renamed' WHERE room = ?",
+            "SELECT title_id FROM lists WHERE room = ? AND position IS NULL ORDER BY added_at ASC",
+        ],
+    )
+    def test_room_queries_use_indexes(self, scale_conn, sql):
+        """Test queries for one room never scan the whole table."""
+        _assert_no_full_scan(_plan(scale_conn, sql, (BIG_ROOM,)))
+
+    def test_next_position_is_an_index_seek(self, scale_conn):
+        """Test the next position for an add is read from the (room, watched, position) index."""
+        plan = _plan(
+            scale_conn,
+            "SELECT COALESCE(MAX(position), 0) + 1 FROM lists WHERE room = ? AND watched = ?",
+            (BIG_ROOM, 0),
+        )
+        assert any("idx_lists_room_watched_position" in step for step in plan), plan
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "UPDATE lists SET watched = 0 WHERE watched IS NULL",
+            "UPDATE lists SET position = NULL WHERE position = 0",
+            "SELECT DISTINCT room FROM lists INDEXED BY idx_lists_needs_backfill WHERE position IS NULL",
+        ],
+    )
+    def test_migration_checks_use_partial_index(self, scale_conn, sql):
+        """Test the checks run on every request only touch rows that need fixing."""
+        assert any("idx_lists_needs_backfill" in step for step in _plan(scale_conn, sql))
+
+
+class TestLatencyBudgets:
+    """Tests that request latency stays within budget on a large database."""
+
+    def test_migrate_db_on_warm_database(self, scale_conn):
+        """Test migrations on an up-to-date database cost almost nothing, even when every check runs."""
+        assert _elapsed_ms(lambda: database.migrate_db(scale_conn)) < 5 * BUDGET_FACTOR
+        assert _elapsed_ms(lambda: database.migrate_db(scale_conn, force=True)) < 50 * BUDGET_FACTOR
+
+    def test_backfill_only_visits_unpositioned_rooms(self, scale_conn):
+        """Test backfilling positions only touches rooms with missing positions."""
+        scale_conn.execute("UPDATE lists SET position = NULL WHERE room = 'room-1'")
+        assert _elapsed_ms(lambda: database.migrate_db(scale_conn, force=True)) < 50 * BUDGET_FACTOR
+        assert scale_conn.execute("SELECT COUNT(*) FROM lists WHERE position IS NULL").fetchone()[0] == 0
+        scale_conn.commit()
+
+    def test_list_pages(self, scale_client):
+        """Test the first and last pages of the big room and a small room."""
+        first = _elapsed_ms(lambda: scale_client.get(f"/api/list?room={BIG_ROOM}&per_page=50"))
+        last = _elapsed_ms(lambda: scale_client.get(f"/api/list?room={BIG_ROOM}&per_page=50&page=1000"))
+        small = _elapsed_ms(lambda: scale_client.get("/api/list?room=room-7&per_page=50"))
+        assert first < 500 * BUDGET_FACTOR
+        assert last < 500 * BUDGET_FACTOR
+        assert small < 50 * BUDGET_FACTOR
+
+    def test_reorder_big_room(self, scale_client, scale_conn):
+        """Test reordering every unwatched title of the big room."""
+        order = [
+            row["title_id"]
+            for row in scale_conn.execute(
+                "SELECT title_id FROM lists WHERE room = ? AND watched = 0 ORDER BY position ASC", (BIG_ROOM,)
+            )
+        ]
+        payload = {"room": BIG_ROOM, "order": order}
+        assert _elapsed_ms(lambda: scale_client.patch("/api/list/order", json=payload)) < 1000 * BUDGET_FACTOR
+
+    def test_rename_big_room(self, scale_client):
+        """Test renaming the big room and back."""
+        forward = {"room": BIG_ROOM, "next_room": "big-renamed"}
+        back = {"room": "big-renamed", "next_room": BIG_ROOM}
+        assert _elapsed_ms(lambda: scale_client.patch("/api/list/rename", json=forward)) < 1500 * BUDGET_FACTOR
+        assert _elapsed_ms(lambda: scale_client.patch("/api/list/rename", json=back)) < 1500 * BUDGET_FACTOR
@@ -0,0 +1,94 @@
+"""Tests for cold start: versioned migrations and deferred imports."""
+from __future__ import annotations
+
+import importlib
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from webapp import database
+from webapp.benchmarks import startup
+
+
+@pytest.fixture
+def fresh_db(tmp_path):
+    """A connection to an empty database file."""
+    conn = sqlite3.connect(str(tmp_path / "fresh.sqlite3"))
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+class TestSchemaVersion:
+    """Tests for the user_version fast path."""
+
+    def test_migrate_records_version(self, fresh_db):
+        """Test a migration stamps the schema version."""
+        assert database.schema_version(fresh_db) == 0
+        database.migrate_db(fresh_db)
+        assert database.schema_version(fresh_db) == database.SCHEMA_VERSION
+
+    def test_up_to_date_database_is_skipped(self, fresh_db):
+        """Test fix-ups only run on databases below the current version."""
+        database.migrate_db(fresh_db)
+        fresh_db.execute(
+            "INSERT INTO lists (room, title_id, title, added_at, position) VALUES ('r', 'tt0000001', 'A', 1, 0)"
+        )
+        fresh_db.commit()
+        database.migrate_db(fresh_db)
+        assert fresh_db.execute("SELECT position FROM lists").fetchone()[0] == 0
+        fresh_db.execute("PRAGMA user_version = 0")
+        database.migrate_db(fresh_db)
+        assert fresh_db.execute("SELECT position FROM lists").fetchone()[0] == 1
+
+    def test_cli(self, tmp_path, capsys):
+        """Test the deploy step migrates the given database."""
+        path = str(tmp_path / "deploy.sqlite3")
+        assert database.main(["--db", path]) == 0
+        assert f"schema version {database.SCHEMA_VERSION} (was 0)" in capsys.readouterr().out
+        conn = sqlite3.connect(path)
+        assert database.schema_version(conn) == database.SCHEMA_VERSION
+        conn.close()
+
+
+class TestCreateApp:
+    """Tests for startup work in create_app."""
+
+    def test_migrate_on_start_disabled(self, tmp_path, monkeypatch):
+        """Test workers leave the schema alone when deploys migrate instead."""
+        app_module = importlib.import_module("webapp.app")
+        path = str(tmp_path / "untouched.sqlite3")
+        monkeypatch.setattr(database, "DB_PATH", path)
+        monkeypatch.setattr(app_module, "MIGRATE_ON_START", False)
+        app_module.create_app()
+        conn = sqlite3.connect(path)
+        assert database.schema_version(conn) == 0
+        conn.close()
+
+    def test_import_creates_nothing(self, tmp_path):
+        """Test importing ``create_app`` neither migrates the database nor builds the app."""
+        db_path = tmp_path / "untouched.sqlite3"
+        probe = "import webapp.app as module; print(hasattr(module, 'app'))"
+        output = subprocess.run(
+            [sys.executable, "-c", probe],
+            env=dict(os.environ, SHOVO_DB_PATH=str(db_path), SHOVO_MIGRATE_ON_START="1"),
+            cwd=startup.PACKAGE_PARENT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        assert output.strip() == "False"
+        assert not db_path.exists()
+
+    def test_cold_start_skips_upstream_modules(self):
+        """Test a fresh worker serves a list without importing requests or the upstream stack."""
+        result = startup.measure(runs=1)
+        assert result["upstream_modules_loaded"] == []
+
+    @pytest.mark.skipif(os.environ.get("SHOVO_BENCH_GATE") != "1", reason="set SHOVO_BENCH_GATE=1 to run")
+    def test_startup_budget(self):
+        """Test the median cold start is within budget."""
+        assert startup.measure()["import_ms"] <= startup.STARTUP_BUDGET_MS
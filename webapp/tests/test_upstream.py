@@ -0,0 +1,273 @@
+"""Tests for upstream circuit breakers and rate limiters."""
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+import requests
+
+from webapp import external_api, upstream
+from webapp.upstream import (
+    CircuitBreaker,
+    DailyQuota,
+    Deadline,
+    DeadlineExceeded,
+    TokenBucket,
+    Upstream,
+    UpstreamUnavailable,
+    iter_body,
+    upstream_get,
+)
+
+
+def _response(status_code: int = 200, headers: dict[str, str] | None = None) -> mock.Mock:
+    response = mock.Mock(status_code=status_code, headers=headers or {})
+    return response
+
+
+@pytest.fixture
+def fresh_upstreams(monkeypatch):
+    """Replace the global upstream registry with fresh breakers and limiters."""
+    upstreams = {
+        "imdb": Upstream("imdb", TokenBucket(100, 100), CircuitBreaker(2, 5, 30)),
+        "omdb": Upstream("omdb", TokenBucket(100, 100), CircuitBreaker(2, 5, 30)),
+    }
+    monkeypatch.setattr(upstream, "UPSTREAMS", upstreams)
+    return upstreams
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_opens_after_threshold(self):
+        """Test the breaker opens after consecutive failures."""
+        breaker = CircuitBreaker(failure_threshold=2, open_seconds=30)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+
+    def test_slow_calls_count_as_failures(self):
+        """Test calls slower than the threshold count as failures."""
+        breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=1)
+        breaker.record_success(elapsed=2)
+        assert breaker.state == "open"
+
+    def test_half_open_single_probe(self):
+        """Test only one probe is allowed after the open period."""
+        breaker = CircuitBreaker(failure_threshold=1, open_seconds=0)
+        breaker.record_failure()
+        assert breaker.allow()
+        assert breaker.state == "half_open"
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_probe_reopens(self):
+        """Test a failed half-open probe re-opens the breaker."""
+        breaker = CircuitBreaker(failure_threshold=1, open_seconds=0)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket."""
+
+    def test_capacity_limits_burst(self):
+        """Test no more than capacity tokens are handed out at once."""
+        bucket = TokenBucket(rate_per_second=0, capacity=3)
+        assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+    def test_penalize_pauses(self):
+        """Test a 429 penalty blocks further tokens."""
+        bucket = TokenBucket(rate_per_second=1000, capacity=10)
+        bucket.penalize(60)
+        assert not bucket.try_acquire()
+
+
+class TestDailyQuota:
+    """Tests for the shared daily quota."""
+
+    @pytest.fixture
+    def quota_db(self, tmp_path):
+        """A migrated database file of its own."""
+        from webapp import database
+
+        path = str(tmp_path / "quota.sqlite3")
+        conn = database.connect(path)
+        database.migrate_db(conn)
+        conn.close()
+        return path
+
+    def test_shared_between_instances(self, quota_db):
+        """Test separate limiters (as in separate workers) draw from one daily count."""
+        first = DailyQuota("omdb", 3, quota_db)
+        second = DailyQuota("omdb", 3, quota_db)
+        assert [first.try_acquire(), second.try_acquire(), first.try_acquire()] == [True, True, True]
+        assert not second.try_acquire()
+        assert first.used() == 3
+
+    def test_resets_on_a_new_day(self, quota_db, monkeypatch):
+        """Test the count starts over on the next UTC day."""
+        quota = DailyQuota("omdb", 1, quota_db)
+        monkeypatch.setattr(upstream, "_utc_day", lambda: "2026-01-01")
+        assert quota.try_acquire()
+        assert not quota.try_acquire()
+        monkeypatch.setattr(upstream, "_utc_day", lambda: "2026-01-02")
+        assert quota.try_acquire()
+
+    def test_used_up_quota_fails_fast(self, quota_db, fresh_upstreams):
+        """Test upstream_get refuses without network access once the quota is used up."""
+        fresh_upstreams["omdb"].quota = DailyQuota("omdb", 1, quota_db)
+        with mock.patch.object(requests, "get", return_value=_response()) as get:
+            upstream_get("omdb", "https://example.com")
+            with pytest.raises(UpstreamUnavailable):
+                upstream_get("omdb", "https://example.com")
+        assert get.call_count == 1
+        assert fresh_upstreams["omdb"].breaker.state == "closed"
+
+    def test_burst_is_not_limited_to_the_daily_average(self):
+        """Test the OMDB bucket refills at a short-term rate, not the daily average."""
+        assert upstream.UPSTREAMS["omdb"].limiter.rate_per_second >= 1
+
+
+class TestUpstreamGet:
+    """Tests for upstream_get."""
+
+    def test_open_breaker_fails_fast(self, fresh_upstreams):
+        """Test calls fail without network access once the breaker opens."""
+        with mock.patch.object(requests, "get", side_effect=requests.ConnectionError("down")) as get:
+            for _ in range(2):
+                with pytest.raises(requests.ConnectionError):
+                    upstream_get("imdb", "https://example.com")
+            with pytest.raises(UpstreamUnavailable):
+                upstream_get("imdb", "https://example.com")
+        assert get.call_count == 2
+
+    def test_rate_limit_response_penalizes(self, fresh_upstreams):
+        """Test a 429 response pauses the limiter."""
+        with mock.patch.object(requests, "get", return_value=_response(429, {"Retry-After": "120"})):
+            upstream_get("omdb", "https://example.com")
+        with pytest.raises(UpstreamUnavailable):
+            upstream_get("omdb", "https://example.com")
+
+    def test_get_ratings_serves_stale_cache_when_open(self, app, fresh_upstreams):
+        """Test cached ratings are returned while the breaker is open."""
+        from webapp import database
+
+        with database.get_db_context() as conn:
+            conn.execute(
+                "REPLACE INTO rating_cache (title_id, rating, rotten_tomatoes, cached_at) VALUES (?, ?, ?, ?)",
+                ("tt0000042", "7.1", "88%", 0),
+            )
+            conn.commit()
+        for name in ("imdb", "omdb"):
+            fresh_upstreams[name].breaker.state = "open"
+            fresh_upstreams[name].breaker.opened_at = float("inf")
+        with mock.patch.object(requests, "get") as get:
+            assert external_api.get_ratings("tt0000042", "test") == ("7.1", "88%")
+        get.assert_not_called()
+
+
+class TestDeadline:
+    """Tests for request deadline propagation."""
+
+    def test_timeout_capped_by_remaining_budget(self):
+        """Test a call never gets more time than the budget has left."""
+        deadline = Deadline(2)
+        assert deadline.timeout(10) <= 2
+        assert Deadline(60).timeout(10) == 10
+
+    def test_expired_deadline_raises(self):
+        """Test no call is attempted once the budget is spent."""
+        deadline = Deadline(0)
+        assert deadline.expired
+        with pytest.raises(DeadlineExceeded):
+            deadline.timeout()
+
+    def test_upstream_get_uses_remaining_budget(self, fresh_upstreams):
+        """Test upstream_get passes the shortened timeout to requests."""
+        with mock.patch.object(requests, "get", return_value=_response()) as get:
+            upstream_get("imdb", "https://example.com", timeout=10, deadline=Deadline(3))
+        assert get.call_args.kwargs["timeout"] <= 3
+
+    def test_budget_timeout_does_not_trip_breaker(self, fresh_upstreams):
+        """Test timeouts caused by the deadline are not counted against the upstream."""
+        with mock.patch.object(requests, "get", side_effect=requests.Timeout("slow")):
+            for _ in range(3):
+                with pytest.raises(DeadlineExceeded):
+                    upstream_get("imdb", "https://example.com", deadline=Deadline(3))
+        assert fresh_upstreams["imdb"].breaker.state == "closed"
+
+    def test_body_read_stops_at_deadline(self):
+        """Test a slowly streamed body is cut off and closed once the deadline passes."""
+        deadline = Deadline(60)
+        response = _response()
+
+        def trickle(chunk_size):
+            yield b"<html>"
+            deadline.expires_at = 0.0
+            yield b"<head>"
+            yield b"</html>"
+
+        response.iter_content.side_effect = trickle
+        chunks = []
+        with pytest.raises(DeadlineExceeded):
+            for chunk in iter_body(response, 16, deadline):
+                chunks.append(chunk)
+        assert chunks == [b"<html>"]
+        response.close.assert_called_once()
+
+    def test_slow_imdb_page_raises_deadline_exceeded(self):
+        """Test the IMDB title fetch gives up part-way through a page that outlasts the deadline."""
+        deadline = Deadline(60)
+        response = _response()
+        read = []
+
+        def trickle(chunk_size):
+            for chunk in (b"<html><head>", b"<body>", b"</body></html>"):
+                read.append(chunk)
+                yield chunk
+                deadline.expires_at = 0.0
+
+        response.iter_content.side_effect = trickle
+        with mock.patch.object(external_api, "upstream_get", return_value=response):
+            with pytest.raises(DeadlineExceeded):
+                external_api._fetch_imdb_title("tt0000043", "test", deadline)
+        assert len(read) == 2
+        response.close.assert_called()
+
+    def test_trending_returns_partial_results(self, fresh_upstreams):
+        """Test fetch_trending stops with partial results when the deadline runs out."""
+        chart = _response()
+        chart.text = "/title/tt0000001/ /title/tt0000002/ /title/tt0000003/"
+        calls = []
+
+        def fake_fetch_title(title_id, user_agent, deadline=None):
+            calls.append(title_id)
+            if len(calls) > 1:
+                raise DeadlineExceeded("out of time")
+            return title_id
+
+        with mock.patch.object(requests, "get", return_value=chart):
+            with mock.patch.object(external_api, "fetch_title_by_id", side_effect=fake_fetch_title):
+                results = external_api.fetch_trending("test", Deadline(20))
+        assert results == ["tt0000001"]
+
+    def test_trending_keeps_results_when_upstream_degrades(self, fresh_upstreams):
+        """Test fetch_trending returns the titles built before the breaker or limiter gave out."""
+        chart = _response()
+        chart.text = "/title/tt0000001/ /title/tt0000002/ /title/tt0000003/"
+
+        def fake_fetch_title(title_id, user_agent, deadline=None):
+            if title_id == "tt0000003":
+                raise UpstreamUnavailable("imdb rate limited")
+            return title_id
+
+        with mock.patch.object(requests, "get", return_value=chart):
+            with mock.patch.object(external_api, "fetch_title_by_id", side_effect=fake_fetch_title):
+                results = external_api.fetch_trending("test", Deadline(20))
+        assert results == ["tt0000001", "tt0000002"]
@@ -0,0 +1,91 @@
+"""End-to-end tests against the offline upstream simulator."""
+from __future__ import annotations
+
+import pytest
+import requests
+
+from webapp import external_api, upstream
+from webapp.benchmarks.upstream_sim import SimulatorConfig, parse_latency, start_simulator
+from webapp.upstream import CircuitBreaker, TokenBucket, Upstream
+
+
+@pytest.fixture
+def simulator(monkeypatch):
+    """Run a simulator and point the app's upstream URLs and limiters at it."""
+    servers = []
+
+    def _start(**config):
+        server = start_simulator(SimulatorConfig(seed=1, **config))
+        servers.append(server)
+        base = server.base_url
+        monkeypatch.setattr(external_api, "IMDB_SUGGESTION_URL", base + "/suggestion/{first}/{query}.json")
+        monkeypatch.setattr(external_api, "IMDB_TITLE_URL", base + "/title/{title_id}/")
+        monkeypatch.setattr(external_api, "IMDB_TRENDING_URL", base + "/chart/moviemeter/")
+        monkeypatch.setattr(external_api, "OMDB_URL", base + "/omdb/")
+        monkeypatch.setattr(
+            upstream,
+            "UPSTREAMS",
+            {
+                "imdb": Upstream("imdb", TokenBucket(1000, 1000), CircuitBreaker(100, 5, 30)),
+                "omdb": Upstream("omdb", TokenBucket(1000, 1000), CircuitBreaker(100, 5, 30)),
+            },
+        )
+        return server
+
+    yield _start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestLatencySpecs:
+    """Tests for latency distribution specs."""
+
+    def test_specs(self):
+        """Test each distribution returns delays in seconds."""
+        import random
+
+        rng = random.Random(1)
+        assert parse_latency("fixed:250")(rng) == 0.25
+        assert 0.01 <= parse_latency("uniform:10,20")(rng) <= 0.02
+        assert parse_latency("lognormal:100,0.5")(rng) > 0
+        with pytest.raises(ValueError):
+            parse_latency("gaussian:1")
+
+
+class TestSimulatedUpstreams:
+    """Tests that run the real fetch code against the simulator."""
+
+    def test_search_and_details(self, app, simulator):
+        """Test search results and details come back from simulated IMDb and OMDB."""
+        simulator()
+        results = external_api.fetch_suggestions("night", "test")
+        assert len(results) == 8
+        result = results[0]
+        details = external_api.get_details(result.title_id, "test", external_api.normalize_type_label(result.type_label))
+        assert details.rating is not None
+        assert details.runtime_minutes is not None
+        assert details.rotten_tomatoes.endswith("%")
+
+    def test_deterministic(self, app, simulator):
+        """Test the same query always returns the same titles."""
+        simulator()
+        first = [result.title_id for result in external_api.fetch_suggestions("river", "test")]
+        second = [result.title_id for result in external_api.fetch_suggestions("river", "test")]
+        assert first == second
+
+    def test_error_rate(self, simulator):
+        """Test a full error rate turns every call into a 503."""
+        server = simulator(error_rate=1.0)
+        response = requests.get(server.base_url + "/title/tt0111161/", timeout=5)
+        assert response.status_code == 503
+        assert requests.get(server.base_url + "/__stats", timeout=5).json()["imdb_error"] == 1
+
+    def test_rate_limit_responses(self, simulator):
+        """Test simulated 429 responses carry Retry-After and pause the app's limiter."""
+        server = simulator(rate_limit_rate=1.0, retry_after_seconds=7)
+        with pytest.raises(requests.HTTPError):
+            external_api.fetch_suggestions("echo", "test")
+        assert upstream.UPSTREAMS["imdb"].limiter.available() == 0
+        response = requests.get(server.base_url + "/omdb/?i=tt0111161", timeout=5)
+        assert response.headers["Retry-After"] == "7"
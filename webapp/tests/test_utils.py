@@ -1,7 +1,7 @@
 """Tests for utility functions."""
 from __future__ import annotations
 
-from webapp.utils import default_room, parse_watched, sanitize_room, serialize_result
+from webapp.utils import default_room, lazy_import, parse_watched, sanitize_room, serialize_result
 from webapp.models import SearchResult
 
 
@@ -162,3 +162,23 @@ class TestSerializeResult:
         assert serialized["title_id"] == "tt0000001"
         assert serialized["title"] == "Minimal"
         assert serialized["year"] is None
+
+
+class TestLazyImport:
+    """Tests for lazy_import function."""
+
+    def test_resolves_application_modules(self):
+        """Test dotted names are resolved within the application package."""
+        module = lazy_import(".models")
+        assert module.__name__ == "webapp.models"
+        assert module.SearchResult is SearchResult
+
+    def test_imports_on_first_use(self):
+        """Test the module is only imported when an attribute is read."""
+        import sys
+
+        sys.modules.pop("colorsys", None)
+        module = lazy_import("colorsys")
+        assert "colorsys" not in sys.modules
+        assert module.rgb_to_hsv(0, 0, 0) == (0, 0, 0)
+        assert "colorsys" in sys.modules
@@ -0,0 +1,206 @@
+"""Tests for the background cache pre-warmer."""
+from __future__ import annotations
+
+import datetime
+import time
+from unittest import mock
+
+import pytest
+import requests
+
+from webapp import external_api, upstream, warmer
+from webapp.models import TitleDetails
+from webapp.upstream import CircuitBreaker, Deadline, TokenBucket, Upstream
+
+
+def _add_title(conn, room: str, title_id: str, type_label: str = "movie") -> None:
+    conn.execute(
+        "INSERT INTO lists (room, title_id, title, type_label, added_at) VALUES (?, ?, ?, ?, ?)",
+        (room, title_id, title_id, type_label, int(time.time())),
+    )
+
+
+def _cache_title(conn, title_id: str, expires_at: int) -> None:
+    conn.execute(
+        "REPLACE INTO rating_cache (title_id, rating, cached_at, expires_at) VALUES (?, '7.0', 0, ?)",
+        (title_id, expires_at),
+    )
+    conn.execute(
+        "REPLACE INTO metadata_cache (title_id, runtime_minutes, cached_at, expires_at) VALUES (?, 90, 0, ?)",
+        (title_id, expires_at),
+    )
+
+
+@pytest.fixture
+def fresh_upstreams(monkeypatch):
+    """Replace the global upstream registry with idle breakers and full limiters."""
+    upstreams = {
+        "imdb": Upstream("imdb", TokenBucket(100, 100), CircuitBreaker(2, 5, 30)),
+        "omdb": Upstream("omdb", TokenBucket(100, 100), CircuitBreaker(2, 5, 30)),
+    }
+    monkeypatch.setattr(upstream, "UPSTREAMS", upstreams)
+    monkeypatch.setattr(warmer, "UPSTREAMS", upstreams)
+    return upstreams
+
+
+@pytest.fixture
+def active_room(app):
+    """A recently opened room with one expiring, one missing and one fresh title."""
+    from webapp import database
+
+    now = int(time.time())
+    with database.get_db_context() as conn:
+        _add_title(conn, "warmroom", "tt0400001")
+        _add_title(conn, "warmroom", "tt0400002", "tvSeries")
+        _add_title(conn, "warmroom", "tt0400003")
+        _add_title(conn, "coldroom", "tt0400004")
+        _cache_title(conn, "tt0400001", now + 60)
+        _cache_title(conn, "tt0400003", now + 30 * 24 * 60 * 60)
+        conn.execute("REPLACE INTO room_activity (room, last_seen) VALUES ('warmroom', ?)", (now,))
+        conn.execute("REPLACE INTO room_activity (room, last_seen) VALUES ('coldroom', 0)")
+        conn.commit()
+    return "warmroom"
+
+
+class TestRoomActivity:
+    """Tests for recording room activity."""
+
+    def test_list_request_records_activity(self, client):
+        """Test opening a room's list records it, at most once per interval."""
+        from webapp import database
+
+        client.get("/api/list?room=activityroom")
+        with database.get_db_context() as conn:
+            first = conn.execute("SELECT last_seen FROM room_activity WHERE room = 'activityroom'").fetchone()
+            conn.execute("UPDATE room_activity SET last_seen = 1 WHERE room = 'activityroom'")
+            conn.commit()
+        client.get("/api/list?room=activityroom")
+        with database.get_db_context() as conn:
+            second = conn.execute("SELECT last_seen FROM room_activity WHERE room = 'activityroom'").fetchone()
+        assert first["last_seen"] > 0
+        assert second["last_seen"] == 1
+
+    def test_room_page_records_activity_through_writer(self, client, monkeypatch):
+        """Test rendering a room page leaves the write to the group writer."""
+        from webapp import database, writer
+
+        monkeypatch.setattr(writer, "GROUP_COMMIT", True)
+        assert client.get("/r/pageroom").status_code == 200
+        with database.get_db_context() as conn:
+            row = conn.execute("SELECT last_seen FROM room_activity WHERE room = 'pageroom'").fetchone()
+        assert row is not None
+        assert writer.get_writer().stats.writes == 1
+
+    def test_activity_memo_is_bounded(self, app, monkeypatch):
+        """Test the per-process memo of written rooms forgets expired and excess rooms."""
+        from webapp import database
+
+        monkeypatch.setattr(database, "_activity_written", {"stale": time.time() - 3600})
+        monkeypatch.setattr(database, "ACTIVITY_MEMO_MAX_ROOMS", 3)
+        for index in range(5):
+            assert database.room_activity_due(f"memoroom{index}")
+        assert not database.room_activity_due("memoroom4")
+        assert list(database._activity_written) == ["memoroom2", "memoroom3", "memoroom4"]
+
+
+class TestWarmCandidates:
+    """Tests for picking titles to warm."""
+
+    def test_expiring_titles_in_active_rooms(self, active_room):
+        """Test missing and expiring titles are picked, soonest first; fresh and idle ones are not."""
+        from webapp import database
+
+        with database.get_db_context() as conn:
+            candidates = warmer.find_warm_candidates(conn, horizon_seconds=3600)
+        assert candidates == [("tt0400002", "tvSeries"), ("tt0400001", "movie")]
+
+
+class TestWarmOnce:
+    """Tests for a single warming pass."""
+
+    def test_refreshes_candidates(self, active_room, fresh_upstreams):
+        """Test each candidate is refreshed with its normalized type."""
+        with mock.patch.object(warmer, "refresh_title_details", return_value=TitleDetails("7.0")) as refresh:
+            stats = warmer.warm_once(budget_seconds=10, concurrency=2, rate_per_second=100)
+        refreshed = sorted(call.args[0] for call in refresh.call_args_list)
+        assert refreshed == ["tt0400001", "tt0400002"]
+        assert {call.args[2] for call in refresh.call_args_list} == {"movie", "tvseries"}
+        assert all(isinstance(call.args[3], Deadline) for call in refresh.call_args_list)
+        assert stats["refreshed"] == 2
+        assert stats["skipped"] == 0
+
+    def test_counts_upstream_failures(self, active_room, fresh_upstreams):
+        """Test titles whose upstreams fail count as failed, though stale values come back."""
+        failure = requests.ConnectionError("upstream down")
+        with mock.patch.object(external_api, "_fetch_imdb_title", side_effect=failure), mock.patch.object(
+            external_api, "_fetch_omdb_title", side_effect=failure
+        ):
+            stats = warmer.warm_once(budget_seconds=10, concurrency=2, rate_per_second=100)
+        assert stats["refreshed"] == 0
+        assert stats["failed"] == 2
+
+    def test_stops_while_upstream_unhealthy(self, active_room, fresh_upstreams):
+        """Test nothing is refreshed while a breaker is open."""
+        fresh_upstreams["imdb"].breaker.state = "open"
+        with mock.patch.object(warmer, "refresh_title_details") as refresh:
+            stats = warmer.warm_once(budget_seconds=10, rate_per_second=100)
+        refresh.assert_not_called()
+        assert stats["skipped"] == stats["candidates"]
+
+    def test_leaves_reserve_for_interactive_requests(self, active_room, fresh_upstreams):
+        """Test the warmer backs off when an upstream's burst is mostly spent."""
+        fresh_upstreams["omdb"].limiter = TokenBucket(0, 10)
+        for _ in range(6):
+            fresh_upstreams["omdb"].limiter.try_acquire()
+        with mock.patch.object(warmer, "refresh_title_details") as refresh:
+            warmer.warm_once(budget_seconds=10, rate_per_second=100)
+        refresh.assert_not_called()
+
+
+class TestWarmLock:
+    """Tests for running the warmer in one process only."""
+
+    def test_one_holder_at_a_time(self, tmp_path):
+        """Test the lock is refused while another process holds it, and taken once it is released."""
+        import fcntl
+
+        path = str(tmp_path / "warmer.lock")
+        with open(path, "a", encoding="utf-8") as other_process:
+            fcntl.flock(other_process, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            assert warmer.acquire_warm_lock(path) is False
+        try:
+            assert warmer.acquire_warm_lock(path) is True
+            assert warmer.acquire_warm_lock(path) is True
+        finally:
+            warmer.release_warm_lock()
+
+    def test_cli_skips_while_locked(self, tmp_path, capsys):
+        """Test a cron pass does nothing while another process is warming."""
+        import fcntl
+
+        path = str(tmp_path / "warmer.lock")
+        with open(path, "a", encoding="utf-8") as other_process:
+            fcntl.flock(other_process, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            with mock.patch.object(warmer, "WARM_LOCK_PATH", path), mock.patch.object(warmer, "warm_once") as warm:
+                assert warmer.main([]) == 0
+        warm.assert_not_called()
+        assert "another process" in capsys.readouterr().out
+
+
+class TestWarmWindow:
+    """Tests for the off-peak window."""
+
+    @pytest.mark.parametrize(
+        ("hours", "hour", "expected"),
+        [
+            ("2-6", 3, True),
+            ("2-6", 6, False),
+            ("22-4", 23, True),
+            ("22-4", 2, True),
+            ("22-4", 12, False),
+            ("", 12, True),
+        ],
+    )
+    def test_window(self, hours, hour, expected):
+        """Test hours inside the window, including windows that wrap midnight."""
+        assert warmer.in_warm_window(datetime.datetime(2024, 1, 1, hour), hours) is expected
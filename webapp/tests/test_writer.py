@@ -0,0 +1,176 @@
+"""Tests for the group-commit writer and connection durability settings."""
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from webapp import database, writer
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A scratch database with one table."""
+    path = str(tmp_path / "writer.sqlite3")
+    conn = database.connect(path)
+    conn.execute("CREATE TABLE items (name TEXT PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _names(path: str) -> list[str]:
+    conn = database.connect(path)
+    try:
+        return sorted(row["name"] for row in conn.execute("SELECT name FROM items"))
+    finally:
+        conn.close()
+
+
+def _insert(name: str):
+    return lambda conn: conn.execute("INSERT INTO items (name) VALUES (?)", (name,)).rowcount
+
+
+class TestGroupWriter:
+    """Tests for GroupWriter."""
+
+    def test_submit_returns_result_after_commit(self, db_path):
+        """Test a write is visible to other connections once submit returns."""
+        group_writer = writer.GroupWriter(db_path, window_seconds=0.001, max_ops=8)
+        assert group_writer.submit(_insert("a")) == 1
+        assert _names(db_path) == ["a"]
+
+    def test_concurrent_writes_share_commits(self, db_path):
+        """Test writes arriving together are committed in fewer transactions."""
+        group_writer = writer.GroupWriter(db_path, window_seconds=0.05, max_ops=64)
+        threads = [
+            threading.Thread(target=group_writer.submit, args=(_insert(f"n{index}"),)) for index in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(_names(db_path)) == 20
+        assert group_writer.stats.writes == 20
+        assert group_writer.stats.commits < 20
+        assert group_writer.stats.largest_group > 1
+
+    def test_failed_write_rolled_back_alone(self, db_path):
+        """Test a write that raises keeps none of its changes and does not affect its group."""
+        group_writer = writer.GroupWriter(db_path, window_seconds=0.05, max_ops=64)
+
+        def fail(conn):
+            conn.execute("INSERT INTO items (name) VALUES ('partial')")
+            raise ValueError("boom")
+
+        errors = []
+
+        def submit_failing():
+            try:
+                group_writer.submit(fail)
+            except ValueError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=submit_failing)]
+        threads += [threading.Thread(target=group_writer.submit, args=(_insert(name),)) for name in ("x", "y")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 1
+        assert _names(db_path) == ["x", "y"]
+        assert group_writer.stats.failed == 1
+
+    def test_max_ops_caps_group(self, db_path):
+        """Test no group is larger than max_ops."""
+        group_writer = writer.GroupWriter(db_path, window_seconds=0.05, max_ops=3)
+        threads = [threading.Thread(target=group_writer.submit, args=(_insert(f"m{index}"),)) for index in range(9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert group_writer.stats.largest_group <= 3
+        assert len(_names(db_path)) == 9
+
+
+    def test_stop_commits_queued_writes_and_ends_thread(self, db_path):
+        """Test stopping drains the queue, closes the thread, and a later submit starts a new one."""
+        group_writer = writer.GroupWriter(db_path, window_seconds=0.05, max_ops=64)
+        group_writer.submit(_insert("before"))
+        thread = group_writer._thread
+        group_writer.stop()
+        assert thread is not None and not thread.is_alive()
+        assert group_writer.submit(_insert("after")) == 1
+        group_writer.stop()
+        assert _names(db_path) == ["after", "before"]
+
+
+class TestCommitWrite:
+    """Tests for routes writing through commit_write."""
+
+    def test_direct_write_rolls_back_on_error(self, app):
+        """Test a failing write leaves nothing behind without group commit."""
+
+        def fail(conn):
+            conn.execute("INSERT INTO room_activity (room, last_seen) VALUES ('rollback', 1)")
+            raise ValueError("boom")
+
+        with app.app_context():
+            with pytest.raises(ValueError):
+                writer.commit_write(fail)
+            count = database.get_db().execute("SELECT COUNT(*) FROM room_activity WHERE room = 'rollback'")
+            assert count.fetchone()[0] == 0
+
+    def test_routes_with_group_commit(self, client, monkeypatch):
+        """Test list mutations work end to end through the writer thread."""
+        monkeypatch.setattr(writer, "GROUP_COMMIT", True)
+        client.post("/api/list", json={"room": "grouproom", "title_id": "tt0960001", "title": "One", "rating": "7"})
+        client.post("/api/list", json={"room": "grouproom", "title_id": "tt0960002", "title": "Two", "rating": "7"})
+        client.patch("/api/list", json={"room": "grouproom", "title_id": "tt0960001", "watched": 1})
+        client.delete("/api/list", json={"room": "grouproom", "title_id": "tt0960002"})
+        items = client.get("/api/list?room=grouproom&status=watched").get_json()["items"]
+        assert [item["title_id"] for item in items] == ["tt0960001"]
+        assert client.get("/api/list?room=grouproom").get_json()["items"] == []
+        assert writer.get_writer().stats.commits >= 1
+
+    def test_stalled_writer_returns_503(self, client, monkeypatch):
+        """Test a write stuck behind a slow one is answered with JSON instead of an error page."""
+        monkeypatch.setattr(writer, "GROUP_COMMIT", True)
+        monkeypatch.setattr(writer, "WRITE_TIMEOUT_SECONDS", 0.1)
+        started, gate = threading.Event(), threading.Event()
+
+        def stall(conn):
+            started.set()
+            gate.wait(5)
+
+        blocker = threading.Thread(target=writer.get_writer().submit, args=(stall, 5))
+        blocker.start()
+        started.wait(5)
+        try:
+            response = client.post("/api/list", json={"room": "stallroom", "title_id": "tt0970001", "title": "Slow"})
+        finally:
+            gate.set()
+            blocker.join()
+        assert response.status_code == 503
+        assert response.get_json()["error"] == "write_timeout"
+
+
+class TestDurabilitySettings:
+    """Tests for SHOVO_SYNCHRONOUS and SHOVO_JOURNAL_MODE."""
+
+    def test_synchronous_applied_per_connection(self, db_path, monkeypatch):
+        """Test connections use the configured synchronous level."""
+        monkeypatch.setattr(database, "SYNCHRONOUS", "NORMAL")
+        conn = database.connect(db_path)
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        conn.close()
+
+    def test_journal_mode(self, db_path, monkeypatch):
+        """Test the configured journal mode is applied to the database file."""
+        monkeypatch.setattr(database, "JOURNAL_MODE", "wal")
+        conn = database.connect(db_path)
+        database.apply_journal_mode(conn)
+        conn.close()
+        conn = database.connect(db_path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
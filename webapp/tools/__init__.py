@@ -0,0 +1,5 @@
+"""Build and maintenance commands, run as ``python -m webapp.tools.<name>``.
+
+They import nothing from the application, so running them neither migrates the database
+nor starts background threads. ``assets`` reads the manifest layout from ``build_static``.
+"""
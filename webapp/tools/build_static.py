@@ -0,0 +1,186 @@
+"""Fingerprint static files and write an asset manifest.
+
+Usage::
+
+    python -m webapp.tools.build_static [--clean] [directory]
+
+Run it on every deploy, before ``webapp.tools.precompress``. Each file below
+``webapp/static`` is copied into ``static/dist/`` with a hash of its contents in its name
+(``js/main.js`` becomes ``js/main.3f9c2a1b.js``). References are rewritten to the
+fingerprinted names first: relative ``import`` specifiers in JavaScript, relative
+``url()`` in CSS and ``/static/...`` paths in both. A file's hash therefore changes when
+anything it references changes, and a deploy only renames the files that changed.
+
+``static/dist/manifest.json`` maps original paths to fingerprinted ones and lists the
+modules each script imports. ``create_app`` reads it for the ``asset_url`` template helper
+and ``sw.js`` precaches from it. ``sw.js`` itself is not fingerprinted, because browsers
+check for service worker updates at a fixed URL. Files from earlier builds are kept, so
+pages rendered before a deploy can still load them, unless ``--clean`` is given.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 8
+# Served at a fixed URL; see the module docstring.
+UNVERSIONED = {"sw.js"}
+SKIPPED_SUFFIXES = (".gz", ".br")
+REWRITTEN_EXTENSIONS = {".css", ".js"}
+
+_IMPORT_RE = re.compile(r"""(\b(?:from|import)\s*\(?\s*)(["'])(\.{1,2}/[^"'\n]+)\2""")
+_CSS_URL_RE = re.compile(r"""(url\(\s*)(["']?)(?![a-z]+:|/|#)([^"')\s]+)\2(\s*\))""")
+_STATIC_PATH_RE = re.compile(r"""/static/([\w./-]+)""")
+
+
+def collect_assets(directory: str) -> list[str]:
+    """Relative paths (with ``/`` separators) of the files to fingerprint."""
+    assets = []
+    for root, dirs, files in os.walk(directory):
+        if root == directory and DIST_DIRNAME in dirs:
+            dirs.remove(DIST_DIRNAME)
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/")
+            if path in UNVERSIONED or name.endswith(SKIPPED_SUFFIXES):
+                continue
+            assets.append(path)
+    return assets
+
+
+def fingerprint(path: str, data: bytes) -> str:
+    """``path`` with a hash of ``data`` inserted before its extension."""
+    stem, extension = posixpath.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{extension}"
+
+
+def _resolve(path: str, reference: str) -> str:
+    return posixpath.normpath(posixpath.join(posixpath.dirname(path), reference))
+
+
+def _relative(path: str, target: str) -> str:
+    reference = posixpath.relpath(target, posixpath.dirname(path))
+    return reference if reference.startswith(".") else f"./{reference}"
+
+
+def _module_imports(path: str, text: str) -> list[str]:
+    return [_resolve(path, match.group(3)) for match in _IMPORT_RE.finditer(text)]
+
+
+def _references(path: str, text: str) -> list[str]:
+    """Asset paths that ``text`` (the contents of ``path``) refers to."""
+    references = [match.group(1) for match in _STATIC_PATH_RE.finditer(text)]
+    if path.endswith(".js"):
+        references += _module_imports(path, text)
+    else:
+        references += [_resolve(path, match.group(3)) for match in _CSS_URL_RE.finditer(text)]
+    return references
+
+
+def _rewrite(path: str, text: str, names: dict[str, str]) -> str:
+    """Point the references in ``text`` at the fingerprinted names already in ``names``."""
+
+    def relative(match: re.Match[str], group: int) -> str:
+        target = _resolve(path, match.group(group))
+        if target not in names:
+            return match.group(0)
+        start, end = match.span(group)
+        offset = match.start()
+        return match.group(0)[: start - offset] + _relative(path, names[target]) + match.group(0)[end - offset :]
+
+    def absolute(match: re.Match[str]) -> str:
+        target = match.group(1)
+        return f"/static/{DIST_DIRNAME}/{names[target]}" if target in names else match.group(0)
+
+    text = _STATIC_PATH_RE.sub(absolute, text)
+    if path.endswith(".js"):
+        return _IMPORT_RE.sub(lambda match: relative(match, 3), text)
+    return _CSS_URL_RE.sub(lambda match: relative(match, 3), text)
+
+
+def build(directory: str = STATIC_DIR, clean: bool = False) -> dict:
+    """Write fingerprinted copies of the files in ``directory`` and return the manifest."""
+    assets = collect_assets(directory)
+    known = set(assets)
+    names: dict[str, str] = {}
+    contents: dict[str, bytes] = {}
+    imports: dict[str, list[str]] = {}
+
+    def visit(path: str, visiting: tuple[str, ...]) -> None:
+        if path in names:
+            return
+        if path in visiting:
+            raise ValueError(f"reference cycle: {' -> '.join(visiting + (path,))}")
+        with open(os.path.join(directory, path), "rb") as handle:
+            data = handle.read()
+        if posixpath.splitext(path)[1] in REWRITTEN_EXTENSIONS:
+            text = data.decode("utf-8")
+            for reference in _references(path, text):
+                if reference in known and reference != path:
+                    visit(reference, visiting + (path,))
+            if path.endswith(".js"):
+                imports[path] = [module for module in _module_imports(path, text) if module in known]
+            data = _rewrite(path, text, names).encode("utf-8")
+        names[path] = fingerprint(path, data)
+        contents[path] = data
+
+    for path in assets:
+        visit(path, ())
+
+    def closure(path: str, seen: dict[str, None]) -> dict[str, None]:
+        for module in imports.get(path, []):
+            if module not in seen:
+                seen[module] = None
+                closure(module, seen)
+        return seen
+
+    output = os.path.join(directory, DIST_DIRNAME)
+    for path, name in names.items():
+        target = os.path.join(output, *name.split("/"))
+        # Same name, same contents: files from earlier builds can be left alone.
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as handle:
+                handle.write(contents[path])
+    manifest = {
+        "version": hashlib.sha256("\n".join(sorted(names.values())).encode("utf-8")).hexdigest()[:HASH_LENGTH],
+        "assets": names,
+        "imports": {path: list(closure(path, {})) for path in imports if imports[path]},
+    }
+    with open(os.path.join(output, MANIFEST_NAME), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+    if clean:
+        _remove_stale(output, set(names.values()))
+    return manifest
+
+
+def _remove_stale(output: str, current: set[str]) -> None:
+    for root, _, files in os.walk(output):
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), output).replace(os.sep, "/")
+            # Precompressed copies go with the file they were made from.
+            original = posixpath.splitext(path)[0] if name.endswith(SKIPPED_SUFFIXES) else path
+            if path != MANIFEST_NAME and original not in current:
+                os.remove(os.path.join(root, name))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", nargs="?", default=STATIC_DIR, help="static directory (default: webapp/static)")
+    parser.add_argument("--clean", action="store_true", help="remove files from earlier builds")
+    args = parser.parse_args(argv)
+    manifest = build(args.directory, args.clean)
+    print(f"{len(manifest['assets'])} assets, version {manifest['version']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
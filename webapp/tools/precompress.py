@@ -0,0 +1,77 @@
+"""Write precompressed ``.gz`` and ``.br`` copies of static files.
+
+Usage::
+
+    python -m webapp.tools.precompress [--min-bytes 256] [directory ...]
+
+Run it after every deploy. Without arguments ``webapp/static`` is processed. Brotli copies
+are only written when the ``brotli`` package is installed. Copies that do not save at least
+10% are removed, so servers fall back to the original file.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+PRECOMPRESS_EXTENSIONS = {".css", ".html", ".js", ".json", ".svg", ".txt", ".webmanifest"}
+MIN_SAVING = 0.1
+
+
+def _write_if_smaller(path: str, data: bytes, original_size: int) -> bool:
+    if len(data) > original_size * (1 - MIN_SAVING):
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+    with open(path, "wb") as handle:
+        handle.write(data)
+    return True
+
+
+def precompress_file(path: str) -> list[str]:
+    """Write compressed siblings of one file and return their paths."""
+    with open(path, "rb") as handle:
+        data = handle.read()
+    written = []
+    # Maximum levels: this runs once per deploy, not per request.
+    variants = [(".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda raw: brotli.compress(raw, quality=11)))
+    for suffix, compress in variants:
+        target = path + suffix
+        if _write_if_smaller(target, compress(data), len(data)):
+            written.append(target)
+    return written
+
+
+def precompress_directory(directory: str, min_bytes: int = 256) -> list[str]:
+    """Precompress every eligible file below ``directory``."""
+    written = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1] not in PRECOMPRESS_EXTENSIONS or os.path.getsize(path) < min_bytes:
+                continue
+            written.extend(precompress_file(path))
+    return written
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directories", nargs="*", help="directories to process (default: webapp/static)")
+    parser.add_argument("--min-bytes", type=int, default=256, help="skip files smaller than this")
+    args = parser.parse_args(argv)
+    for directory in args.directories or [STATIC_DIR]:
+        for path in precompress_directory(directory, args.min_bytes):
+            print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
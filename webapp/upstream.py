@@ -0,0 +1,322 @@
+"""Circuit breakers and rate limiters for upstream HTTP services.
+
+Every call to IMDb or OMDB goes through ``upstream_get``. When an upstream keeps failing
+or answering slowly its breaker opens and calls fail fast with ``UpstreamUnavailable``
+instead of tying up a worker thread for the full timeout.
+
+Token buckets only smooth short bursts and are kept per process. OMDB's daily quota is
+counted in SQLite instead (``DailyQuota``), so all worker processes share it.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+import requests
+
+# Support both package and standalone imports
+try:
+    from . import database
+except ImportError:
+    import database
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("SHOVO_BREAKER_FAILURES", "5"))
+BREAKER_SLOW_CALL_SECONDS = float(os.environ.get("SHOVO_BREAKER_SLOW_SECONDS", "5"))
+BREAKER_OPEN_SECONDS = float(os.environ.get("SHOVO_BREAKER_OPEN_SECONDS", "30"))
+IMDB_RATE_PER_SECOND = float(os.environ.get("IMDB_RATE_PER_SECOND", "5"))
+IMDB_BURST = int(os.environ.get("IMDB_BURST", "20"))
+OMDB_DAILY_QUOTA = int(os.environ.get("OMDB_DAILY_QUOTA", "1000"))
+OMDB_RATE_PER_SECOND = float(os.environ.get("OMDB_RATE_PER_SECOND", "5"))
+OMDB_BURST = int(os.environ.get("OMDB_BURST", "20"))
+# A quota check waits this long for the database's write lock.
+QUOTA_LOCK_TIMEOUT_SECONDS = 2.0
+DEFAULT_RETRY_AFTER_SECONDS = 60.0
+DEFAULT_TIMEOUT_SECONDS = 10.0
+# Keep the whole request comfortably under uWSGI's harakiri (30 s) and nginx's read timeout.
+REQUEST_BUDGET_SECONDS = float(os.environ.get("SHOVO_REQUEST_BUDGET_SECONDS", "25"))
+MIN_CALL_SECONDS = 0.5
+
+
+class UpstreamUnavailable(requests.RequestException):
+    """Raised without touching the network when an upstream is known to be unhealthy."""
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """Raised when the request's time budget is too small for another upstream call."""
+
+
+class Deadline:
+    """Time budget shared by every upstream call made while serving one request."""
+
+    def __init__(self, budget_seconds: float = REQUEST_BUDGET_SECONDS) -> None:
+        self.expires_at = time.monotonic() + budget_seconds
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (never negative)."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        """True once there is no longer time for another upstream call."""
+        return self.remaining() < MIN_CALL_SECONDS
+
+    def timeout(self, cap: float = DEFAULT_TIMEOUT_SECONDS) -> float:
+        """Timeout for the next call: the smaller of ``cap`` and the time left."""
+        remaining = self.remaining()
+        if remaining < MIN_CALL_SECONDS:
+            raise DeadlineExceeded("request deadline exceeded")
+        return min(cap, remaining)
+
+
+class CircuitBreaker:
+    """Track upstream health and fail fast while it is unhealthy.
+
+    ``closed``: calls pass through; consecutive failures (errors or slow calls) are counted.
+    ``open``: calls are rejected until ``open_seconds`` have passed.
+    ``half_open``: a single probe call is allowed; its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        slow_call_seconds: float = BREAKER_SLOW_CALL_SECONDS,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+    ) -> None:
+        self.failure_threshold = max(failure_threshold, 1)
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """Give back a half-open probe slot that was not used."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self, elapsed: float = 0.0) -> None:
+        """Record a completed call; slow calls count as failures."""
+        if elapsed >= self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed call and open the breaker past the threshold."""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+class TokenBucket:
+    """Token-bucket rate limiter with back-off on upstream 429 responses."""
+
+    def __init__(self, rate_per_second: float, capacity: int) -> None:
+        self.rate_per_second = rate_per_second
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.tokens = min(float(self.capacity), self.tokens + elapsed * self.rate_per_second)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available without waiting."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return False
+            self._refill(now)
+            if self.tokens < tokens:
+                return False
+            self.tokens -= tokens
+            return True
+
+    def available(self) -> float:
+        """Tokens that could be taken right now (zero while paused)."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return 0.0
+            self._refill(now)
+            return self.tokens
+
+    def penalize(self, retry_after: float) -> None:
+        """Stop handing out tokens for ``retry_after`` seconds and drain the bucket."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            self.tokens = 0.0
+
+
+def _utc_day() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+class DailyQuota:
+    """Calls allowed per UTC day, counted in the database so every worker process shares them."""
+
+    def __init__(self, name: str, limit: int, path: str | None = None) -> None:
+        self.name = name
+        self.limit = limit
+        self.path = path
+        self._pruned_day = ""
+
+    def _connect(self) -> sqlite3.Connection:
+        return database.connect(self.path, timeout=QUOTA_LOCK_TIMEOUT_SECONDS)
+
+    def try_acquire(self) -> bool:
+        """Count one call against today's quota, or return False if it is used up."""
+        day = _utc_day()
+        try:
+            conn = self._connect()
+            try:
+                if day != self._pruned_day:
+                    database.upstream_quota_prune(conn, self.name, day)
+                    self._pruned_day = day
+                return database.upstream_quota_take(conn, self.name, day, self.limit)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            # An unmigrated or locked database should not stop lookups; the token bucket
+            # still bounds the rate.
+            return True
+
+    def used(self) -> int | None:
+        """Calls counted today, or None if the counter cannot be read."""
+        try:
+            conn = self._connect()
+            try:
+                return database.upstream_quota_used(conn, self.name, _utc_day())
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+
+
+@dataclass
+class Upstream:
+    """Breaker, limiter and optional daily quota for one upstream service."""
+
+    name: str
+    limiter: TokenBucket
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    quota: DailyQuota | None = None
+
+
+UPSTREAMS: dict[str, Upstream] = {
+    "imdb": Upstream("imdb", TokenBucket(IMDB_RATE_PER_SECOND, IMDB_BURST)),
+    "omdb": Upstream(
+        "omdb",
+        TokenBucket(OMDB_RATE_PER_SECOND, OMDB_BURST),
+        quota=DailyQuota("omdb", OMDB_DAILY_QUOTA),
+    ),
+}
+
+
+def _retry_after_seconds(response: requests.Response) -> float:
+    value = response.headers.get("Retry-After")
+    try:
+        return max(float(value), 1.0) if value else DEFAULT_RETRY_AFTER_SECONDS
+    except ValueError:
+        return DEFAULT_RETRY_AFTER_SECONDS
+
+
+def upstream_get(name: str, url: str, deadline: Deadline | None = None, **kwargs: Any) -> requests.Response:
+    """Issue a GET request guarded by the named upstream's breaker and rate limiter.
+
+    With a ``deadline`` the call's timeout is shortened to the time left in the budget.
+    A timeout caused by that shortening raises ``DeadlineExceeded`` and is not held against
+    the upstream's breaker.
+    """
+    upstream = UPSTREAMS[name]
+    timeout = float(kwargs.pop("timeout", DEFAULT_TIMEOUT_SECONDS))
+    shortened = False
+    if deadline is not None:
+        budget_timeout = deadline.timeout(timeout)
+        shortened = budget_timeout < timeout
+        timeout = budget_timeout
+    if not upstream.breaker.allow():
+        raise UpstreamUnavailable(f"{name} circuit open")
+    if not upstream.limiter.try_acquire():
+        upstream.breaker.release()
+        raise UpstreamUnavailable(f"{name} rate limited")
+    if upstream.quota is not None and not upstream.quota.try_acquire():
+        upstream.breaker.release()
+        raise UpstreamUnavailable(f"{name} daily quota used up")
+    started = time.monotonic()
+    try:
+        response = requests.get(url, timeout=timeout, **kwargs)
+    except requests.Timeout as exc:
+        if shortened:
+            upstream.breaker.release()
+            raise DeadlineExceeded(f"{name} call cut off by request deadline") from exc
+        upstream.breaker.record_failure()
+        raise
+    except requests.RequestException:
+        upstream.breaker.record_failure()
+        raise
+    if response.status_code == 429:
+        upstream.limiter.penalize(_retry_after_seconds(response))
+        upstream.breaker.record_failure()
+    elif response.status_code >= 500:
+        upstream.breaker.record_failure()
+    else:
+        upstream.breaker.record_success(time.monotonic() - started)
+    return response
+
+
+def iter_body(response: requests.Response, chunk_size: int, deadline: Deadline | None = None) -> Iterator[bytes]:
+    """Yield a streamed response's body, raising ``DeadlineExceeded`` once the budget is spent.
+
+    The ``timeout`` given to requests bounds each socket read, not the whole body, so a
+    slowly trickling page could otherwise keep reading well past the deadline. The response
+    is closed before the exception is raised.
+    """
+    for chunk in response.iter_content(chunk_size):
+        if deadline is not None and deadline.remaining() <= 0:
+            response.close()
+            raise DeadlineExceeded("request deadline exceeded while reading the response body")
+        yield chunk
+
+
+def upstream_status() -> dict[str, dict[str, Any]]:
+    """Summarize breaker, limiter and quota state per upstream."""
+    status = {}
+    for name, upstream in UPSTREAMS.items():
+        status[name] = {
+            "state": upstream.breaker.state,
+            "failures": upstream.breaker.failures,
+            "tokens": round(upstream.limiter.tokens, 2),
+        }
+        if upstream.quota is not None:
+            status[name]["quota"] = {"limit": upstream.quota.limit, "used_today": upstream.quota.used()}
+    return status
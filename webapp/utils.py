@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 import hashlib
+import hmac
+import importlib
 import os
 import re
+import threading
+from types import ModuleType
 from typing import Any
 
 from flask import request
@@ -14,6 +18,8 @@ except ImportError:
     from models import SearchResult
 
 DEFAULT_USER_AGENT = "shovo-movielist/1.0 (+https://example.com)"
+ADMIN_TOKEN = os.environ.get("SHOVO_ADMIN_TOKEN", "")
+ADMIN_TOKEN_HEADER = "X-Shovo-Admin-Token"
 
 
 def request_user_agent() -> str:
@@ -21,6 +27,17 @@ def request_user_agent() -> str:
     return request.headers.get("User-Agent") or DEFAULT_USER_AGENT
 
 
+def is_admin_request() -> bool:
+    """Check the admin token sent in the ``X-Shovo-Admin-Token`` header.
+
+    Only the header is accepted, so the token never ends up in access or proxy logs.
+    """
+    if not ADMIN_TOKEN:
+        return False
+    token = request.headers.get(ADMIN_TOKEN_HEADER) or ""
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
 def serialize_result(result: SearchResult) -> dict[str, Any]:
     """Serialize a SearchResult to a dictionary."""
     return {
@@ -72,3 +89,33 @@ def parse_watched(value: Any) -> int:
     if isinstance(value, str):
         return 1 if value.lower() in {"1", "true", "yes", "watched"} else 0
     return 0
+
+
+class LazyModule(ModuleType):
+    """A module that is imported the first time one of its attributes is used."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self._module: ModuleType | None = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.__name__)
+                module = self._module
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Defer importing ``name`` until it is used.
+
+    Names starting with a dot are modules of this application. Used for the upstream
+    stack (``requests``, ``external_api`` and the modules built on it) so that worker
+    startup and list requests do not pay for importing it.
+    """
+    if name.startswith("."):
+        name = f"{__package__}{name}" if __package__ else name[1:]
+    return LazyModule(name)
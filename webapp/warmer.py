@@ -0,0 +1,268 @@
+"""Background pre-warmer for the rating and metadata caches.
+
+Rooms record when they were last opened (``room_activity``). The warmer looks for titles
+in recently active rooms whose cache entries are missing or will expire soon, and refreshes
+them through a small, rate-limited worker pool. It only runs during the off-peak hours in
+``SHOVO_WARM_HOURS``, so interactive ``/api/details`` calls find a warm cache without
+competing with the warmer for upstream quota.
+
+Enable the scheduler with ``SHOVO_WARMER=1``, or run a single pass from cron::
+
+    python -m webapp.warmer [--budget 300] [--concurrency 2] [--rate 1]
+
+Every app process starts a scheduler, but only the one holding the lock file
+(``SHOVO_WARM_LOCK``, default next to the database) warms, so upstream calls are not
+multiplied by the worker count. The others try again on each interval and take over when
+the holder exits. Cron passes take the same lock.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock file, every process warms
+    fcntl = None
+
+# Support both package and standalone imports
+try:
+    from . import database
+    from .database import CACHE_TTL_SECONDS, get_db_context, migrate_db
+    from .external_api import ALLOWED_TYPE_LABELS, normalize_type_label, refresh_title_details
+    from .upstream import UPSTREAMS, Deadline, TokenBucket
+    from .utils import DEFAULT_USER_AGENT
+except ImportError:
+    import database
+    from database import CACHE_TTL_SECONDS, get_db_context, migrate_db
+    from external_api import ALLOWED_TYPE_LABELS, normalize_type_label, refresh_title_details
+    from upstream import UPSTREAMS, Deadline, TokenBucket
+    from utils import DEFAULT_USER_AGENT
+
+WARM_HOURS = os.environ.get("SHOVO_WARM_HOURS", "2-6")
+WARM_INTERVAL_SECONDS = float(os.environ.get("SHOVO_WARM_INTERVAL", "900"))
+WARM_HORIZON_SECONDS = int(os.environ.get("SHOVO_WARM_HORIZON", str(24 * 60 * 60)))
+WARM_ACTIVE_DAYS = int(os.environ.get("SHOVO_WARM_ACTIVE_DAYS", "14"))
+WARM_MAX_TITLES = int(os.environ.get("SHOVO_WARM_MAX_TITLES", "200"))
+WARM_CONCURRENCY = int(os.environ.get("SHOVO_WARM_CONCURRENCY", "2"))
+WARM_RATE_PER_SECOND = float(os.environ.get("SHOVO_WARM_RATE", "1"))
+WARM_BUDGET_SECONDS = float(os.environ.get("SHOVO_WARM_BUDGET_SECONDS", "300"))
+WARM_USER_AGENT = os.environ.get("SHOVO_WARM_USER_AGENT", DEFAULT_USER_AGENT)
+WARM_LOCK_PATH = os.environ.get("SHOVO_WARM_LOCK", "")
+WARM_THREAD_PREFIX = "shovo-warm"
+# Leave at least this share of each upstream's burst to interactive requests.
+UPSTREAM_RESERVE = 0.5
+_scheduler_lock = threading.Lock()
+_scheduler_thread: threading.Thread | None = None
+_scheduler_stop = threading.Event()
+_warm_lock_guard = threading.Lock()
+_warm_lock_handle: IO[str] | None = None
+
+
+def parse_warm_hours(value: str) -> tuple[int, int] | None:
+    """Parse ``"2-6"`` into a start and end hour; empty means no restriction."""
+    if not value.strip():
+        return None
+    start, _, end = value.partition("-")
+    return int(start) % 24, int(end or start) % 24
+
+
+def in_warm_window(now: datetime.datetime | None = None, hours: str = WARM_HOURS) -> bool:
+    """Check whether ``now`` (local time) falls inside the off-peak window.
+
+    The window includes the start hour and excludes the end hour, and may wrap midnight.
+    """
+    window = parse_warm_hours(hours)
+    if window is None:
+        return True
+    hour = (now or datetime.datetime.now()).hour
+    start, end = window
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def find_warm_candidates(
+    conn: sqlite3.Connection,
+    horizon_seconds: int = WARM_HORIZON_SECONDS,
+    active_days: int = WARM_ACTIVE_DAYS,
+    limit: int = WARM_MAX_TITLES,
+) -> list[tuple[str, str | None]]:
+    """Titles in recently active rooms whose caches expire within the horizon, soonest first.
+
+    Titles without a cache entry count as already expired.
+    """
+    now = int(time.time())
+    rows = conn.execute(
+        """
+        SELECT
+            lists.title_id,
+            MAX(lists.type_label) AS type_label,
+            MIN(
+                COALESCE(rating_cache.expires_at, rating_cache.cached_at + :ttl, 0),
+                COALESCE(metadata_cache.expires_at, metadata_cache.cached_at + :ttl, 0)
+            ) AS warm_by
+        FROM lists
+        JOIN room_activity ON room_activity.room = lists.room
+        LEFT JOIN rating_cache ON rating_cache.title_id = lists.title_id
+        LEFT JOIN metadata_cache ON metadata_cache.title_id = lists.title_id
+        WHERE room_activity.last_seen >= :active_since
+        GROUP BY lists.title_id
+        HAVING warm_by < :warm_before
+        ORDER BY warm_by ASC
+        LIMIT :limit
+        """,
+        {
+            "ttl": CACHE_TTL_SECONDS,
+            "active_since": now - active_days * 24 * 60 * 60,
+            "warm_before": now + horizon_seconds,
+            "limit": limit,
+        },
+    ).fetchall()
+    return [(row["title_id"], row["type_label"]) for row in rows]
+
+
+def acquire_warm_lock(path: str | None = None) -> bool:
+    """Take the warmer's lock file for this process, unless another process holds it.
+
+    Once taken the lock is kept until ``release_warm_lock`` or the process exits.
+    """
+    global _warm_lock_handle
+    if fcntl is None:
+        return True
+    with _warm_lock_guard:
+        if _warm_lock_handle is not None:
+            return True
+        handle = open(path or WARM_LOCK_PATH or f"{database.DB_PATH}.warmer.lock", "a", encoding="utf-8")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        _warm_lock_handle = handle
+        return True
+
+
+def release_warm_lock() -> None:
+    """Let another process take over warming."""
+    global _warm_lock_handle
+    with _warm_lock_guard:
+        if _warm_lock_handle is not None:
+            _warm_lock_handle.close()
+            _warm_lock_handle = None
+
+
+def upstreams_have_headroom() -> bool:
+    """True while every breaker is closed and each limiter keeps its interactive reserve."""
+    return all(
+        upstream.breaker.state == "closed"
+        and upstream.limiter.available() >= upstream.limiter.capacity * UPSTREAM_RESERVE
+        for upstream in UPSTREAMS.values()
+    )
+
+
+def warm_once(
+    user_agent: str = WARM_USER_AGENT,
+    budget_seconds: float = WARM_BUDGET_SECONDS,
+    concurrency: int = WARM_CONCURRENCY,
+    rate_per_second: float = WARM_RATE_PER_SECOND,
+    limit: int = WARM_MAX_TITLES,
+) -> dict[str, int]:
+    """Refresh expiring titles until done, out of budget, or upstreams need their quota."""
+    deadline = Deadline(budget_seconds)
+    with get_db_context() as conn:
+        migrate_db(conn)
+        candidates = find_warm_candidates(conn, limit=limit)
+    pending = iter(candidates)
+    limiter = TokenBucket(rate_per_second, max(concurrency, 1))
+    stats = {"candidates": len(candidates), "refreshed": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def _take_token() -> bool:
+        while not limiter.try_acquire():
+            if deadline.expired:
+                return False
+            time.sleep(1 / max(rate_per_second, 0.01))
+        return True
+
+    def _worker() -> None:
+        while not deadline.expired and upstreams_have_headroom():
+            with lock:
+                item = next(pending, None)
+            if item is None or not _take_token():
+                return
+            title_id, type_label = item
+            normalized_type = normalize_type_label(type_label)
+            if normalized_type not in ALLOWED_TYPE_LABELS:
+                normalized_type = "movie"
+            try:
+                details = refresh_title_details(title_id, user_agent, normalized_type, deadline)
+                outcome = "refreshed" if details.status == "ok" else "failed"
+            except (requests.RequestException, sqlite3.Error):
+                outcome = "failed"
+            with lock:
+                stats[outcome] += 1
+
+    workers = max(concurrency, 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=WARM_THREAD_PREFIX) as executor:
+        for _ in range(workers):
+            executor.submit(_worker)
+    stats["skipped"] = stats["candidates"] - stats["refreshed"] - stats["failed"]
+    return stats
+
+
+def _run_scheduler() -> None:
+    try:
+        while not _scheduler_stop.wait(WARM_INTERVAL_SECONDS):
+            if in_warm_window() and acquire_warm_lock():
+                warm_once()
+    finally:
+        release_warm_lock()
+
+
+def start_warmer() -> threading.Thread:
+    """Start the warmer's scheduler thread once per process; only one process warms at a time."""
+    global _scheduler_thread
+    with _scheduler_lock:
+        if _scheduler_thread is None or not _scheduler_thread.is_alive():
+            _scheduler_stop.clear()
+            _scheduler_thread = threading.Thread(
+                target=_run_scheduler, name=f"{WARM_THREAD_PREFIX}-scheduler", daemon=True
+            )
+            _scheduler_thread.start()
+        return _scheduler_thread
+
+
+def stop_warmer() -> None:
+    """Ask the scheduler thread to exit after its current pass."""
+    _scheduler_stop.set()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run one cache pre-warming pass.")
+    parser.add_argument("--budget", type=float, default=WARM_BUDGET_SECONDS, help="seconds to spend at most")
+    parser.add_argument("--concurrency", type=int, default=WARM_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=WARM_RATE_PER_SECOND, help="titles per second")
+    parser.add_argument("--limit", type=int, default=WARM_MAX_TITLES, help="titles to consider")
+    args = parser.parse_args(argv)
+    if not acquire_warm_lock():
+        print(json.dumps({"skipped": "another process is warming"}))
+        return 0
+    stats = warm_once(
+        budget_seconds=args.budget, concurrency=args.concurrency, rate_per_second=args.rate, limit=args.limit
+    )
+    print(json.dumps(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,200 @@
+"""Optional group commit for list mutations.
+
+By default each mutation request writes through its own connection and commits, which
+costs one journal sync per click. With ``SHOVO_GROUP_COMMIT=1``, requests hand their
+writes to one writer thread per process instead. The writer collects what arrives within
+``SHOVO_GROUP_COMMIT_WINDOW_MS`` (up to ``SHOVO_GROUP_COMMIT_MAX_OPS`` writes), applies it
+in one ``BEGIN IMMEDIATE`` transaction, commits once and then wakes every waiting request.
+Each write runs in its own savepoint, so one that fails is rolled back and reported to its
+request without affecting the others. A request returns only after its write committed,
+so durability is whatever ``SHOVO_SYNCHRONOUS`` gives the writer's connection.
+
+Having a single writer also means list mutations no longer queue on SQLite's write lock
+against each other; they wait on an in-memory queue instead.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, TypeVar
+
+# Support both package and standalone imports
+try:
+    from . import database
+except ImportError:
+    import database
+
+GROUP_COMMIT = os.environ.get("SHOVO_GROUP_COMMIT", "").lower() in {"1", "true", "yes", "on"}
+GROUP_COMMIT_WINDOW_MS = float(os.environ.get("SHOVO_GROUP_COMMIT_WINDOW_MS", "2"))
+GROUP_COMMIT_MAX_OPS = int(os.environ.get("SHOVO_GROUP_COMMIT_MAX_OPS", "64"))
+# A request gives up on its write after this long; the write may still be applied.
+WRITE_TIMEOUT_SECONDS = 30.0
+WRITER_THREAD_NAME = "shovo-writer"
+
+T = TypeVar("T")
+Write = Callable[[sqlite3.Connection], Any]
+
+
+class WriteTimeout(TimeoutError):
+    """A write was not committed in time. It may still be applied later."""
+
+
+@dataclass
+class _PendingWrite:
+    func: Write
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: BaseException | None = None
+
+
+@dataclass
+class WriterStats:
+    """Counters for one writer."""
+
+    writes: int = 0
+    failed: int = 0
+    commits: int = 0
+    largest_group: int = 0
+
+
+class GroupWriter:
+    """Applies submitted writes to one database from a single thread, in grouped commits."""
+
+    def __init__(self, path: str, window_seconds: float, max_ops: int) -> None:
+        self.path = path
+        self.window_seconds = window_seconds
+        self.max_ops = max(max_ops, 1)
+        self.stats = WriterStats()
+        # ``None`` asks the thread to stop once the writes queued before it are committed.
+        self._queue: queue.Queue[_PendingWrite | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable[[sqlite3.Connection], T], timeout: float | None = None) -> T:
+        """Run ``func(conn)`` in the writer's next commit and return its result once committed.
+
+        Raises ``WriteTimeout`` after ``timeout`` (default ``WRITE_TIMEOUT_SECONDS``).
+        """
+        timeout = WRITE_TIMEOUT_SECONDS if timeout is None else timeout
+        pending = _PendingWrite(func)
+        self._ensure_thread()
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise WriteTimeout(f"write not committed within {timeout} seconds")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def stop(self, timeout: float = WRITE_TIMEOUT_SECONDS) -> None:
+        """Commit the writes already queued, then close the connection and end the thread.
+
+        A later ``submit`` starts a new thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=WRITER_THREAD_NAME, daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> list[_PendingWrite | None]:
+        group = [self._queue.get()]
+        deadline = time.monotonic() + self.window_seconds
+        while len(group) < self.max_ops and group[-1] is not None:
+            remaining = deadline - time.monotonic()
+            try:
+                group.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return group
+
+    def _run(self) -> None:
+        # Autocommit mode: transactions and savepoints are managed explicitly below.
+        conn = database.connect(self.path, isolation_level=None, check_same_thread=False)
+        try:
+            while True:
+                group = self._collect()
+                writes = [pending for pending in group if pending is not None]
+                if writes:
+                    self._apply(conn, writes)
+                if len(writes) < len(group):
+                    return
+        finally:
+            conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, group: list[_PendingWrite]) -> None:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for pending in group:
+                conn.execute("SAVEPOINT write")
+                try:
+                    pending.result = pending.func(conn)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO write")
+                    pending.error = exc
+                conn.execute("RELEASE write")
+            conn.execute("COMMIT")
+        except Exception as exc:
+            # The whole group failed (the write lock timed out, or the commit did).
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for pending in group:
+                pending.result = None
+                pending.error = pending.error or exc
+        else:
+            self.stats.commits += 1
+        finally:
+            self.stats.writes += len(group)
+            self.stats.failed += sum(1 for pending in group if pending.error is not None)
+            self.stats.largest_group = max(self.stats.largest_group, len(group))
+            for pending in group:
+                pending.done.set()
+
+
+_writers: dict[str, GroupWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path: str | None = None) -> GroupWriter:
+    """The writer for ``path`` (default ``database.DB_PATH``), created on first use."""
+    path = path or database.DB_PATH
+    with _writers_lock:
+        if path not in _writers:
+            _writers[path] = GroupWriter(path, GROUP_COMMIT_WINDOW_MS / 1000, GROUP_COMMIT_MAX_OPS)
+        return _writers[path]
+
+
+def close_writers() -> None:
+    """Stop every writer once it has committed what was queued, at shutdown or between tests."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for group_writer in writers:
+        group_writer.stop()
+
+
+def commit_write(func: Callable[[sqlite3.Connection], T]) -> T:
+    """Run ``func(conn)`` and commit it, through the group writer when it is enabled.
+
+    ``func`` must not commit or roll back itself. If it raises, none of its changes are kept.
+    """
+    if GROUP_COMMIT:
+        return get_writer().submit(func)
+    conn = database.get_db()
+    try:
+        result = func(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
@@ -1,11 +1,15 @@
-"""WSGI entry point for the application."""
+"""WSGI entry point for the application.
+
+Creating the app migrates the database and may start the warmer, so it happens here
+rather than when ``app`` is imported for ``create_app``.
+"""
 # Support both package and standalone imports
 try:
-    from webapp import app
+    from webapp.app import create_app
 except ImportError:
-    from app import app
+    from app import create_app
 
-application = app
+app = application = create_app()
 
 if __name__ == "__main__":
     application.run()